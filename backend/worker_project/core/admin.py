@@ -1,10 +1,149 @@
-from django.contrib import admin
+"""
+Admin for workers and projects, built to stay usable on large tables:
+
+* changelists join the worker in (list_select_related) instead of one
+  query per row, and default to an order an index can serve;
+* list filters use indexes. Dates are filtered with
+  DateFieldListFilter's fixed ranges rather than date_hierarchy, whose
+  drill-down links come from a DISTINCT over every row's truncated date;
+* unfiltered changelists of big tables show the database's row estimate
+  instead of running COUNT(*) over the whole table, and filtered ones
+  skip the second, unfiltered count;
+* a project's worker is picked with an autocomplete, not a <select> of
+  every user;
+* the status actions change any number of projects with one UPDATE.
+"""
+from itertools import islice
+
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from . import clusters, events, response_cache, stats
 from .models import User, Project
 
+ESTIMATED_COUNT_MIN = 100_000  # below this a changelist counts exactly
+STATUS_CHUNK_SIZE = 10_000     # rows per batch of derived-data updates
+STATUS_EVENTS_MAX = 500        # above this, workers are told to resync instead
+
+
+def estimated_count(model):
+    """The database's estimate of the rows in ``model``'s table, or None."""
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+            row = cursor.fetchone()
+            return row[0] if row and row[0] >= 0 else None  # -1: never analyzed
+        if connection.vendor == "sqlite":
+            # Statistics exist once ANALYZE (or PRAGMA optimize) has run
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table])
+            row = cursor.fetchone()
+            return int(row[0].split()[0]) if row else None
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        if not self.object_list.query.where:
+            estimate = estimated_count(self.object_list.model)
+            if estimate is not None and estimate >= ESTIMATED_COUNT_MIN:
+                return estimate
+        return super().count
+
+
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
     list_display = ('id', 'username', 'email', 'role', 'is_staff', 'is_superuser')
+    list_filter = ("role",)  # user_role_idx
+    ordering = ("-id",)
+    search_fields = ("^username", "=email")  # prefix / exact: no '%term%' scans
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        queryset, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        # The project form's worker autocomplete only offers workers
+        if request.GET.get("model_name") == "project" and request.GET.get("field_name") == "worker":
+            queryset = queryset.filter(role="WORKER")
+        return queryset, may_have_duplicates
+
 
 @admin.register(Project)
 class ProjectAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'worker', 'created_at')
+    list_display = ('id', 'name', 'worker', 'status', 'created_at')
+    list_select_related = ("worker",)
+    # Pages walk project_created_id_idx in order; a status filter skips the
+    # other statuses on the way (each is a large share of all projects)
+    ordering = ("-created_at", "-id")
+    list_filter = ("status", ("created_at", admin.DateFieldListFilter))
+    autocomplete_fields = ("worker",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ["mark_pending", "mark_in_progress", "mark_completed"]
+
+    @admin.action(description="Mark selected projects as Pending")
+    def mark_pending(self, request, queryset):
+        self.set_status(request, queryset, "PENDING")
+
+    @admin.action(description="Mark selected projects as In Progress")
+    def mark_in_progress(self, request, queryset):
+        self.set_status(request, queryset, "IN_PROGRESS")
+
+    @admin.action(description="Mark selected projects as Completed")
+    def mark_completed(self, request, queryset):
+        self.set_status(request, queryset, "COMPLETED")
+
+    def set_status(self, request, queryset, status):
+        changed = set_status(queryset, status)
+        self.message_user(request, f"{changed} project(s) marked {status}.", messages.SUCCESS)
+
+
+def set_status(queryset, status):
+    """
+    Set the status of every project in ``queryset`` with one UPDATE, and
+    bring the derived data along as the Project signals would (update()
+    skips them). Returns how many projects changed.
+    """
+    moving = queryset.exclude(status=status).order_by()
+    with transaction.atomic():
+        rows = moving.select_for_update().values_list(
+            "id", "worker_id", "status", "geo_cell", "latitude", "longitude", "finish_date"
+        ).iterator(chunk_size=STATUS_CHUNK_SIZE)
+        changed, workers, moved = 0, set(), []
+        while chunk := list(islice(rows, STATUS_CHUNK_SIZE)):
+            clusters.track(
+                added=[clusters.point(cell, status, lat, lng) for _, _, _, cell, lat, lng, _ in chunk],
+                removed=[clusters.point(cell, old, lat, lng) for _, _, old, cell, lat, lng, _ in chunk],
+            )
+            stats.track(
+                added=[stats.key(worker, status, due) for _, worker, _, _, _, _, due in chunk],
+                removed=[stats.key(worker, old, due) for _, worker, old, _, _, _, due in chunk],
+            )
+            changed += len(chunk)
+            workers.update(worker for _, worker, *_ in chunk)
+            if changed <= STATUS_EVENTS_MAX:
+                moved += [(pk, worker, old) for pk, worker, old, *_ in chunk]
+        if not changed:
+            return 0
+
+        # On SQLite the transaction holds the write lock from its start; on
+        # PostgreSQL only rows inserted meanwhile could slip past the scan
+        moving.update(status=status, updated_at=timezone.now())
+        response_cache.bump(workers)
+        if changed <= STATUS_EVENTS_MAX:
+            for pk, worker, old in moved:
+                events.publish_on_commit(
+                    events.STATUS_CHANGED, worker, events.status_changed_data(pk, worker, status, old)
+                )
+        else:
+            # Too many to send one by one: have the clients reload
+            for worker in workers:
+                events.publish_on_commit(events.RESYNC, worker, {})
+    return changed
@@ -0,0 +1,248 @@
+"""
+Admission control: per-endpoint concurrency limits and load shedding.
+
+A process that starts everything it is sent runs all of it slowly. At
+shift start every worker logs in (PBKDF2, CPU-bound by design) and loads
+/api/projects/; with no limit, the hashing and the list queries share the
+CPU and p99 goes up for everyone. AdmissionMiddleware keeps each process
+in the range where it is fast:
+
+* Concurrency limits. settings.ADMISSION_CONCURRENCY caps the requests of
+  a URL name running at once in this process: login and registration
+  hash passwords, and more hashes at once than cores only make each
+  slower (login's cap: the CPU count over SERVER_PROCESSES). Over the cap
+  a request waits for a slot, up to ADMISSION_QUEUE_TIMEOUT seconds, then
+  gets 503; ADMISSION_QUEUE_DEPTH may wait (half of SERVER_THREADS), the
+  rest get 503 at once. A waiting request holds a server thread, which
+  the cheap requests behind it need more.
+
+* Shedding. Routes in ADMISSION_LOW_PRIORITY (registration, search) get
+  503 at once while the process is overloaded: ADMISSION_SHED_DEPTH
+  requests or more in flight (running or waiting for a slot; keep it
+  under the server's thread count), or more than one and an average
+  latency over the last few seconds (LoadMonitor) of
+  ADMISSION_SHED_LATENCY seconds or more.
+  With an X-Request-Start header from the proxy, latency includes the
+  time spent queued in front of the server (nginx:
+  ``proxy_set_header X-Request-Start "t=${msec}";``).
+
+Refusals are ``{"detail": ...}`` 503s with Retry-After, counted in
+``http_requests_shed_total{view,reason}`` (core.metrics). State is per
+process, like the server's threads. ``ADMISSION_ENABLED=0`` turns it off;
+``manage.py loadtest --scenario shift`` measures both ways.
+
+Per-client rates (429) are DRF throttles, core.throttling.
+"""
+import math
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from django.urls import Resolver404, resolve
+
+from .metrics import REQUESTS_SHED
+
+LATENCY_HALF_LIFE = 2.0  # seconds: older requests weigh less in the average...
+LATENCY_WINDOW = 5.0     # ... and none at all once nothing finished for this long
+
+
+class Limiter:
+    """A counting semaphore (``limit`` holders, ``queue`` waiters at most) with a timeout."""
+
+    def __init__(self, limit, queue=None):
+        self.limit = limit
+        self.queue = limit if queue is None else queue
+        self.running = 0
+        self.waiting = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout=None):
+        """Take a slot, waiting up to ``timeout`` seconds (0: don't wait). Returns whether it did."""
+        with self._condition:
+            if self.running >= self.limit:
+                if not timeout or self.waiting >= self.queue:
+                    return False
+                self.waiting += 1
+                try:
+                    if not self._condition.wait_for(lambda: self.running < self.limit, timeout):
+                        return False
+                finally:
+                    self.waiting -= 1
+            self.running += 1
+            return True
+
+    def release(self):
+        with self._condition:
+            self.running -= 1
+            self._condition.notify()
+
+
+class LoadMonitor:
+    """Requests in flight in this process and their recent latency."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self._latency = 0.0
+        self._updated_at = None  # time.monotonic() of the last latency
+
+    def enter(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def leave(self, latency=None):
+        now = time.monotonic()
+        with self._lock:
+            self.in_flight -= 1
+            if latency is None:
+                return
+            if self._updated_at is None or now - self._updated_at >= LATENCY_WINDOW:
+                self._latency = latency
+            else:
+                # Exponential moving average weighted by time, not count
+                weight = 0.5 ** ((now - self._updated_at) / LATENCY_HALF_LIFE)
+                self._latency = weight * self._latency + (1 - weight) * latency
+            self._updated_at = now
+
+    def latency(self):
+        updated_at = self._updated_at
+        if updated_at is None or time.monotonic() - updated_at >= LATENCY_WINDOW:
+            return 0.0
+        return self._latency
+
+    def overload(self):
+        """Why the process is overloaded ("depth", "latency"), or None."""
+        if self.in_flight >= settings.ADMISSION_SHED_DEPTH:
+            return "depth"
+        # Slow on its own isn't overload: something must be waiting too
+        if self.in_flight > 1 and self.latency() >= settings.ADMISSION_SHED_LATENCY:
+            return "latency"
+        return None
+
+    def retry_after(self):
+        return max(1, math.ceil(self.latency()))
+
+
+load = LoadMonitor()
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter(view):
+    """The Limiter of URL name ``view``, or None if it has no concurrency limit."""
+    limit = settings.ADMISSION_CONCURRENCY.get(view)
+    if limit is None:
+        return None
+    queue = settings.ADMISSION_QUEUE_DEPTH
+    found = _limiters.get(view)
+    if found is None or (found.limit, found.queue) != (limit, queue):
+        with _limiters_lock:
+            found = _limiters.get(view)
+            if found is None or (found.limit, found.queue) != (limit, queue):
+                found = _limiters[view] = Limiter(limit, queue)
+    return found
+
+
+def queued_for(request):
+    """Seconds between the proxy's X-Request-Start ("t=<epoch ms or s>") and now; 0 without one."""
+    value = request.headers.get("X-Request-Start", "").removeprefix("t=")
+    try:
+        started = float(value)
+    except ValueError:
+        return 0.0
+    if started > 1e11:  # milliseconds (nginx ${msec} has a dot; others send integers)
+        started /= 1000
+    return max(0.0, time.time() - started)
+
+
+def _busy(view, reason):
+    REQUESTS_SHED.inc(view, reason)
+    response = JsonResponse({"detail": "The server is busy, please retry shortly."}, status=503)
+    response["Retry-After"] = str(load.retry_after())
+    return response
+
+
+class AdmissionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.ADMISSION_ENABLED:
+            return self.get_response(request)
+        start = time.perf_counter()
+        view = self.view_name(request)
+        load.enter()
+        latency = None
+        try:
+            refused = self.refuse(request, view)
+            if refused is not None:
+                return refused
+            slot = limiter(view)
+            if slot is not None and not slot.acquire(settings.ADMISSION_QUEUE_TIMEOUT):
+                latency = time.perf_counter() - start + queued_for(request)
+                return _busy(view, "queue_timeout")
+            try:
+                response = self.get_response(request)
+            finally:
+                if slot is not None:
+                    slot.release()
+            latency = time.perf_counter() - start + queued_for(request)
+            return response
+        finally:
+            load.leave(latency)
+
+    async def __acall__(self, request):
+        if not settings.ADMISSION_ENABLED:
+            return await self.get_response(request)
+        start = time.perf_counter()
+        view = self.view_name(request)
+        load.enter()
+        latency = None
+        try:
+            refused = self.refuse(request, view)
+            if refused is not None:
+                return refused
+            slot = limiter(view)
+            # Waiting blocks, so it happens in a thread; a free slot doesn't wait
+            if slot is not None and not slot.acquire(0) and not await sync_to_async(
+                slot.acquire, thread_sensitive=False
+            )(settings.ADMISSION_QUEUE_TIMEOUT):
+                latency = time.perf_counter() - start + queued_for(request)
+                return _busy(view, "queue_timeout")
+            try:
+                response = await self.get_response(request)
+            finally:
+                if slot is not None:
+                    slot.release()
+            latency = time.perf_counter() - start + queued_for(request)
+            return response
+        finally:
+            load.leave(latency)
+
+    def view_name(self, request):
+        # Resolved here as the limits apply before the view runs; set on the
+        # request so a refusal is labelled like the view in core.metrics
+        try:
+            request.resolver_match = resolve(request.path_info)
+        except Resolver404:
+            return "unmatched"
+        return request.resolver_match.view_name or "unmatched"
+
+    def refuse(self, request, view):
+        """The 503 for a low-priority request while overloaded, else None."""
+        if view not in settings.ADMISSION_LOW_PRIORITY:
+            return None
+        reason = load.overload()
+        if reason is None:
+            return None
+        return _busy(view, reason)
@@ -0,0 +1,89 @@
+"""
+Hot/cold archival of completed projects.
+
+Completed projects nobody has touched for settings.ARCHIVE_AFTER_DAYS are
+moved from the Project table to ArchivedProject (same ids, same fields)
+by ``manage.py archive_projects``, meant to run daily from cron, e.g.
+
+    15 3 * * *  python manage.py archive_projects
+
+so the table every request reads stays the size of the live work however
+long the history gets. "Untouched" is updated_at: a completed project that
+is still being edited stays hot.
+
+Projects move in chunks of CHUNK_SIZE, each its own transaction, read in
+(updated_at, id) order from project_updated_id_idx. A chunk leaves the
+derived data the way deleting its projects would: map clusters, stats and
+the full-text index cover hot projects only, and delta sync (core.sync)
+gets tombstones, so a client's copy matches the default list. No events
+are sent: nothing changed for the people looking at the projects.
+
+Archived projects are read-only. They are served alongside hot ones with
+``?include_archived=1`` by list (one keyset page of each table, merged;
+KeysetPagination.paginate_querysets), retrieve, search and
+grouped_projects, sync and async views alike. Everything else (export,
+map, full-text search, stats, changes) reads hot projects only.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import clusters, response_cache, search, stats
+from .models import ArchivedProject, Project, ProjectTombstone
+
+CHUNK_SIZE = 1000
+# Project columns copied into the archive (ArchivedProject has the same, plus archived_at)
+COLUMNS = [f.attname for f in ArchivedProject._meta.concrete_fields if f.name != "archived_at"]
+
+
+def requested(request):
+    """Whether a request asks for archived projects too (?include_archived=1)."""
+    return request.query_params.get("include_archived") in ("1", "true")
+
+
+def archive_completed(older_than=None, chunk_size=CHUNK_SIZE):
+    """
+    Move projects completed and unchanged for ``older_than`` (a timedelta,
+    default ARCHIVE_AFTER_DAYS) to the archive. Returns how many moved.
+    """
+    if older_than is None:
+        older_than = timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+    cutoff = timezone.now() - older_than
+    moved, position = 0, None
+    while True:
+        candidates = Project.objects.filter(status="COMPLETED", updated_at__lt=cutoff)
+        if position is not None:
+            # Past the previous chunk, whose rows are gone or were skipped
+            updated_at, pk = position
+            candidates = candidates.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=pk))
+        with transaction.atomic():
+            rows = list(candidates.order_by("updated_at", "id").select_for_update().values(*COLUMNS)[:chunk_size])
+            if not rows:
+                return moved
+            _move(rows)
+        moved += len(rows)
+        position = rows[-1]["updated_at"], rows[-1]["id"]
+
+
+def _move(rows):
+    ids = [row["id"] for row in rows]
+    ArchivedProject.objects.bulk_create([ArchivedProject(**row) for row in rows])
+    # Plain DELETE: Project.delete()'s signals would cost several queries
+    # per project, and would tell clients the projects were deleted
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {Project._meta.db_table} WHERE id IN ({', '.join(['%s'] * len(ids))})", ids
+        )
+
+    clusters.track(removed=[
+        clusters.point(row["geo_cell"], row["status"], row["latitude"], row["longitude"]) for row in rows
+    ])
+    stats.track(removed=[stats.key(row["worker_id"], row["status"], row["finish_date"]) for row in rows])
+    search.unindex_projects(ids)
+    ProjectTombstone.objects.bulk_create([
+        ProjectTombstone(project_id=row["id"], worker_id=row["worker_id"]) for row in rows
+    ])
+    response_cache.bump({row["worker_id"] for row in rows})
@@ -0,0 +1,305 @@
+"""
+Native async versions of the hot project endpoints, under /api/async/.
+
+Under ASGI (``uvicorn worker_project.asgi:application``) DRF views run in a
+thread pool, one sync_to_async hop per request. These are plain Django
+``async def`` views with the same URLs below /api/async/, the same
+permissions and byte-identical JSON bodies:
+
+    GET   projects/                          list (keyset cursor, ?fields=)
+    GET   projects/<pk>/                     retrieve
+    GET   projects/search/?name=             exact name search
+    GET   projects/grouped_projects/         admins only, ?stream=1 streams
+    PATCH projects/<pk>/update_status/       own projects, not for admins
+
+(the GETs take ?include_archived=1 too, see core.archive)
+
+plus the realtime feed, which has no DRF counterpart:
+
+    GET   projects/events/                   text/event-stream (core.events)
+
+Authentication is CachedJWTAuthentication.aauthenticate (no query once the
+user is cached); reads go through the response cache like the DRF views
+(core.response_cache.acache_response).
+
+``manage.py loadtest`` compares both deployments.
+"""
+import functools
+import json
+
+from asgiref.sync import sync_to_async
+from django.db.models import Value
+from django.db.models.functions import Lower
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.request import Request
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import archive, clusters, events, response_cache, stats
+from .response_cache import acache_response
+from .authentication import CachedJWTAuthentication
+from .fast_serializers import project_fast_serializer, user_fast_serializer
+from .models import ArchivedProject, Project, User
+from .pagination import KeysetPagination
+from .renderers import FastJSONRenderer
+from .serializers import ProjectSerializer
+from .throttling import UserTokenBucketThrottle
+from .views import ProjectViewSet
+
+_authentication = CachedJWTAuthentication()
+_renderer = FastJSONRenderer()
+
+
+def _json(data, status=200):
+    return HttpResponse(_renderer.render(data), status=status, content_type="application/json")
+
+
+def _error(exc):
+    # Same body and headers as DRF's exception handler
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+    response = _json(data, status=exc.status_code)
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        response["WWW-Authenticate"] = _authentication.authenticate_header(None)
+    if getattr(exc, "wait", None) is not None:
+        response["Retry-After"] = "%d" % exc.wait
+    return response
+
+
+def async_api_view(methods):
+    """
+    Wrap an async view: method check, JWT authentication, the default
+    throttle, DRF Request (query_params, data) and DRF-style error responses.
+    """
+    def decorator(view):
+        @csrf_exempt
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return _error(exceptions.MethodNotAllowed(request.method))
+            try:
+                result = await _authentication.aauthenticate(request)
+                if result is None:
+                    raise exceptions.NotAuthenticated()
+                drf_request = Request(request, parsers=[JSONParser(), FormParser(), MultiPartParser()])
+                drf_request.user = result[0]
+                # Synchronous like the cache calls: the default store is in-process
+                throttle = UserTokenBucketThrottle()
+                if not throttle.allow_request(drf_request, None):
+                    raise exceptions.Throttled(throttle.wait())
+                return await view(drf_request, *args, **kwargs)
+            except exceptions.APIException as exc:
+                return _error(exc)
+        return wrapper
+    return decorator
+
+
+def _scoped(user, model=Project):
+    if user.role == "ADMIN":
+        return model.objects.all()
+    return model.objects.filter(worker=user)
+
+
+async def _rows(queryset, names=None, extra=()):
+    return [row async for row in project_fast_serializer.values(queryset, names, extra)]
+
+
+@async_api_view(["GET"])
+@acache_response()
+async def project_list(request):
+    fields = ProjectSerializer.requested_fields(request)
+    querysets = [_scoped(request.user)]
+    if archive.requested(request):
+        querysets.append(_scoped(request.user, ArchivedProject))
+    if fields:
+        columns = {"worker_id" if f == "worker" else f for f in fields}
+        querysets = [q.only("id", "created_at", *columns) for q in querysets]
+
+    paginator = KeysetPagination()
+    rows = [project_fast_serializer.values(q, fields, extra=("created_at", "id")) for q in querysets]
+    page = await paginator.apaginate_querysets(rows, request)
+    return _json({
+        "next": paginator.get_next_link(),
+        "results": project_fast_serializer.serialize(page, fields),
+    })
+
+
+@async_api_view(["GET"])
+@acache_response()
+async def project_detail(request, pk):
+    rows = await _rows(_scoped(request.user).filter(pk=pk))
+    if not rows and archive.requested(request):
+        rows = await _rows(_scoped(request.user, ArchivedProject).filter(pk=pk))
+    if not rows:
+        raise exceptions.NotFound("No Project matches the given query.")
+    return _json(project_fast_serializer.serialize(rows)[0])
+
+
+@async_api_view(["GET"])
+@acache_response(per_user=True)
+async def project_search(request):
+    name = request.query_params.get("name", "").strip()
+    if not name:
+        return _json({"detail": "Please provide a project name (?name=...)"}, status=400)
+
+    rows = []
+    for model in [Project, ArchivedProject] if archive.requested(request) else [Project]:
+        projects = model.objects.annotate(name_lower=Lower("name")).filter(
+            worker=request.user, name_lower=Lower(Value(name))
+        )
+        rows += await _rows(projects)  # one query per table: the sync view adds an exists()
+    if not rows:
+        return _json({"detail": f"No project found with name '{name}'"}, status=404)
+    return _json(project_fast_serializer.serialize(rows))
+
+
+async def _worker_groups(after=0, limit=None, archived=False):
+    """[(worker row, [project rows])] for workers with id > after, by id."""
+    workers = User.objects.filter(role="WORKER", id__gt=after).order_by("id")
+    if limit is not None:
+        workers = workers[:limit]
+    workers = [w async for w in user_fast_serializer.values(workers, extra=("id",))]
+    if not workers:
+        return []
+    projects = {}
+    for model in [Project, ArchivedProject] if archived else [Project]:
+        rows = project_fast_serializer.values(
+            model.objects.filter(worker_id__in=[w.id for w in workers]).order_by("id"), extra=("worker_id",)
+        )
+        async for row in rows:
+            projects.setdefault(row.worker_id, []).append(row)
+    if archived:
+        for rows in projects.values():
+            rows.sort(key=lambda row: row.id)
+    return [(w, projects.get(w.id, [])) for w in workers]
+
+
+def _group_json(worker, projects):
+    return {
+        "worker": user_fast_serializer.serialize([worker])[0],
+        "projects": project_fast_serializer.serialize(projects),
+    }
+
+
+@async_api_view(["GET"])
+@acache_response()
+async def grouped_projects(request):
+    if request.user.role != "ADMIN":
+        return _json({"detail": "You are not authorized"}, status=403)
+
+    archived = archive.requested(request)
+    if request.query_params.get("stream") in ("1", "true"):
+        async def stream():
+            yield "["
+            after, first = 0, True
+            while True:
+                groups = await _worker_groups(after, ProjectViewSet.GROUPED_CHUNK_SIZE, archived)
+                for worker, projects in groups:
+                    yield ("" if first else ",") + json.dumps(_group_json(worker, projects), cls=JSONEncoder)
+                    first = False
+                if len(groups) < ProjectViewSet.GROUPED_CHUNK_SIZE:
+                    break
+                after = groups[-1][0].id
+            yield "]"
+        return StreamingHttpResponse(stream(), content_type="application/json")
+
+    return _json([_group_json(w, projects) for w, projects in await _worker_groups(archived=archived)])
+
+
+def _track_status_change(project, old_status):
+    clusters.track(
+        added=[clusters.point(project.geo_cell, project.status, project.latitude, project.longitude)],
+        removed=[clusters.point(project.geo_cell, old_status, project.latitude, project.longitude)],
+    )
+    stats.track(
+        added=[stats.key(project.worker_id, project.status, project.finish_date)],
+        removed=[stats.key(project.worker_id, old_status, project.finish_date)],
+    )
+
+
+@async_api_view(["PATCH"])
+async def update_status(request, pk):
+    status_value = request.data.get("status")
+    while True:
+        try:
+            project = await Project.objects.aget(pk=pk)
+        except Project.DoesNotExist:
+            return _json({"detail": "Project not found"}, status=404)
+        if request.user.role == "ADMIN":
+            return _json({"detail": "Admins are not allowed to update project status"}, status=403)
+        if project.worker_id != request.user.pk:
+            return _json({"detail": "You are not authorized to update this project"}, status=403)
+        if status_value not in ["PENDING", "IN_PROGRESS", "COMPLETED"]:
+            return _json({"detail": "Invalid status"}, status=400)
+
+        # Only if the row is still as read: the cluster and stats deltas
+        # below go by it. After a concurrent change, read it again.
+        old_status = project.status
+        updated_at = timezone.now()
+        if await Project.objects.filter(
+            pk=pk, worker=request.user, status=old_status, geo_cell=project.geo_cell,
+            latitude=project.latitude, longitude=project.longitude, finish_date=project.finish_date,
+        ).aupdate(status=status_value, updated_at=updated_at):
+            break
+    project.status = status_value
+    project.updated_at = updated_at
+
+    # aupdate() skips the post_save signal: move the map cluster and stats
+    # row by hand (status is not in the search index)
+    if old_status != status_value:
+        await sync_to_async(_track_status_change)(project, old_status)
+    response_cache.bump_now([request.user.pk])  # committed already; in-process store by default: no I/O
+    if old_status != status_value:
+        # Already committed (autocommit), so no on_commit
+        events.publish(events.STATUS_CHANGED, project.worker_id, events.status_changed_data(
+            project.pk, project.worker_id, status_value, old_status
+        ))
+    return _json(ProjectSerializer(project).data)
+
+
+EVENTS_HEARTBEAT_SECONDS = 15  # comment line so proxies keep the connection open
+EVENTS_RETRY_MS = 3000         # client reconnect delay
+
+
+@async_api_view(["GET"])
+async def project_events(request):
+    """
+    Server-sent events for project changes: admins get all of them, workers
+    their own projects'. Reconnecting with a Last-Event-ID header (or
+    ?last_event_id=) replays what was missed; a "resync" event means that
+    wasn't possible and the client should refetch the list.
+    """
+    user = request.user
+    last_event_id = request.headers.get("Last-Event-ID") or request.query_params.get("last_event_id")
+    broadcaster = events.get_broadcaster()
+    subscription, missed = broadcaster.subscribe(last_event_id)
+
+    def resync():
+        return events.Event(broadcaster.last_event_id(), events.RESYNC, None, {}).encode()
+
+    async def stream():
+        try:
+            yield f"retry: {EVENTS_RETRY_MS}\n\n"
+            if missed is None:
+                yield resync()
+            for event in missed or ():
+                if event.visible_to(user):
+                    yield event.encode()
+            while True:
+                event = await subscription.get(EVENTS_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                elif event is subscription.OVERFLOW:
+                    yield resync()
+                    return
+                elif event.visible_to(user):
+                    yield event.encode()
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx: don't buffer the stream
+    return response
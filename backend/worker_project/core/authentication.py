@@ -0,0 +1,150 @@
+"""
+JWT authentication without a User query per request.
+
+Access tokens carry the user's id, role and (CHECK_REVOKE_TOKEN) a hash of
+their password, all signed. User rows are kept in an in-process TTL/LRU
+cache, so an authenticated request only reaches the database the first time
+a user is seen by a process, or after their row changed.
+
+Saving or deleting a user drops their entry (core.signals); that covers
+password changes, which also revoke older tokens through the password hash
+claim. Changes that skip signals (QuerySet.update) and changes made in
+another process are picked up within USER_CACHE_TTL seconds.
+
+Logged out and revoked sessions are rejected from the in-process
+revocation filter (core.revocation), also without a query.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .revocation import revocations
+
+ROLE_CLAIM = "role"
+USER_CACHE_TTL = 60        # seconds
+USER_CACHE_SIZE = 10_000   # users per process
+
+
+class UserCache:
+    """Thread-safe id -> User cache with a TTL, evicting least recently used."""
+
+    def __init__(self, ttl=USER_CACHE_TTL, max_entries=USER_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # user id -> (expires_at, user)
+        self._lock = threading.Lock()
+
+    def _hit(self, user_id):
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is None or entry[0] <= time.monotonic():
+                return None
+            self._data.move_to_end(user_id)
+            # A copy per request: views may set attributes on request.user
+            return copy.copy(entry[1])
+
+    def _store(self, user_id, user):
+        with self._lock:
+            self._data[user_id] = (time.monotonic() + self.ttl, user)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return copy.copy(user)
+
+    def get(self, user_id, load):
+        """The cached user, or ``load(user_id)`` (cached) on a miss."""
+        user = self._hit(user_id)
+        return user if user is not None else self._store(user_id, load(user_id))
+
+    async def aget(self, user_id, aload):
+        """get() for async code: ``aload`` is awaited on a miss."""
+        user = self._hit(user_id)
+        return user if user is not None else self._store(user_id, await aload(user_id))
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._data.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+user_cache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication with users from user_cache. Tokens whose role claim
+    no longer matches the user's role are rejected (the user logs in again).
+    """
+
+    def _load_user(self, user_id):
+        try:
+            return self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        revocations.refresh_if_due()
+        user = user_cache.get(str(user_id), self._load_user)
+        if validated_token.get(ROLE_CLAIM, user.role) != user.role:
+            raise AuthenticationFailed(_("The user's role has changed."), code="role_changed")
+        self.check_user(user, validated_token)
+        return user
+
+    async def _aload_user(self, user_id):
+        try:
+            return await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+
+    async def aauthenticate(self, request):
+        """
+        authenticate() for async views (core.async_views), which take a plain
+        Django request. Returns (user, token) or None; raises like authenticate().
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        await revocations.arefresh_if_due()
+        user = await user_cache.aget(str(user_id), self._aload_user)
+        if validated_token.get(ROLE_CLAIM, user.role) != user.role:
+            raise AuthenticationFailed(_("The user's role has changed."), code="role_changed")
+        self.check_user(user, validated_token)
+        return user
+
+    def check_user(self, user, validated_token):
+        if revocations.is_revoked(validated_token.payload):
+            raise AuthenticationFailed(_("The session has been logged out."), code="token_revoked")
+        # What JWTAuthentication.get_user checks after loading the user
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
@@ -0,0 +1,134 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+class _Store:
+    def __init__(self):
+        self.data = OrderedDict()  # key -> (expires_at or None, pickled value)
+        self.size = 0
+        self.lock = threading.Lock()
+
+
+# Django creates a cache object per thread; like LocMemCache, all of them
+# share one store per LOCATION.
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class LocalLRUCache(BaseCache):
+    """
+    In-process cache bounded by the total size of the stored values, evicting
+    least recently used entries first. Django's LocMemCache only bounds the
+    number of entries, which says little about memory when entries are whole
+    API responses.
+
+    OPTIONS: {"MAX_BYTES": <int>} (default 64 MB). Per process: every server
+    worker has its own copy.
+    """
+
+    def __init__(self, name, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self.max_bytes = int(options.get("MAX_BYTES", 64 * 1024 * 1024))
+        with _stores_lock:
+            store = _stores.setdefault(name, _Store())
+        self._data = store.data
+        self._lock = store.lock
+        self._store_state = store
+
+    def _expiry(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        return None if timeout is None else time.monotonic() + timeout
+
+    def _live(self, key):
+        # Caller holds the lock. Returns the entry or None, dropping it if expired.
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[0] is not None and entry[0] <= time.monotonic():
+            self._delete(key)
+            return None
+        return entry
+
+    def _delete(self, key):
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return False
+        self._store_state.size -= len(entry[1])
+        return True
+
+    def _store(self, key, value, timeout):
+        payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(payload) > self.max_bytes:
+            self._delete(key)
+            return False
+        self._delete(key)
+        self._data[key] = (self._expiry(timeout), payload)
+        self._store_state.size += len(payload)
+        while self._store_state.size > self.max_bytes:
+            oldest = next(iter(self._data))
+            self._delete(oldest)
+        return True
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._lock:
+            if self._live(key) is not None:
+                return False
+            return self._store(key, value, timeout)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._lock:
+            entry = self._live(key)
+            if entry is None:
+                return default
+            self._data.move_to_end(key)
+            payload = entry[1]
+        return pickle.loads(payload)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._lock:
+            self._store(key, value, timeout)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._lock:
+            entry = self._live(key)
+            if entry is None:
+                return False
+            self._data[key] = (self._expiry(timeout), entry[1])
+            return True
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._lock:
+            entry = self._live(key)
+            if entry is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(entry[1]) + delta
+            payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            self._store_state.size += len(payload) - len(entry[1])
+            self._data[key] = (entry[0], payload)
+            self._data.move_to_end(key)
+        return value
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._lock:
+            return self._live(key) is not None
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._lock:
+            return self._delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._store_state.size = 0
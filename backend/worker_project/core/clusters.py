@@ -0,0 +1,144 @@
+"""
+Precomputed project clusters for low-zoom map views.
+
+A cluster is a geo_cell prefix (see core.geo): at level L the top L bits of
+each axis, i.e. ``geo_cell >> 2 * (CELL_BITS - L)``. For every stored level
+ProjectCluster keeps, per (cell, status), the number of projects and the sum
+of their coordinates, so a viewport is answered from a few hundred aggregate
+rows instead of every project in it.
+
+The aggregates are maintained incrementally: ``track()`` applies the +/-
+deltas for added, removed or changed projects in a single upsert. It runs
+from the Project save/delete signals (core.signals) and explicitly from bulk
+code paths that bypass them. ``rebuild()`` recomputes everything with one
+GROUP BY per level.
+"""
+from collections import defaultdict
+
+from django.db import connection
+from django.db.models import Count, ExpressionWrapper, F, BigIntegerField, Q, Sum
+
+from .geo import CELL_BITS, cover
+from .models import ProjectCluster
+
+CLUSTER_LEVELS = range(1, 13)  # levels stored in ProjectCluster
+ZOOM_TO_LEVEL = 3              # ~8x8 clusters per map tile
+
+
+def level_for_zoom(zoom):
+    return max(1, min(zoom + ZOOM_TO_LEVEL, CELL_BITS))
+
+
+def shift_for(level):
+    return 2 * (CELL_BITS - level)
+
+
+def point(geo_cell, status, latitude, longitude):
+    """A project as seen by the cluster aggregates, or None if unlocated."""
+    if geo_cell is None:
+        return None
+    return (geo_cell, status, float(latitude), float(longitude))
+
+
+def track(added=(), removed=()):
+    """Apply cluster deltas for projects added and removed (``point()`` tuples)."""
+    deltas = defaultdict(lambda: [0, 0.0, 0.0])
+    for sign, points in ((1, added), (-1, removed)):
+        for p in points:
+            if p is None:
+                continue
+            geo_cell, status, latitude, longitude = p
+            for level in CLUSTER_LEVELS:
+                delta = deltas[(level, geo_cell >> shift_for(level), status)]
+                delta[0] += sign
+                delta[1] += sign * latitude
+                delta[2] += sign * longitude
+
+    # A move inside one cell nets count 0 but still shifts the sums
+    rows = [(*key, *delta) for key, delta in deltas.items() if any(delta)]
+    if not rows:
+        return
+
+    # Django has no increment-on-conflict upsert; this statement works on
+    # SQLite >= 3.24 and PostgreSQL alike.
+    table = connection.ops.quote_name(ProjectCluster._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {table} (level, cell, status, count, lat_sum, lng_sum) "
+            "VALUES (%s, %s, %s, %s, %s, %s) "
+            "ON CONFLICT (level, cell, status) DO UPDATE SET "
+            "count = {t}.count + excluded.count, "
+            "lat_sum = {t}.lat_sum + excluded.lat_sum, "
+            "lng_sum = {t}.lng_sum + excluded.lng_sum".replace("{t}", table),
+            rows,
+        )
+
+
+def rebuild(Project, ProjectCluster):
+    """Recompute all aggregates from scratch."""
+    ProjectCluster.objects.all().delete()
+    located = Project.objects.filter(geo_cell__isnull=False)
+    for level in CLUSTER_LEVELS:
+        cell = ExpressionWrapper(F("geo_cell") / (1 << shift_for(level)), output_field=BigIntegerField())
+        groups = located.values(cluster_cell=cell, cluster_status=F("status")).annotate(
+            n=Count("id"), lat=Sum("latitude"), lng=Sum("longitude"),
+        ).order_by()
+        ProjectCluster.objects.bulk_create(
+            (
+                ProjectCluster(
+                    level=level, cell=g["cluster_cell"], status=g["cluster_status"],
+                    count=g["n"], lat_sum=float(g["lat"]), lng_sum=float(g["lng"]),
+                )
+                for g in groups.iterator()
+            ),
+            batch_size=2000,
+        )
+
+
+def cell_ranges(south, west, north, east, level):
+    """geo.cover() ranges for the bbox, expressed as cells of ``level``."""
+    shift = shift_for(level)
+    return [(start >> shift, ((stop - 1) >> shift) + 1) for start, stop in cover(south, west, north, east)]
+
+
+def stored_clusters(ranges, level):
+    """(cell, status, count, lat_sum, lng_sum) rows from the aggregate table."""
+    cells = Q()
+    for start, stop in ranges:
+        cells |= Q(cell__gte=start, cell__lt=stop)
+    return ProjectCluster.objects.filter(cells, level=level, count__gt=0).values_list(
+        "cell", "status", "count", "lat_sum", "lng_sum"
+    )
+
+
+def live_clusters(projects, ranges, level):
+    """Same rows as stored_clusters(), aggregated from a Project queryset."""
+    shift = shift_for(level)
+    cells = Q()
+    for start, stop in ranges:
+        cells |= Q(geo_cell__gte=start << shift, geo_cell__lt=stop << shift)
+    cell = ExpressionWrapper(F("geo_cell") / (1 << shift), output_field=BigIntegerField())
+    return projects.filter(cells).values_list(cell, "status").annotate(
+        Count("id"), Sum("latitude"), Sum("longitude"),
+    ).order_by()
+
+
+def group(rows):
+    """Merge per-status rows into one cluster per cell with its centroid."""
+    by_cell = {}
+    for cell, status, count, lat_sum, lng_sum in rows:
+        cluster = by_cell.setdefault(cell, {"cell": cell, "count": 0, "lat_sum": 0.0, "lng_sum": 0.0, "statuses": {}})
+        cluster["count"] += count
+        cluster["lat_sum"] += float(lat_sum)
+        cluster["lng_sum"] += float(lng_sum)
+        cluster["statuses"][status] = count
+    return [
+        {
+            "cell": c["cell"],
+            "lat": round(c["lat_sum"] / c["count"], 6),
+            "lng": round(c["lng_sum"] / c["count"], 6),
+            "count": c["count"],
+            "statuses": c["statuses"],
+        }
+        for c in by_cell.values()
+    ]
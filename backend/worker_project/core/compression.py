@@ -0,0 +1,131 @@
+"""
+Response compression (CompressionMiddleware), brotli when the client takes
+it and the brotli package is installed, gzip otherwise.
+
+Only API payloads are compressed: JSON, NDJSON, MessagePack, CSV and plain
+text (the metrics page). HTML is left alone, the admin's pages carry CSRF
+tokens next to reflected input, which is what BREACH needs. Also skipped:
+
+* bodies under COMPRESSION_MIN_SIZE bytes, where the headers cost more
+  than compression saves;
+* event streams, whose events must reach the client as they happen;
+* responses that already have a Content-Encoding, or are gzip files (the
+  ``?gzip=1`` export).
+
+Streamed bodies are compressed as they go, each chunk flushed so the client
+can decode what it has received (export and import progress lines, grouped
+projects). Strong ETags become weak, as the bytes differ per encoding.
+"""
+import re
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    "application/json", "application/x-ndjson", "application/msgpack", "text/csv", "text/plain",
+}
+GZIP_LEVEL = 4        # past 4, each level costs far more time than it saves bytes
+BROTLI_QUALITY = 5    # brotli's top qualities are for static files, far too slow per request
+
+_quality = re.compile(r"\bq=([0-9.]+)")
+
+
+def accepted_encoding(accept_encoding):
+    """The encoding to use for an Accept-Encoding header: "br", "gzip" or None."""
+    offered = set()
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.partition(";")
+        q = _quality.search(params)
+        try:
+            if q is None or float(q.group(1)) > 0:
+                offered.add(name.strip().lower())
+        except ValueError:
+            continue
+    if "br" in offered and brotli is not None:
+        return "br"
+    return "gzip" if "gzip" in offered else None
+
+
+class Compressor:
+    """Incremental compressor: compress() each chunk, then finish()."""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip container
+
+    def compress(self, data):
+        """Compressed ``data``, flushed: the client can decode everything sent so far."""
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+def compress(data, encoding):
+    compressor = Compressor(encoding)
+    return compressor.compress(data) + compressor.finish()
+
+
+def compress_sequence(chunks, encoding):
+    compressor = Compressor(encoding)
+    for chunk in chunks:
+        if chunk:
+            yield compressor.compress(chunk)
+    yield compressor.finish()
+
+
+async def acompress_sequence(chunks, encoding):
+    compressor = Compressor(encoding)
+    async for chunk in chunks:
+        if chunk:
+            yield compressor.compress(chunk)
+    yield compressor.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    def process_response(self, request, response):
+        if response.has_header("Content-Encoding"):
+            return response
+        content_type = response.get("Content-Type", "").split(";")[0].strip().lower()
+        if content_type not in COMPRESSIBLE_TYPES:
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = accepted_encoding(request.headers.get("Accept-Encoding"))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_sequence(response.streaming_content, encoding)
+            else:
+                response.streaming_content = compress_sequence(response.streaming_content, encoding)
+            del response.headers["Content-Length"]
+        else:
+            compressed = compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
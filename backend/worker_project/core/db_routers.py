@@ -0,0 +1,97 @@
+"""
+Read replicas for the project API.
+
+settings.DATABASE_REPLICAS lists the database aliases that are read-only
+copies of "default" (see the POSTGRES_REPLICA_HOSTS switch in settings).
+When it isn't empty, ReplicaRouter is installed and ProjectViewSet sends the
+queries of its GET/HEAD requests to one replica, picked per request so all
+of a response comes from the same copy. Everything else reads and writes
+"default": other views, unsafe methods, authentication (a user who has just
+registered may not be on the replica yet), signals and commands.
+
+Replicas lag behind the primary. So that a client sees its own writes (and
+the response cache doesn't store a stale page under the new version), a
+write to a worker's projects pins that worker's reads, and all admin reads,
+to the primary for settings.DATABASE_REPLICA_LAG seconds. The pins live in
+the "api" cache, shared between processes like the response versions.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+_replica = ContextVar("replica", default=None)  # alias the current request reads from
+
+
+def replicas():
+    return getattr(settings, "DATABASE_REPLICAS", ())
+
+
+def _pin_key(worker_id=None):
+    return "primary:global" if worker_id is None else f"primary:worker:{worker_id}"
+
+
+def pin_primary(worker_ids=()):
+    """Route the readers of these workers' projects (and admins) to the primary for a while."""
+    if not replicas():
+        return
+    keys = [_pin_key(), *(_pin_key(w) for w in worker_ids if w is not None)]
+    caches["api"].set_many(dict.fromkeys(keys, 1), timeout=getattr(settings, "DATABASE_REPLICA_LAG", 5))
+
+
+@contextmanager
+def request_scope():
+    """Bounds the effect of read_from_replica() (ProjectViewSet.dispatch)."""
+    token = _replica.set(None)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+def read_from_replica(user):
+    """Send the rest of this request's reads to a replica, unless the user's data was just written."""
+    if not replicas():
+        return
+    if caches["api"].get(_pin_key(None if user.role == "ADMIN" else user.pk)):
+        return
+    _replica.set(random.choice(replicas()))
+
+
+def keep_routing(iterable):
+    """
+    Iterate a streaming response body with the routing of the request that
+    made it: the body is consumed after dispatch() has returned.
+    """
+    alias = _replica.get()  # now, while the request is being handled
+
+    def iterate():
+        iterator = iter(iterable)
+        while True:
+            token = _replica.set(alias)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                _replica.reset(token)
+            yield item
+    return iterate()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _replica.get()
+
+    def db_for_write(self, model, **hints):
+        # Explicit: instances read from a replica would otherwise be saved there
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # replicas hold the same rows as the primary
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return False if db in replicas() else None
@@ -0,0 +1,247 @@
+"""
+Project change events for the realtime endpoint (GET /api/async/projects/events/,
+core.async_views.project_events), so clients don't poll the list.
+
+Event types, with their data:
+
+* ``project.created`` / ``project.updated``: the project, as ProjectSerializer
+* ``project.status_changed``: {id, worker, status, previous_status}
+* ``project.deleted``: {id, worker}
+
+They are published after the transaction commits, from the Project signals
+(core.signals) and from the bulk code paths that bypass them.
+
+The broadcaster is chosen by settings.PROJECT_EVENTS_BACKEND:
+
+* LocalBroadcaster (default): fan-out inside this process only, so every
+  server process sees just the writes it made itself. Fine for a single
+  process, or behind sticky sessions with one writer.
+* RedisBroadcaster (when PROJECT_EVENTS_REDIS_URL is set): events go
+  through a Redis stream, so all processes see all writes.
+
+Both keep the last ``buffer_size`` events so a client reconnecting with
+Last-Event-ID gets what it missed. When the id is too old or unknown, the
+client gets a ``resync`` event instead and should refetch the list.
+"""
+import asyncio
+import itertools
+import json
+import threading
+import time
+from collections import deque
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+from rest_framework.utils.encoders import JSONEncoder
+
+CREATED = "project.created"
+UPDATED = "project.updated"
+STATUS_CHANGED = "project.status_changed"
+DELETED = "project.deleted"
+RESYNC = "resync"
+
+
+class Event(NamedTuple):
+    id: str
+    type: str
+    worker_id: int
+    data: dict
+
+    def visible_to(self, user):
+        return user.role == "ADMIN" or self.worker_id == user.pk
+
+    def encode(self):
+        """The event as a text/event-stream message."""
+        data = json.dumps(self.data, cls=JSONEncoder, separators=(",", ":"))
+        return f"id: {self.id}\nevent: {self.type}\ndata: {data}\n\n"
+
+
+class Subscription:
+    """One connected client: a bounded queue fed from any thread."""
+
+    OVERFLOW = object()  # queued instead of events once the client falls behind
+
+    def __init__(self, queue_size):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    def push(self, event):
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too slow to keep up: drop the backlog, tell the client to resync
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(self.OVERFLOW)
+
+    async def get(self, timeout):
+        """The next event, Subscription.OVERFLOW, or None after ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class LocalBroadcaster:
+    def __init__(self, buffer_size=1000, queue_size=1000):
+        self.queue_size = queue_size
+        # Ids are "<process epoch>-<sequence>": an id from another process
+        # (or from before a restart) is recognised as unknown
+        self.epoch = f"{time.time_ns():x}"
+        self._sequence = itertools.count(1)
+        self._buffer = deque(maxlen=buffer_size)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def publish(self, type, worker_id, data):
+        self.dispatch(Event(f"{self.epoch}-{next(self._sequence)}", type, worker_id, data))
+
+    def dispatch(self, event):
+        """Buffer ``event`` and hand it to every local subscriber."""
+        with self._lock:
+            self._buffer.append(event)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.push(event)
+
+    def subscribe(self, last_event_id=None):
+        """
+        Start receiving events (call from the event loop). Returns the
+        subscription and the buffered events after ``last_event_id``, or
+        None for those when they can't be replayed.
+        """
+        subscription = Subscription(self.queue_size)
+        with self._lock:
+            # Under the lock: nothing is published between the replay and
+            # the first queued event
+            self._subscribers.add(subscription)
+            missed = [] if not last_event_id else self._since(last_event_id)
+        return subscription, missed
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def last_event_id(self):
+        with self._lock:
+            return self._buffer[-1].id if self._buffer else f"{self.epoch}-0"
+
+    def _since(self, last_event_id):
+        epoch, _, sequence = last_event_id.rpartition("-")
+        if epoch != self.epoch or not sequence.isdigit():
+            return None
+        sequence = int(sequence)
+        missed = [e for e in self._buffer if int(e.id.rpartition("-")[2]) > sequence]
+        oldest = int(self._buffer[0].id.rpartition("-")[2]) if self._buffer else 1
+        if sequence + 1 < oldest:
+            return None  # part of the gap has left the buffer
+        return missed
+
+
+class RedisBroadcaster(LocalBroadcaster):
+    """
+    Fan-out through a Redis stream (XADD / XREAD), shared by all processes.
+    Event ids are the stream ids, so Last-Event-ID resumes on any process.
+    Needs the ``redis`` package.
+    """
+
+    def __init__(self, url, stream="project-events", buffer_size=1000, queue_size=1000):
+        super().__init__(buffer_size, queue_size)
+        import redis
+
+        self.redis = redis.Redis.from_url(url)
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self._listener = None
+
+    def publish(self, type, worker_id, data):
+        self.redis.xadd(
+            self.stream,
+            {"type": type, "worker_id": worker_id, "data": json.dumps(data, cls=JSONEncoder)},
+            maxlen=self.buffer_size, approximate=True,
+        )
+
+    def subscribe(self, last_event_id=None):
+        self._start_listener()
+        subscription, _ = super().subscribe()
+        missed = [] if not last_event_id else self._since(last_event_id)
+        return subscription, missed
+
+    def last_event_id(self):
+        entries = self.redis.xrevrange(self.stream, count=1)
+        return entries[0][0].decode() if entries else "0-0"
+
+    def _since(self, last_event_id):
+        # Replayed from Redis; events dispatched meanwhile may repeat, and
+        # clients apply events idempotently (they carry the full state)
+        try:
+            entries = self.redis.xrange(self.stream, min=f"({last_event_id}", count=self.buffer_size)
+            first = self.redis.xrange(self.stream, count=1)
+            if first and self._id_key(first[0][0].decode()) > self._id_key(last_event_id):
+                return None  # may have been trimmed past
+        except Exception:  # malformed id
+            return None
+        return [self._event(entry_id, fields) for entry_id, fields in entries]
+
+    @staticmethod
+    def _id_key(entry_id):
+        ms, _, seq = entry_id.partition("-")
+        return int(ms), int(seq or 0)
+
+    @staticmethod
+    def _event(entry_id, fields):
+        return Event(
+            entry_id.decode(), fields[b"type"].decode(), int(fields[b"worker_id"]), json.loads(fields[b"data"])
+        )
+
+    def _start_listener(self):
+        with self._lock:
+            if self._listener is not None:
+                return
+            self._listener = threading.Thread(target=self._listen, name="project-events", daemon=True)
+            self._listener.start()
+
+    def _listen(self):
+        last_id = self.last_event_id()
+        while True:
+            try:
+                response = self.redis.xread({self.stream: last_id}, block=5000, count=100)
+            except Exception:
+                time.sleep(1)
+                continue
+            for _, entries in response or ():
+                for entry_id, fields in entries:
+                    last_id = entry_id
+                    self.dispatch(self._event(entry_id, fields))
+
+
+_broadcaster = None
+_broadcaster_lock = threading.Lock()
+
+
+def get_broadcaster():
+    global _broadcaster
+    with _broadcaster_lock:
+        if _broadcaster is None:
+            backend = getattr(settings, "PROJECT_EVENTS_BACKEND", {})
+            cls = import_string(backend.get("BACKEND", "core.events.LocalBroadcaster"))
+            _broadcaster = cls(**backend.get("OPTIONS", {}))
+        return _broadcaster
+
+
+def publish(type, worker_id, data):
+    get_broadcaster().publish(type, worker_id, data)
+
+
+def publish_on_commit(type, worker_id, data):
+    """publish() once the current transaction commits (right away outside one)."""
+    transaction.on_commit(lambda: publish(type, worker_id, data))
+
+
+def status_changed_data(pk, worker_id, status, previous_status):
+    return {"id": pk, "worker": worker_id, "status": status, "previous_status": previous_status}
@@ -0,0 +1,163 @@
+"""
+Streaming project export, for GET /api/projects/export/ and
+``manage.py export_projects``.
+
+Rows are read in id order with ``values_list().iterator(chunk_size=...)``
+(a server-side cursor on PostgreSQL) and written out one chunk at a time,
+so memory stays flat however many projects there are:
+
+* ``csv`` / ``ndjson``: values as the API shows them (project_fast_serializer);
+* ``parquet``: typed columns, one row group per chunk. Needs ``pyarrow``.
+
+``fields`` picks a subset of ProjectSerializer's fields (like ?fields= on
+the list), and ``gzip`` compresses the stream as it is produced.
+"""
+import csv
+import io
+import zlib
+from itertools import islice
+
+from django.db import models
+from rest_framework.utils.encoders import JSONEncoder
+
+from .fast_serializers import project_fast_serializer
+from .models import Project
+
+FORMATS = {
+    # name: (content type, file extension)
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+CHUNK_SIZE = 2000  # rows per database fetch and per write
+
+
+class ExportUnavailable(Exception):
+    """The format needs a package that isn't installed."""
+
+
+def content_type(format, gzip=False):
+    return "application/gzip" if gzip else FORMATS[format][0]
+
+
+def filename(format, gzip=False):
+    return f"projects.{FORMATS[format][1]}" + (".gz" if gzip else "")
+
+
+def export(queryset, format="csv", fields=None, gzip=False, chunk_size=CHUNK_SIZE):
+    """
+    Iterator of bytes: the projects of ``queryset`` in ``format``. Raises
+    ExportUnavailable up front (not mid-stream) when the format can't be
+    written.
+    """
+    plan = project_fast_serializer.project(fields)
+    rows = queryset.order_by("id").values_list(*[source for _, source, _ in plan]).iterator(chunk_size=chunk_size)
+    chunks = _chunks(rows, chunk_size)
+    if format == "parquet":
+        stream = _parquet(chunks, plan, _arrow())
+    else:
+        stream = (_csv if format == "csv" else _ndjson)(chunks, fields, [name for name, _, _ in plan])
+    return _gzip(stream) if gzip else stream
+
+
+def _chunks(rows, size):
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _csv(chunks, fields, header):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for chunk in chunks:
+        for row in project_fast_serializer.serialize(chunk, fields):
+            writer.writerow(row.values())
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():  # header only: no projects
+        yield buffer.getvalue().encode()
+
+
+def _ndjson(chunks, fields, header):
+    encoder = JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    for chunk in chunks:
+        lines = [encoder.encode(row) for row in project_fast_serializer.serialize(chunk, fields)]
+        yield ("\n".join(lines) + "\n").encode()
+
+
+def _gzip(stream):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for data in stream:
+        compressed = compressor.compress(data)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def _arrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ExportUnavailable("Parquet export needs the pyarrow package") from e
+    return pyarrow
+
+
+def _arrow_type(pa, field):
+    if isinstance(field, (models.ForeignKey, models.BigIntegerField, models.AutoField)):
+        return pa.int64()
+    if isinstance(field, models.DateTimeField):
+        return pa.timestamp("us", tz="UTC")
+    if isinstance(field, models.DateField):
+        return pa.date32()
+    if isinstance(field, models.DecimalField):
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    if isinstance(field, models.IntegerField):
+        return pa.int64()
+    return pa.string()
+
+
+class _Sink(io.RawIOBase):
+    """Write-only file collecting what ParquetWriter writes until drained."""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def write(self, data):
+        data = bytes(data)
+        self.parts.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def drain(self):
+        data, self.parts = b"".join(self.parts), []
+        return data
+
+
+def _parquet(chunks, plan, pa):
+    schema = pa.schema([
+        (name, _arrow_type(pa, Project._meta.get_field(source))) for name, source, _ in plan
+    ])
+    sink = _Sink()
+    writer = pa.parquet.ParquetWriter(sink, schema, compression="snappy")
+    try:
+        for chunk in chunks:
+            columns = list(zip(*chunk))
+            writer.write_batch(pa.record_batch(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema
+            ))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
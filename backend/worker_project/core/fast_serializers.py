@@ -0,0 +1,145 @@
+import datetime
+import decimal
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import fields as drf_fields
+from rest_framework import relations
+from rest_framework.settings import ISO_8601, api_settings
+
+from . import metrics
+from .serializers import ProjectSerializer, UserSerializer
+
+
+class FastReadSerializer:
+    """
+    Read-only fast path for a flat ModelSerializer.
+
+    Instead of instantiating models and running every field's
+    to_representation, rows are read with values_list() and converted by a
+    field plan compiled once from the serializer's own fields. The output is
+    identical to ``serializer_class(instances, many=True).data``.
+
+    Only flat model fields are supported (no nested serializers, method
+    fields or dotted sources); anything else raises ImproperlyConfigured
+    when the plan is built.
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self._plan = None
+
+    @property
+    def plan(self):
+        # Built lazily: serializer fields need the app registry to be ready
+        if self._plan is None:
+            self._plan = [
+                (name, field.source, self.compile_field(field))
+                for name, field in self.serializer_class().fields.items()
+                if not field.write_only
+            ]
+        return self._plan
+
+    def compile_field(self, field):
+        """
+        Return a factory for the field's converter, or None when values pass
+        through unchanged. Factories are called once per serialize() call so
+        per-request state (the active timezone) is looked up once, not per row.
+        """
+        if field.source == "*" or "." in field.source:
+            raise ImproperlyConfigured(
+                f"{self.serializer_class.__name__}.{field.field_name} has no flat source "
+                "and can't be used with FastReadSerializer"
+            )
+
+        if isinstance(field, drf_fields.DateTimeField):
+            if getattr(field, "format", api_settings.DATETIME_FORMAT) != ISO_8601:
+                return lambda: field.to_representation
+            return lambda: self._datetime_converter(field)
+        if isinstance(field, drf_fields.DateField):
+            if getattr(field, "format", api_settings.DATE_FORMAT) != ISO_8601:
+                return lambda: field.to_representation
+            return lambda: datetime.date.isoformat
+        if isinstance(field, drf_fields.DecimalField):
+            convert = self._decimal_converter(field)
+            return lambda: convert
+        if isinstance(field, relations.PrimaryKeyRelatedField) and field.pk_field is None:
+            # values_list() already yields the related pk
+            return None
+        if isinstance(field, (drf_fields.ChoiceField, drf_fields.CharField, drf_fields.IntegerField)):
+            # Model values already have the representation's type
+            return None
+        if isinstance(field, relations.RelatedField):
+            raise ImproperlyConfigured(
+                f"{self.serializer_class.__name__}.{field.field_name}: only primary key "
+                "relations are supported by FastReadSerializer"
+            )
+        return lambda: field.to_representation
+
+    def _datetime_converter(self, field):
+        field_timezone = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+        if field_timezone is None:
+            return field.to_representation
+
+        def convert(value):
+            if timezone.is_aware(value):
+                value = value.astimezone(field_timezone)
+            else:
+                value = field.enforce_timezone(value)
+            value = value.isoformat()
+            if value.endswith("+00:00"):
+                value = value[:-6] + "Z"
+            return value
+        return convert
+
+    def _decimal_converter(self, field):
+        coerce_to_string = getattr(field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING)
+        if field.localize or field.normalize_output or not coerce_to_string:
+            return field.to_representation
+        if field.decimal_places is None:
+            return lambda value: f"{decimal.Decimal(value):f}"
+
+        quantum = decimal.Decimal(".1") ** field.decimal_places
+        context = decimal.getcontext().copy()
+        if field.max_digits is not None:
+            context.prec = field.max_digits
+        rounding = field.rounding
+
+        def convert(value):
+            return f"{value.quantize(quantum, rounding=rounding, context=context):f}"
+        return convert
+
+    def project(self, names=None):
+        """Return the plan restricted to ``names`` (keeping field order)."""
+        if not names:
+            return self.plan
+        return [entry for entry in self.plan if entry[0] in names]
+
+    def values(self, queryset, names=None, extra=()):
+        """
+        values_list() the columns needed for ``names`` (all fields by
+        default). ``extra`` columns are appended after them, e.g. a
+        pagination key, and are not part of the output.
+        """
+        columns = [source for _, source, _ in self.project(names)]
+        columns += [c for c in extra if c not in columns]
+        return queryset.values_list(*columns, named=True)
+
+    def serialize(self, rows, names=None):
+        plan = self.project(names)
+        keys = [name for name, _, _ in plan]
+        converters = [factory and factory() for _, _, factory in plan]
+        # Rows from values() are (plan columns..., extra columns...); zip()
+        # stops at the plan so extra columns are dropped
+        with metrics.timed("serializer"):
+            return [
+                dict(zip(keys, [
+                    value if convert is None or value is None else convert(value)
+                    for convert, value in zip(converters, row)
+                ]))
+                for row in rows
+            ]
+
+
+project_fast_serializer = FastReadSerializer(ProjectSerializer)
+user_fast_serializer = FastReadSerializer(UserSerializer)
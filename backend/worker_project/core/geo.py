@@ -0,0 +1,117 @@
+"""
+Spatial indexing for project locations without PostGIS.
+
+Each located project stores a ``geo_cell``: its latitude/longitude quantized
+to CELL_BITS bits per axis and bit-interleaved (longitude first), i.e. the
+integer form of a geohash. Any geohash prefix is a contiguous range of
+geo_cell values, so a bounding box can be covered by a handful of integer
+ranges that a plain B-tree index answers on SQLite and PostgreSQL alike.
+
+Queries then narrow down in three steps: geo_cell ranges (index), exact
+latitude/longitude bounds (bbox prefilter), and for radius searches an
+exact haversine distance in Python.
+"""
+import math
+
+from django.db.models import Q
+
+CELL_BITS = 26          # per axis: ~0.3 m latitude resolution
+MAX_COVER_CELLS = 16    # cells used to cover a bbox (before merging ranges)
+EARTH_RADIUS_M = 6_371_008.8
+METERS_PER_DEGREE_LAT = 111_320.0
+
+
+def _index(value, low, span, bits):
+    i = int((value - low) / span * (1 << bits))
+    return min(max(i, 0), (1 << bits) - 1)
+
+
+def _interleave(lng_index, lat_index, bits):
+    code = 0
+    for bit in range(bits - 1, -1, -1):
+        code = (code << 2) | (((lng_index >> bit) & 1) << 1) | ((lat_index >> bit) & 1)
+    return code
+
+
+def geo_cell(latitude, longitude):
+    """Return the geo_cell for a point, or None if it has no location."""
+    if latitude is None or longitude is None:
+        return None
+    lat_index = _index(float(latitude), -90.0, 180.0, CELL_BITS)
+    lng_index = _index(float(longitude), -180.0, 360.0, CELL_BITS)
+    return _interleave(lng_index, lat_index, CELL_BITS)
+
+
+def cover(south, west, north, east):
+    """
+    Return sorted, merged [start, stop) geo_cell ranges covering the bbox.
+
+    Picks the finest level at which the bbox spans at most MAX_COVER_CELLS
+    cells. Boxes crossing the antimeridian (west > east) are split in two.
+    """
+    if west > east:
+        return _merge(cover(south, west, north, 180.0) + cover(south, -180.0, north, east))
+
+    for level in range(CELL_BITS, 0, -1):
+        lat_lo = _index(south, -90.0, 180.0, level)
+        lat_hi = _index(north, -90.0, 180.0, level)
+        lng_lo = _index(west, -180.0, 360.0, level)
+        lng_hi = _index(east, -180.0, 360.0, level)
+        if (lat_hi - lat_lo + 1) * (lng_hi - lng_lo + 1) <= MAX_COVER_CELLS:
+            break
+
+    shift = 2 * (CELL_BITS - level)
+    ranges = []
+    for lat_index in range(lat_lo, lat_hi + 1):
+        for lng_index in range(lng_lo, lng_hi + 1):
+            prefix = _interleave(lng_index, lat_index, level)
+            ranges.append([prefix << shift, (prefix + 1) << shift])
+    return _merge(ranges)
+
+
+def _merge(ranges):
+    merged = []
+    for start, stop in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], stop)
+        else:
+            merged.append([start, stop])
+    return merged
+
+
+def bbox_q(south, west, north, east):
+    """Q object selecting projects inside the bbox (index ranges + exact bounds)."""
+    cells = Q()
+    for start, stop in cover(south, west, north, east):
+        cells |= Q(geo_cell__gte=start, geo_cell__lt=stop)
+
+    bounds = Q(latitude__gte=south, latitude__lte=north)
+    if west <= east:
+        bounds &= Q(longitude__gte=west, longitude__lte=east)
+    else:
+        bounds &= Q(longitude__gte=west) | Q(longitude__lte=east)
+    return cells & bounds
+
+
+def radius_bbox(latitude, longitude, radius_m):
+    """Bounding box (south, west, north, east) enclosing a circle."""
+    dlat = radius_m / METERS_PER_DEGREE_LAT
+    south, north = max(latitude - dlat, -90.0), min(latitude + dlat, 90.0)
+    cos_lat = math.cos(math.radians(max(abs(south), abs(north))))
+    if south <= -90.0 or north >= 90.0 or cos_lat < 1e-9:
+        return south, -180.0, north, 180.0  # circle reaches a pole
+    dlng = dlat / cos_lat
+    if dlng >= 180.0:
+        return south, -180.0, north, 180.0
+    west = (longitude - dlng + 180.0) % 360.0 - 180.0
+    east = (longitude + dlng + 180.0) % 360.0 - 180.0
+    return south, west, north, east
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    """Great-circle distance in meters."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
@@ -0,0 +1,274 @@
+"""
+Bulk import of workers and their projects from CSV or NDJSON, for
+``manage.py import_projects`` and POST /api/projects/import/.
+
+One input row per project, naming its worker by username:
+
+    worker,email,password,first_name,last_name,name,description,start_date,finish_date,status,latitude,longitude
+
+Workers that don't exist yet are created from their first row; rows
+without a project ``name`` only create the worker. Every column but
+``worker`` is optional.
+
+The input is read as a stream and handled CHUNK_SIZE rows at a time. Rows
+are checked with the model fields' own validation (no query per row),
+then each chunk is written with one bulk_create of new workers and one of
+projects, in a transaction that also advances the ImportJob. A crash
+loses at most the chunk in flight, and run() with the same job skips the
+rows already committed. Invalid rows are skipped and reported with their
+line number.
+
+Passwords: PBKDF2 costs about half a second per hash by design, so
+passwords from the file are validated (AUTH_PASSWORD_VALIDATORS) and
+hashed on a process pool: one per CPU for ``manage.py import_projects``,
+and for uploads one small pool per web process (shared_pool(),
+settings.IMPORT_HTTP_PROCESSES), so concurrent uploads don't each fork a
+CPU's worth of processes. Without a password, new workers get an
+unusable one and, with ``send_reset_emails``, a one-time reset link through
+the email outbox, which is what keeps a large onboarding fast.
+"""
+import csv
+import io
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+
+from . import outbox, response_cache
+from .models import ImportJob, Project, User
+from .serializers import password_reset_link
+
+FORMATS = ("csv", "ndjson")
+CHUNK_SIZE = 1000
+WORKER_COLUMNS = ("email", "first_name", "last_name")
+PROJECT_COLUMNS = ("name", "description", "start_date", "finish_date", "status", "latitude", "longitude")
+POOL_MIN_PASSWORDS = 4  # fewer than this are hashed in-process
+
+
+def format_for(filename):
+    """The format implied by a file name, or None."""
+    name = filename.lower().removesuffix(".gz")
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return None
+
+
+def read_rows(file, format):
+    """(line number, dict or None) for each row of a binary file; None for unparseable rows."""
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    if format == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else None
+
+
+def _text(row, column):
+    value = row.get(column)
+    return "" if value is None else str(value).strip()
+
+
+def hash_password(password, username, email="", first_name="", last_name=""):
+    """(hash, None), or (None, errors) when the password fails validation."""
+    user = User(username=username, email=email, first_name=first_name, last_name=last_name)
+    try:
+        validate_password(password, user)
+    except ValidationError as e:
+        return None, e.messages
+    return make_password(password), None
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def shared_pool():
+    """This process's hashing pool for uploads (settings.IMPORT_HTTP_PROCESSES), or None."""
+    global _shared_pool
+    if settings.IMPORT_HTTP_PROCESSES <= 1:
+        return None
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            # Spawned, not forked: a fork copies the web server's other
+            # threads' locks in whatever state they are. A spawned process
+            # starts without Django, and needs it to unpickle the tasks.
+            _shared_pool = ProcessPoolExecutor(
+                settings.IMPORT_HTTP_PROCESSES, mp_context=multiprocessing.get_context("spawn"),
+                initializer=django.setup,
+            )
+        return _shared_pool
+
+
+def _discard_shared_pool(pool):
+    # A pool whose process died refuses all work; the next upload starts a new one
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is pool:
+            _shared_pool = None
+    pool.shutdown(wait=False)
+
+
+def _hash_all(jobs, pool):
+    if pool is None or len(jobs) < POOL_MIN_PASSWORDS:
+        return [hash_password(*job) for job in jobs]
+    return list(pool.map(hash_password, *zip(*jobs), chunksize=4))
+
+
+class _Chunk:
+    def __init__(self):
+        self.errors = []        # {"line", "errors"}
+        self.new_workers = {}   # username -> User
+        self.projects = []      # (line, Project)
+        self.rows = 0
+
+
+def _validate(numbered_rows, existing, pool):
+    """Turn input rows into unsaved Users and Projects, collecting errors."""
+    chunk = _Chunk()
+    passwords = []  # (line, username, hash_password() arguments)
+    for line, row in numbered_rows:
+        chunk.rows += 1
+        if row is None:
+            chunk.errors.append({"line": line, "errors": {"row": ["Not a valid row"]}})
+            continue
+        username = _text(row, "worker")
+        worker = existing.get(username) or chunk.new_workers.get(username)
+        new_worker = worker is None
+        errors = {}
+        if not username:
+            errors["worker"] = ["This field is required."]
+        elif worker is not None and worker.role != "WORKER":
+            errors["worker"] = [f"User '{username}' is not a worker."]
+        elif new_worker:
+            worker = User(username=username, role="WORKER", **{c: _text(row, c) for c in WORKER_COLUMNS})
+            try:
+                worker.clean_fields(exclude={"password", "last_login", "date_joined"})
+            except ValidationError as e:
+                errors.update(e.message_dict)
+
+        project = None
+        if _text(row, "name"):
+            project = Project(**{c: _text(row, c) for c in PROJECT_COLUMNS if _text(row, c)})
+            try:
+                project.clean_fields(exclude={"worker"})
+            except ValidationError as e:
+                errors.update(e.message_dict)
+        if errors:
+            chunk.errors.append({"line": line, "errors": errors})
+            continue
+
+        if new_worker:
+            chunk.new_workers[username] = worker
+            password = _text(row, "password")
+            if password:
+                passwords.append((line, username, (password, username, *(_text(row, c) for c in WORKER_COLUMNS))))
+            else:
+                worker.set_unusable_password()
+        if project is not None:
+            project.worker = worker
+            chunk.projects.append((line, project))
+
+    # A worker whose password is rejected is dropped with their projects
+    hashed = _hash_all([job for _, _, job in passwords], pool)
+    rejected = {}  # username -> line
+    for (line, username, _), (password_hash, errors) in zip(passwords, hashed):
+        if errors:
+            chunk.errors.append({"line": line, "errors": {"password": errors}})
+            rejected[username] = line
+            del chunk.new_workers[username]
+        else:
+            chunk.new_workers[username].password = password_hash
+    if rejected:
+        kept = []
+        for line, project in chunk.projects:
+            username = project.worker.username
+            if username not in rejected:
+                kept.append((line, project))
+            elif line != rejected[username]:
+                chunk.errors.append({"line": line, "errors": {"worker": [f"Worker rejected on line {rejected[username]}."]}})
+        chunk.projects = kept
+    chunk.errors.sort(key=lambda e: e["line"])
+    return chunk
+
+
+def _write(chunk, job, send_reset_emails):
+    with transaction.atomic():
+        workers = User.objects.bulk_create(chunk.new_workers.values())
+        if workers:
+            # bulk_create skips the User signals; admin views list workers
+            response_cache.bump([w.pk for w in workers])
+        Project.objects.bulk_create([project for _, project in chunk.projects])
+        if send_reset_emails:
+            outbox.enqueue_many(
+                (
+                    "Worker Password Reset",
+                    f"Your account is ready. Set your password here: {password_reset_link(w)}",
+                    w.email,
+                )
+                for w in workers if w.email and not w.has_usable_password()
+            )
+        ImportJob.objects.filter(pk=job.pk).update(
+            rows_done=F("rows_done") + chunk.rows,
+            workers_created=F("workers_created") + len(workers),
+            projects_created=F("projects_created") + len(chunk.projects),
+            rows_rejected=F("rows_rejected") + len(chunk.errors),
+            last_error="",
+        )
+    job.refresh_from_db()
+
+
+def run(rows, job, chunk_size=CHUNK_SIZE, send_reset_emails=False, processes=None, pool=None):
+    """
+    Import ``rows`` (from read_rows()) into ``job``, skipping the
+    job.rows_done rows already imported. Yields (job, errors) after each
+    committed chunk. ``processes`` sizes the password hashing pool
+    (default: one per CPU; 0 hashes in-process); or hash on ``pool``, an
+    executor left running afterwards, e.g. shared_pool().
+    """
+    rows = islice(rows, job.rows_done, None)
+    own_pool = None
+    if pool is None:
+        processes = os.cpu_count() if processes is None else processes
+        if processes > 1:
+            pool = own_pool = ProcessPoolExecutor(processes, initializer=django.setup)
+    try:
+        while True:
+            numbered_rows = list(islice(rows, chunk_size))
+            if not numbered_rows:
+                break
+            usernames = {_text(row, "worker") for _, row in numbered_rows if row is not None}
+            existing = {u.username: u for u in User.objects.filter(username__in=usernames)}
+            chunk = _validate(numbered_rows, existing, pool)
+            _write(chunk, job, send_reset_emails)
+            yield job, chunk.errors
+    except Exception as e:
+        ImportJob.objects.filter(pk=job.pk).update(status="FAILED", last_error=f"{type(e).__name__}: {e}")
+        if isinstance(e, BrokenExecutor) and pool is not own_pool:
+            _discard_shared_pool(pool)
+        raise
+    finally:
+        if own_pool is not None:
+            own_pool.shutdown(cancel_futures=True)
+    ImportJob.objects.filter(pk=job.pk).update(status="DONE")
+    job.refresh_from_db()
+    yield job, []
@@ -0,0 +1,225 @@
+"""Shared helpers for the bench_* management commands."""
+import asyncio
+import json
+import random
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+from decimal import Decimal
+from urllib.parse import urlsplit
+
+from django.db import connection
+
+from core.models import User, Project
+
+WORDS = (
+    "bridge road tunnel school hospital roof wall pipe water sewer drain river "
+    "station depot tower park garden fence gate street avenue square market hall "
+    "library museum clinic office factory warehouse yard dock pier harbor canal "
+    "repair renovation extension survey inspection paving lighting cabling "
+    "plumbing painting demolition foundation insulation drainage maintenance "
+    "north south east west central old new upper lower main grand little"
+).split()
+
+REFUSED_PAUSE = 1.0  # seconds a virtual user waits after a 429/503 (the API's minimum Retry-After)
+
+
+@contextmanager
+def throwaway_database():
+    """Run against a fresh test database, so benchmarks never touch real data."""
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def make_workers(count, prefix="bench-worker"):
+    return User.objects.bulk_create([User(username=f"{prefix}-{i}") for i in range(count)])
+
+
+def make_projects(workers, count, seed=0, batch_size=5000):
+    """Create ``count`` projects spread over ``workers``, with varied text and locations."""
+    rng = random.Random(seed)
+    statuses = [s for s, _ in Project.STATUS_CHOICES]
+    for start in range(0, count, batch_size):
+        Project.objects.bulk_create([
+            Project(
+                worker=workers[i % len(workers)],
+                name=" ".join(rng.choices(WORDS, k=3)).title() + f" {i}",
+                description=" ".join(rng.choices(WORDS, k=rng.randint(8, 20))),
+                start_date=date(2025, 1, 1) + timedelta(days=i % 365),
+                finish_date=date(2025, 6, 1) + timedelta(days=i % 365),
+                status=statuses[i % len(statuses)],
+                latitude=Decimal(f"{rng.uniform(34, 42):.6f}"),
+                longitude=Decimal(f"{rng.uniform(19, 29):.6f}"),
+            )
+            for i in range(start, min(start + batch_size, count))
+        ])
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def _http_request(reader, writer, method, target, headers, body=b""):
+    """One HTTP/1.1 request on a keep-alive connection; returns (status code, body)."""
+    if body:
+        headers = {**headers, "Content-Length": len(body)}
+    lines = [f"{method} {target} HTTP/1.1", *(f"{k}: {v}" for k, v in headers.items()), "", ""]
+    writer.write("\r\n".join(lines).encode() + body)
+    status = int((await reader.readline()).split()[1])
+    length, chunked = 0, False
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        name = name.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "transfer-encoding" and "chunked" in value.lower():
+            chunked = True
+    if chunked:
+        parts = []
+        while size := int((await reader.readline()).split(b";")[0], 16):
+            parts.append((await reader.readexactly(size + 2))[:-2])
+        await reader.readline()
+        return status, b"".join(parts)
+    return status, await reader.readexactly(length)
+
+
+async def http_load(url, headers=None, method="GET", concurrency=32, duration=10.0):
+    """
+    Hammer ``url`` with ``concurrency`` keep-alive connections for ``duration``
+    seconds (stdlib only, plain http). Returns (latencies in seconds, errors, elapsed).
+    """
+    parts = urlsplit(url)
+    target = parts.path + (f"?{parts.query}" if parts.query else "")
+    headers = {"Host": parts.netloc, "Connection": "keep-alive", **(headers or {})}
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+        try:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    status, _ = await _http_request(reader, writer, method, target, headers)
+                except (OSError, ValueError, IndexError, asyncio.IncompleteReadError):
+                    errors += 1
+                    writer.close()
+                    reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+                    continue
+                if status >= 400:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+async def http_scenario(root, credentials, tasks, users=16, duration=10.0, seed=0):
+    """
+    Locust-style load on ``root`` (an API root URL): ``users`` virtual users,
+    each on its own keep-alive connection, log in at /api/login/ with
+    ``credentials`` (a dict, or a function of the user's number returning
+    one) and then pick ``tasks`` by weight until ``duration`` seconds have
+    passed.
+
+    ``tasks`` maps a name to (weight, request, on_response): ``request(rng,
+    state)`` returns (method, path below ``root`` or from the host's root if
+    it starts with "/", JSON body or None), or None
+    when the task can't run yet; ``on_response(state, data)`` (or None) sees
+    the parsed body of each success. ``state`` is the virtual user's own dict,
+    starting with its "credentials". Returns ({name: latencies in seconds},
+    {name: errors}, {name: refusals}, first_logins, elapsed), with the logins
+    reported as "login" and first_logins the number of users whose first
+    login attempt was not refused. Refusals (429, 503: throttled or shed)
+    are not errors and their latencies aren't counted; the user pauses
+    REFUSED_PAUSE seconds after one and logins are retried.
+    """
+    parts = urlsplit(root)
+    names = list(tasks)
+    weights = [tasks[name][0] for name in names]
+    latencies = {name: [] for name in ["login", *names]}
+    errors = dict.fromkeys(latencies, 0)
+    refused = dict.fromkeys(latencies, 0)
+    first_logins = 0
+    deadline = time.perf_counter() + duration
+
+    async def user(number):
+        nonlocal first_logins
+        rng = random.Random(seed + number)
+        headers = {"Host": parts.netloc, "Connection": "keep-alive"}
+        connection = None
+        was_refused = False  # this user's last call (the shared counts move with the others')
+
+        async def call(name, method, path, body):
+            nonlocal connection, was_refused
+            was_refused = False
+            request_headers = dict(headers)
+            payload = b""
+            if body is not None:
+                payload = json.dumps(body).encode()
+                request_headers["Content-Type"] = "application/json"
+            start = time.perf_counter()
+            try:
+                if connection is None:
+                    connection = await asyncio.open_connection(parts.hostname, parts.port or 80)
+                status, content = await _http_request(*connection, method, path, request_headers, payload)
+            except (OSError, ValueError, IndexError, asyncio.IncompleteReadError):
+                errors[name] += 1
+                if connection is not None:
+                    connection[1].close()
+                connection = None
+                return None
+            if status in (429, 503):
+                refused[name] += 1
+                was_refused = True
+                await asyncio.sleep(REFUSED_PAUSE)  # as a client honouring Retry-After would
+                return None
+            if status >= 400:
+                errors[name] += 1
+                return None
+            latencies[name].append(time.perf_counter() - start)
+            return json.loads(content) if content else {}
+
+        try:
+            own = credentials(number) if callable(credentials) else credentials
+            token = await call("login", "POST", "/api/login/", own)
+            first_logins += not was_refused
+            # Refused: try again, until logged in, failed or out of time
+            while token is None and was_refused and time.perf_counter() < deadline:
+                token = await call("login", "POST", "/api/login/", own)
+            if token is None:
+                return
+            headers["Authorization"] = f"Bearer {token['access']}"
+            state = {"credentials": own}
+            while time.perf_counter() < deadline:
+                name = rng.choices(names, weights)[0]
+                _, request, on_response = tasks[name]
+                planned = request(rng, state)
+                if planned is None:
+                    await asyncio.sleep(0)
+                    continue
+                method, path, body = planned
+                data = await call(name, method, path if path.startswith("/") else parts.path + path, body)
+                if data is not None and on_response is not None:
+                    on_response(state, data)
+        finally:
+            if connection is not None:
+                connection[1].close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user(i) for i in range(users)))
+    return latencies, errors, refused, first_logins, time.perf_counter() - start
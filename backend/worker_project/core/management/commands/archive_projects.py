@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Move projects completed and unchanged for --days to the archive table, "
+        "in chunked transactions. Run it daily (cron) to keep the projects table "
+        "to live work; archived projects are served with ?include_archived=1."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=settings.ARCHIVE_AFTER_DAYS,
+            help="Archive projects completed more than this many days ago (default: ARCHIVE_AFTER_DAYS)",
+        )
+        parser.add_argument("--chunk-size", type=int, default=archive.CHUNK_SIZE, help="Projects per transaction")
+
+    def handle(self, *args, **options):
+        moved = archive.archive_completed(timedelta(days=options["days"]), chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} projects"))
@@ -0,0 +1,152 @@
+import json
+import platform
+import random
+from pathlib import Path
+from urllib.parse import urlencode
+
+import django
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.models import Project, User
+from core.serializers import ProjectSerializer
+from core.views import ProjectViewSet
+
+from ._bench import make_projects, make_workers, percentile, throwaway_database, timed
+
+BASELINE = Path(settings.BASE_DIR) / "benchmarks" / "baseline.json"
+
+
+class Command(BaseCommand):
+    help = (
+        "Microbenchmarks of the project API (serializer, get_queryset and the main "
+        "endpoints, uncached) on a throwaway database of N workers x M projects. "
+        "--save records the results as a baseline; --compare fails when a case runs "
+        "more queries than its baseline or gets slower than --tolerance times it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=20)
+        parser.add_argument("--projects-per-worker", type=int, default=250)
+        parser.add_argument("--repeat", type=int, default=30, help="Runs per case")
+        parser.add_argument("--case", action="append", help="Only these cases")
+        parser.add_argument("--save", nargs="?", const=BASELINE, type=Path, metavar="PATH")
+        parser.add_argument("--compare", nargs="?", const=BASELINE, type=Path, metavar="PATH")
+        parser.add_argument("--tolerance", type=float, default=1.5, help="Allowed p50 slowdown factor")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["compare"]:
+            try:
+                baseline = json.loads(options["compare"].read_text())
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Can't read baseline {options['compare']}: {e}")
+
+        # The test client's requests come from "testserver"
+        with throwaway_database(), override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            workers = make_workers(options["workers"])
+            make_projects(workers, options["workers"] * options["projects_per_worker"])
+            cases = self.cases(workers)
+            selected = options["case"] or list(cases)
+            unknown = set(selected) - set(cases)
+            if unknown:
+                raise CommandError(f"Unknown case(s): {', '.join(sorted(unknown))}; choose from {', '.join(cases)}")
+            results = {name: self.measure(cases[name], options["repeat"]) for name in selected}
+
+        self.stdout.write(f"{'case':<22} {'p50 ms':>8} {'p95 ms':>8} {'queries':>8}")
+        for name, result in results.items():
+            self.stdout.write(f"{name:<22} {result['p50_ms']:8.2f} {result['p95_ms']:8.2f} {result['queries']:8d}")
+
+        report = {
+            "environment": {
+                "workers": options["workers"],
+                "projects_per_worker": options["projects_per_worker"],
+                "database": connection.vendor,
+                "python": platform.python_version(),
+                "django": django.get_version(),
+            },
+            "results": results,
+        }
+        if options["save"]:
+            options["save"].parent.mkdir(parents=True, exist_ok=True)
+            options["save"].write_text(json.dumps(report, indent=2) + "\n")
+            self.stdout.write(f"Saved {options['save']}")
+        if baseline is not None:
+            self.compare(baseline, report, options["tolerance"])
+
+    def cases(self, workers):
+        """name -> function running one request (or call) and returning its output."""
+        admin = User.objects.create(username="bench-admin", role="ADMIN")
+        worker = workers[0]
+        project = Project.objects.filter(worker=worker).first()
+        word = project.name.split()[0]
+        admin_client, worker_client = APIClient(), APIClient()
+        admin_client.force_authenticate(admin)
+        worker_client.force_authenticate(worker)
+        factory = APIRequestFactory()
+
+        def get_queryset(user):
+            request = Request(factory.get("/api/projects/"))
+            request.user = user
+            view = ProjectViewSet(request=request, action="list", format_kwarg=None, kwargs={})
+            return list(view.get_queryset().order_by("-created_at", "-id")[:50])
+
+        def get(client, url):
+            response = client.get(url)
+            if response.status_code != 200:
+                raise CommandError(f"GET {url}: {response.status_code}")
+            return response
+
+        rng = random.Random(0)
+        statuses = [s for s, _ in Project.STATUS_CHOICES]
+        return {
+            "serializer_page": lambda: ProjectSerializer(Project.objects.order_by("id")[:100], many=True).data,
+            "get_queryset_worker": lambda: get_queryset(worker),
+            "get_queryset_admin": lambda: get_queryset(admin),
+            "list_worker": lambda: get(worker_client, "/api/projects/"),
+            "list_admin": lambda: get(admin_client, "/api/projects/"),
+            "retrieve": lambda: get(worker_client, f"/api/projects/{project.pk}/"),
+            "search": lambda: get(worker_client, f"/api/projects/search/?{urlencode({'name': project.name})}"),
+            "fulltext": lambda: get(admin_client, f"/api/projects/fulltext/?q={word}"),
+            "grouped_projects": lambda: get(admin_client, "/api/projects/grouped_projects/"),
+            "stats": lambda: get(admin_client, "/api/projects/stats/"),
+            "update_status": lambda: worker_client.patch(
+                f"/api/projects/{project.pk}/update_status/", {"status": rng.choice(statuses)}
+            ),
+        }
+
+    def measure(self, func, repeat):
+        times = []
+        for _ in range(repeat):
+            caches["api"].clear()  # measure the work, not the response cache
+            times.append(timed(func) * 1000)
+        caches["api"].clear()
+        with CaptureQueriesContext(connection) as queries:
+            func()
+        return {"p50_ms": round(percentile(times, 50), 3), "p95_ms": round(percentile(times, 95), 3),
+                "queries": len(queries)}
+
+    def compare(self, baseline, report, tolerance):
+        if baseline.get("environment") != report["environment"]:
+            self.stdout.write(self.style.WARNING(
+                f"Baseline environment differs: {baseline.get('environment')}; timings may not be comparable"
+            ))
+        regressions = []
+        for name, result in report["results"].items():
+            before = baseline.get("results", {}).get(name)
+            if before is None:
+                continue
+            if result["queries"] > before["queries"]:
+                regressions.append(f"{name}: {result['queries']} queries, baseline {before['queries']}")
+            if result["p50_ms"] > before["p50_ms"] * tolerance:
+                regressions.append(
+                    f"{name}: p50 {result['p50_ms']:.2f} ms, baseline {before['p50_ms']:.2f} ms (x{tolerance:g} allowed)"
+                )
+        if regressions:
+            raise CommandError("Regressions against the baseline:\n  " + "\n  ".join(regressions))
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
@@ -0,0 +1,131 @@
+import os
+import random
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction
+
+from core.models import Project
+
+from ._bench import make_projects, make_workers, percentile, throwaway_database
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the database profile under concurrent mixed load: writer "
+        "threads change project statuses and bulk-create projects while reader "
+        "threads page through project lists. On SQLite it compares the tuned "
+        "settings (WAL etc.) with SQLite's defaults. Runs on throwaway test databases."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--projects", type=int, default=20_000)
+        parser.add_argument("--workers", type=int, default=50)
+        parser.add_argument("--writers", type=int, default=4)
+        parser.add_argument("--readers", type=int, default=4)
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds per profile")
+
+    def handle(self, *args, **options):
+        db = connection.settings_dict
+        if connection.vendor == "sqlite":
+            profiles = [("sqlite defaults", {}), ("sqlite tuned", db["OPTIONS"])]
+        else:
+            profiles = [(connection.vendor, db["OPTIONS"])]
+
+        self.stdout.write(
+            f"{options['projects']:,} projects, {options['writers']} writers + "
+            f"{options['readers']} readers, {options['duration']:g} s per profile"
+        )
+        for label, db_options in profiles:
+            with self.profile(db_options), throwaway_database():
+                workers = make_workers(options["workers"])
+                make_projects(workers, options["projects"])
+                result = self.run(workers, options)
+            self.report(label, result, options["duration"])
+
+    @contextmanager
+    def profile(self, db_options):
+        """Connect with ``db_options``; SQLite test databases go to a file so threads share them."""
+        db = connection.settings_dict
+        saved_options, saved_test = db["OPTIONS"], dict(db["TEST"])
+        connection.close()
+        db["OPTIONS"] = db_options
+        with tempfile.TemporaryDirectory() as tmp:
+            if connection.vendor == "sqlite":
+                db["TEST"]["NAME"] = os.path.join(tmp, "bench.sqlite3")
+            try:
+                yield
+            finally:
+                connection.close()
+                db["OPTIONS"], db["TEST"] = saved_options, saved_test
+
+    def run(self, workers, options):
+        ids = list(Project.objects.values_list("id", flat=True))
+        worker_ids = [w.pk for w in workers]
+        statuses = [s for s, _ in Project.STATUS_CHOICES]
+        results = {"write": [], "read": [], "errors": 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options["duration"]
+
+        def write(rng):
+            if rng.random() < 0.8:
+                # What update_status does
+                project = Project.objects.get(pk=rng.choice(ids))
+                project.status = rng.choice(statuses)
+                project.save(update_fields=["status"])
+            else:
+                # What bulk_create does
+                worker_id = rng.choice(worker_ids)
+                with transaction.atomic():
+                    Project.objects.bulk_create([
+                        Project(worker_id=worker_id, name=f"Bench {rng.random()}", status="PENDING")
+                        for _ in range(10)
+                    ])
+
+        def read(rng):
+            projects = Project.objects.filter(worker_id=rng.choice(worker_ids))
+            list(projects.order_by("-created_at", "-id").values_list("id", "name", "status")[:50])
+            projects.count()
+
+        def loop(kind, op, seed):
+            rng = random.Random(seed)
+            latencies, errors = [], 0
+            try:
+                while time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    try:
+                        op(rng)
+                    except OperationalError:  # "database is locked"
+                        errors += 1
+                        continue
+                    latencies.append(time.perf_counter() - start)
+            finally:
+                connection.close()
+            with lock:
+                results[kind] += latencies
+                results["errors"] += errors
+
+        threads = [
+            threading.Thread(target=loop, args=("write", write, i)) for i in range(options["writers"])
+        ] + [
+            threading.Thread(target=loop, args=("read", read, 100 + i)) for i in range(options["readers"])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def report(self, label, result, duration):
+        line = [f"{label:<16}"]
+        for kind in ("write", "read"):
+            times = [t * 1000 for t in result[kind]] or [0]
+            line.append(
+                f"{kind}s {len(result[kind]) / duration:8.1f}/s  p50 {percentile(times, 50):7.2f} ms  "
+                f"p95 {percentile(times, 95):7.2f} ms"
+            )
+        line.append(f"errors {result['errors']}")
+        self.stdout.write("   ".join(line))
@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from core import compression, renderers
+from core.models import Project
+from core.serializers import ProjectSerializer
+
+from ._bench import make_projects, make_workers, percentile, throwaway_database, timed
+
+
+class Command(BaseCommand):
+    help = (
+        "Encode time and size of N projects with DRF's JSONRenderer (the old "
+        "output), FastJSONRenderer and MessagePackRenderer, and of the JSON "
+        "gzip/brotli-compressed as CompressionMiddleware sends it. Payloads: "
+        "the API's serialized projects, and raw rows (Decimal, date, datetime). "
+        "Runs on a throwaway database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--projects", type=int, default=10_000)
+        parser.add_argument("--workers", type=int, default=50)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            make_projects(make_workers(options["workers"]), options["projects"])
+            payloads = {
+                "serialized": ProjectSerializer(Project.objects.order_by("id"), many=True).data,
+                "rows": list(Project.objects.order_by("id").values()),
+            }
+
+        encoders = {"drf json": JSONRenderer(), "orjson": renderers.FastJSONRenderer()}
+        try:
+            import msgpack  # noqa: F401
+            encoders["msgpack"] = renderers.MessagePackRenderer()
+        except ImportError:
+            self.stdout.write("msgpack is not installed: skipping MessagePackRenderer")
+        encodings = ["gzip"] + (["br"] if compression.brotli is not None else [])
+        if compression.brotli is None:
+            self.stdout.write("brotli is not installed: skipping brotli")
+
+        self.stdout.write(f"{options['projects']:,} projects, {options['repeat']} runs each")
+        self.stdout.write(f"{'payload':<11} {'encoding':<16} {'p50 ms':>8} {'p95 ms':>8} {'bytes':>11} {'vs drf':>7}")
+        for name, data in payloads.items():
+            baseline = JSONRenderer().render(data)
+            for label, renderer in encoders.items():
+                content = renderer.render(data)
+                self.row(name, label, self.measure(lambda: renderer.render(data), options["repeat"]),
+                         len(content), len(baseline))
+                if isinstance(renderer, JSONRenderer) and content != baseline:
+                    self.stdout.write(self.style.ERROR(f"{name}: {label} output differs from DRF's JSONRenderer"))
+            for encoding in encodings:
+                size = len(compression.compress(baseline, encoding))
+                self.row(name, f"json + {encoding}",
+                         self.measure(lambda: compression.compress(baseline, encoding), options["repeat"]),
+                         size, len(baseline))
+
+    def measure(self, func, repeat):
+        return [timed(func) * 1000 for _ in range(repeat)]
+
+    def row(self, payload, label, times, size, baseline_size):
+        self.stdout.write(
+            f"{payload:<11} {label:<16} {percentile(times, 50):8.2f} {percentile(times, 95):8.2f} "
+            f"{size:11,d} {size / baseline_size:7.2f}"
+        )
@@ -0,0 +1,56 @@
+import random
+
+from django.core.management.base import BaseCommand
+
+from core import search
+from core.models import Project
+
+from ._bench import WORDS, make_projects, make_workers, percentile, throwaway_database, timed
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark full-text search (core.search) against the name__iexact lookup "
+        "the search endpoint used before. Runs on a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--projects", type=int, default=200_000)
+        parser.add_argument("--workers", type=int, default=200)
+        parser.add_argument("--queries", type=int, default=200)
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            workers = make_workers(options["workers"])
+            make_projects(workers, options["projects"])
+            self.run(workers, options["queries"])
+
+    def run(self, workers, n_queries):
+        rng = random.Random(1)
+        sample = list(Project.objects.order_by("?").values_list("worker_id", "name")[:n_queries])
+        total = Project.objects.count()
+
+        def typo(word):
+            i = rng.randrange(len(word) - 1)
+            return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+        cases = [
+            ("iexact, own projects (old)", lambda w, name: list(
+                Project.objects.filter(worker_id=w, name__iexact=name.upper()))),
+            ("iexact, all projects", lambda w, name: list(
+                Project.objects.filter(name__iexact=name.upper()))),
+            ("fulltext prefix, own", lambda w, name: search.search(
+                name.split()[0][:4], worker_id=w)),
+            ("fulltext 2 words, all", lambda w, name: search.search(
+                " ".join(name.split()[:2]))),
+            ("fulltext substring, all", lambda w, name: search.search(
+                name.split()[1][1:5])),
+            ("fulltext typo, all", lambda w, name: search.search(
+                typo(rng.choice([x for x in WORDS if len(x) >= 6])))),
+        ]
+        self.stdout.write(f"{total:,} projects, {len(sample)} queries per case")
+        for label, func in cases:
+            times = [timed(lambda: func(w, name)) * 1000 for w, name in sample]
+            self.stdout.write(
+                f"{label:<28} p50 {percentile(times, 50):7.2f} ms   p95 {percentile(times, 95):7.2f} ms"
+            )
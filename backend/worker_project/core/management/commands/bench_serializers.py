@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from core.fast_serializers import project_fast_serializer
+from core.models import Project
+from core.serializers import ProjectSerializer
+
+from ._bench import make_projects, make_workers, throwaway_database, timed
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark ProjectSerializer against the fast read path. "
+        "Runs on a throwaway test database, never on your real data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--projects", type=int, default=100_000)
+        parser.add_argument("--workers", type=int, default=100)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            make_projects(make_workers(options["workers"]), options["projects"])
+            self.run(options["repeat"])
+
+    def run(self, repeat):
+        queryset = Project.objects.order_by("id")
+        count = queryset.count()
+
+        def slow():
+            return ProjectSerializer(queryset.all(), many=True).data
+
+        def fast():
+            return project_fast_serializer.serialize(project_fast_serializer.values(queryset.all()))
+
+        renderer = JSONRenderer()
+        if renderer.render(slow()) != renderer.render(fast()):
+            self.stderr.write(self.style.ERROR("Fast path output differs from ProjectSerializer"))
+            return
+
+        results = {}
+        for label, func in (("ProjectSerializer", slow), ("fast path", fast)):
+            best = min(timed(func) for _ in range(repeat))
+            results[label] = count / best
+            self.stdout.write(f"{label:<18} {best:8.3f}s  {results[label]:>12,.0f} rows/s")
+        self.stdout.write(self.style.SUCCESS(
+            f"{count:,} projects, output identical, "
+            f"speedup x{results['fast path'] / results['ProjectSerializer']:.1f}"
+        ))
@@ -0,0 +1,51 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import export
+from core.models import Project
+from core.serializers import ProjectSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Export projects as CSV, NDJSON or Parquet, streamed in chunks so memory "
+        "use doesn't grow with the number of projects."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=list(export.FORMATS), default="csv")
+        parser.add_argument(
+            "--fields", help="Comma-separated project fields (default: all). Unknown names are ignored",
+        )
+        parser.add_argument("--gzip", action="store_true", help="Compress the output with gzip")
+        parser.add_argument("--worker", type=int, help="Only this worker's projects")
+        parser.add_argument("--chunk-size", type=int, default=export.CHUNK_SIZE)
+        parser.add_argument("-o", "--output", help="File to write (default: stdout)")
+
+    def handle(self, *args, **options):
+        fields = None
+        if options["fields"]:
+            fields = {f.strip() for f in options["fields"].split(",")} & set(ProjectSerializer.Meta.fields)
+            if not fields:
+                raise CommandError(f"No known fields in --fields; choose from {', '.join(ProjectSerializer.Meta.fields)}")
+
+        projects = Project.objects.all()
+        if options["worker"] is not None:
+            projects = projects.filter(worker_id=options["worker"])
+        try:
+            stream = export.export(
+                projects, options["format"], fields, gzip=options["gzip"], chunk_size=options["chunk_size"]
+            )
+        except export.ExportUnavailable as e:
+            raise CommandError(str(e))
+
+        out = open(options["output"], "wb") if options["output"] else sys.stdout.buffer
+        try:
+            for data in stream:
+                out.write(data)
+        finally:
+            if options["output"]:
+                out.close()
+            else:
+                out.flush()
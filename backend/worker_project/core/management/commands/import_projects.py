@@ -0,0 +1,74 @@
+import gzip
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import imports
+from core.models import ImportJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Import workers and their projects from a CSV or NDJSON file (optionally "
+        "gzipped), committed in chunks. Rerun with --resume JOB to continue an "
+        "interrupted import. See core.imports for the columns."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, or - for stdin")
+        parser.add_argument("--format", choices=imports.FORMATS, help="Default: from the file name")
+        parser.add_argument("--chunk-size", type=int, default=imports.CHUNK_SIZE)
+        parser.add_argument(
+            "--processes", type=int, default=None,
+            help="Password hashing processes (default: one per CPU; 0 hashes in-process)",
+        )
+        parser.add_argument(
+            "--send-reset-emails", action="store_true",
+            help="Email new workers without a password a one-time reset link",
+        )
+        parser.add_argument("--resume", type=int, metavar="JOB", help="Continue this import job")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        format = options["format"] or imports.format_for(path)
+        if format is None:
+            raise CommandError("Can't tell the format from the file name; pass --format")
+
+        if options["resume"] is not None:
+            try:
+                job = ImportJob.objects.get(pk=options["resume"])
+            except ImportJob.DoesNotExist:
+                raise CommandError(f"No import job {options['resume']}")
+            if job.status == "DONE":
+                raise CommandError(f"Import job {job.pk} is already done")
+            self.stdout.write(f"Resuming import job {job.pk} after row {job.rows_done}")
+        else:
+            job = ImportJob.objects.create(source=path)
+            self.stdout.write(f"Import job {job.pk} (resume with --resume {job.pk})")
+
+        if path == "-":
+            file = sys.stdin.buffer
+        else:
+            file = gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+        start, start_rows = time.perf_counter(), job.rows_done
+        try:
+            updates = imports.run(
+                imports.read_rows(file, format), job,
+                chunk_size=options["chunk_size"],
+                send_reset_emails=options["send_reset_emails"],
+                processes=options["processes"],
+            )
+            for job, errors in updates:
+                for error in errors:
+                    for field, messages in error["errors"].items():
+                        self.stderr.write(f"line {error['line']}: {field}: {' '.join(messages)}")
+                rate = (job.rows_done - start_rows) / max(time.perf_counter() - start, 1e-9) * 60
+                self.stdout.write(
+                    f"{job.rows_done} rows: {job.workers_created} workers, {job.projects_created} projects, "
+                    f"{job.rows_rejected} rejected ({rate:,.0f} rows/min)"
+                )
+        finally:
+            if file is not sys.stdin.buffer:
+                file.close()
+        self.stdout.write(self.style.SUCCESS(f"Import job {job.pk} done"))
@@ -0,0 +1,195 @@
+import asyncio
+import json
+import secrets
+from urllib.parse import quote, urlsplit
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ._bench import http_load, http_scenario, percentile
+
+ENDPOINTS = {
+    # name: (method, path below the deployment's API root)
+    "list": ("GET", "projects/?page_size=50"),
+    "search": ("GET", "projects/search/?name={name}"),
+    "grouped": ("GET", "projects/grouped_projects/"),
+}
+
+STATUSES = ("PENDING", "IN_PROGRESS", "COMPLETED")
+
+
+def _list(rng, state):
+    return "GET", "projects/?page_size=50&fields=id,status", None
+
+
+def _remember_ids(state, data):
+    state["ids"] = [project["id"] for project in data["results"]]
+
+
+def _update_status(rng, state):
+    if not state.get("ids"):
+        return None  # after the first list
+    return "PATCH", f"projects/{rng.choice(state['ids'])}/update_status/", {"status": rng.choice(STATUSES)}
+
+
+def _login(rng, state):
+    return "POST", "/api/login/", state["credentials"]
+
+
+def _list_page(rng, state):
+    return "GET", "projects/?page_size=50", None
+
+
+def _remember_names(state, data):
+    state["names"] = [project["name"] for project in data["results"]]
+
+
+def _search(rng, state):
+    if not state.get("names"):
+        return None
+    return "GET", f"projects/search/?name={quote(rng.choice(state['names']))}", None
+
+
+def _register(rng, state):
+    # New on every run; the password must pass AUTH_PASSWORD_VALIDATORS, or
+    # every sign-up is a cheap 400 instead of a password hash
+    credentials = {"username": f"loadtest-{secrets.token_hex(6)}", "password": secrets.token_urlsafe(12)}
+    return "POST", "/api/register/worker/", credentials
+
+
+SCENARIOS = {
+    # name: {task: (weight, request, on_response)}, see _bench.http_scenario
+    "mixed": {
+        "list": (3, _list, _remember_ids),
+        "update_status": (1, _update_status, None),
+    },
+    # Shift start: everyone logs in and loads the list; some search or sign
+    # up, which core.admission sheds first
+    "shift": {
+        "login": (2, _login, None),
+        "list": (4, _list_page, _remember_names),
+        "search": (1, _search, None),
+        "register": (1, _register, None),
+    },
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test running deployments and compare req/s and latency. Start the servers first, e.g.\n"
+        "  SERVER_PROCESSES=4 SERVER_THREADS=8 gunicorn worker_project.wsgi -w 4 --threads 8 -b 127.0.0.1:8000\n"
+        "  uvicorn worker_project.asgi:application --workers 4 --port 8001\n"
+        "then: manage.py loadtest --target wsgi=http://127.0.0.1:8000/api/ "
+        "--target asgi=http://127.0.0.1:8001/api/async/ --login worker:password\n"
+        "--scenario runs virtual users instead, each logging in and then mixing list "
+        "and update_status requests (log in as a worker that has projects). "
+        "--scenario shift is a shift start: logins and project lists, with searches "
+        "and sign-ups (which create users) on the side; give USERNAME a {n} to log "
+        "each virtual user in as its own worker (worker{n}: worker0, worker1...). "
+        "Throttled or shed requests (429, 503) are counted as refused, other 4xx/5xx "
+        "as errors; neither counts in req/s or latencies. Scenarios also report the "
+        "share of virtual users whose first login wasn't refused. "
+        "Compare ADMISSION_ENABLED=0 and 1 on the server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target", action="append", required=True, metavar="NAME=API_ROOT",
+            help="Deployment to test: a name and the URL the endpoint paths are relative to",
+        )
+        parser.add_argument("--login", required=True, metavar="USERNAME:PASSWORD",
+                            help="Credentials for /api/login/ on the first target's host")
+        parser.add_argument("--endpoint", action="append", choices=sorted(ENDPOINTS))
+        parser.add_argument("--name", default="", help="?name= for the search endpoint")
+        parser.add_argument("--concurrency", type=int, default=32, help="Connections, or virtual users with --scenario")
+        parser.add_argument(
+            "--scenario", nargs="?", const="mixed", choices=sorted(SCENARIOS),
+            help="Run virtual users through a scenario (default: mixed, login/list/update_status)",
+        )
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds per endpoint and target")
+
+    def handle(self, *args, **options):
+        targets = []
+        for raw in options["target"]:
+            name, sep, root = raw.partition("=")
+            if not sep or not root.startswith("http://"):
+                raise CommandError(f"--target must look like NAME=http://host:port/api/, got {raw!r}")
+            targets.append((name, root.rstrip("/") + "/"))
+
+        if options["scenario"]:
+            return self.scenario(targets, options)
+
+        headers = {"Authorization": f"Bearer {self.login(targets[0][1], options['login'])}"}
+        self.stdout.write(
+            f"{'endpoint':<10} {'target':<8} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}"
+        )
+        for endpoint in options["endpoint"] or ENDPOINTS:
+            method, path = ENDPOINTS[endpoint]
+            path = path.format(name=quote(options["name"]))
+            for name, root in targets:
+                latencies, errors, elapsed = asyncio.run(http_load(
+                    root + path, headers, method, options["concurrency"], options["duration"]
+                ))
+                if not latencies:
+                    self.stdout.write(f"{endpoint:<10} {name:<8} no responses ({errors} errors)")
+                    continue
+                ms = [t * 1000 for t in latencies]
+                self.stdout.write(
+                    f"{endpoint:<10} {name:<8} {len(latencies) / elapsed:9.1f} "
+                    f"{percentile(ms, 50):8.2f} {percentile(ms, 99):8.2f} {errors:7d}"
+                )
+
+    def scenario(self, targets, options):
+        username, _, password = options["login"].partition(":")
+
+        def credentials(number):
+            return {"username": username.format(n=number), "password": password}
+
+        self.stdout.write(
+            f"{'task':<14} {'target':<8} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'refused':>8}"
+        )
+        for name, root in targets:
+            latencies, errors, refused, first_logins, elapsed = asyncio.run(http_scenario(
+                root, credentials, SCENARIOS[options["scenario"]], options["concurrency"], options["duration"]
+            ))
+            for task, times in latencies.items():
+                if not times:
+                    self.stdout.write(
+                        f"{task:<14} {name:<8} no responses ({errors[task]} errors, {refused[task]} refused)"
+                    )
+                    continue
+                ms = [t * 1000 for t in times]
+                self.stdout.write(
+                    f"{task:<14} {name:<8} {len(times) / elapsed:9.1f} "
+                    f"{percentile(ms, 50):8.2f} {percentile(ms, 99):8.2f} {errors[task]:7d} {refused[task]:8d}"
+                )
+            # req/s and latencies are successes only: a task that mostly fails
+            # (4xx other than 429, 5xx other than 503) isn't the load it claims
+            for task, count in errors.items():
+                if count:
+                    self.stdout.write(self.style.WARNING(
+                        f"{task} on {name}: {count} of {count + len(latencies[task]) + refused[task]} "
+                        f"requests failed"
+                    ))
+            # Refused logins are retried until admitted, so their latencies
+            # alone hide how many users were turned away at first
+            users = options["concurrency"]
+            self.stdout.write(
+                f"logins admitted on the first try on {name}: {first_logins} of {users} "
+                f"({first_logins / users:.0%})"
+            )
+
+    def login(self, root, credentials):
+        username, _, password = credentials.partition(":")
+        username = username.format(n=0)
+        parts = urlsplit(root)
+        request = Request(
+            f"{parts.scheme}://{parts.netloc}/api/login/",
+            data=json.dumps({"username": username, "password": password}).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            with urlopen(request, timeout=10) as response:
+                return json.load(response)["access"]
+        except OSError as e:
+            raise CommandError(f"Login failed: {e}")
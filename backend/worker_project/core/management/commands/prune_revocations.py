@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core import revocation
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete token revocations whose tokens have all expired. They no longer "
+        "reject anything, and each process loads the remaining ones at startup."
+    )
+
+    def handle(self, *args, **options):
+        deleted = revocation.prune()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired revocations"))
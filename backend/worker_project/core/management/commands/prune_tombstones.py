@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from core import sync
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete deleted-project tombstones older than the delta sync retention. "
+        "Clients with older sync tokens download their project list again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=sync.TOMBSTONE_RETENTION.days,
+            help="Keep tombstones this many days (default: the sync token retention)",
+        )
+
+    def handle(self, *args, **options):
+        deleted = sync.prune_tombstones(timedelta(days=options["days"]))
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} tombstones"))
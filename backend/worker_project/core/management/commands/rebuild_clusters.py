@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core import clusters
+from core.models import Project, ProjectCluster
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the precomputed map clusters from the projects table. "
+        "Only needed after writes that bypass the ORM (raw SQL, restores)."
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            clusters.rebuild(Project, ProjectCluster)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {ProjectCluster.objects.count()} cluster rows"
+        ))
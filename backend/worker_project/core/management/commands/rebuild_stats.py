@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core import stats
+from core.models import Project, ProjectStat
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the precomputed project statistics from the projects table. "
+        "Only needed after writes that bypass the ORM (raw SQL, restores)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size", type=int, default=stats.REBUILD_CHUNK_SIZE,
+            help="Projects aggregated per query",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            stats.rebuild(Project, ProjectStat, chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {ProjectStat.objects.count()} stats rows"
+        ))
@@ -0,0 +1,33 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from core import outbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver queued emails (password resets, ...) from the outbox. "
+        "Runs until stopped; use --once from cron instead of a long-lived process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Exit when nothing is due")
+        parser.add_argument("--batch-size", type=int, default=outbox.BATCH_SIZE)
+        parser.add_argument("--interval", type=float, default=2.0, help="Seconds between polls when idle")
+
+    def handle(self, *args, **options):
+        stopping = []
+
+        def stop(signum, frame):
+            stopping.append(signum)  # finish the current batch, then exit
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        sent = outbox.run(
+            batch_size=options["batch_size"],
+            poll_interval=options["interval"],
+            once=options["once"],
+            should_stop=lambda: bool(stopping),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Sent {sent} emails"))
@@ -0,0 +1,247 @@
+"""
+Per-request performance metrics, exported in the Prometheus text format at
+GET /api/metrics/.
+
+MetricsMiddleware times every request and labels it with its URL name
+(``projects-list``, ``async-projects-detail``...). While it runs, a
+request-scoped RequestStats collects:
+
+* database queries and their time, from an execute wrapper installed on
+  every connection (core.signals.instrument_connection);
+* serializer time, from the ``timed("serializer")`` blocks around DRF
+  serializers' ``.data`` (core.serializers) and FastReadSerializer;
+* the response size (non-streaming responses).
+
+Each is a histogram per view. Counts live in this process: scrape each
+server process, or run one per target.
+
+Repeated queries: a request that runs the same SQL (same text, any
+parameters) METRICS_REPEATED_QUERY_THRESHOLD times or more is the N+1
+pattern, a query per row instead of one for all of them. Such requests
+increment ``http_requests_repeated_queries_total``; with METRICS_DEBUG
+the query is also logged (never sent to the client: SQL shows the
+schema), and every response carries a ``Server-Timing`` header (shown by
+browser dev tools).
+
+The endpoint wants METRICS_TOKEN as a bearer token; without one it only
+answers with DEBUG on.
+"""
+import collections
+import logging
+import secrets
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """A labelled Prometheus histogram (cumulative buckets, sum, count)."""
+
+    def __init__(self, name, help, labels, buckets):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = sorted((k, list(v)) for k, v in self._series.items())
+        for label_values, counts in series:
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values))
+            cumulative = 0
+            for bound, n in zip((*self.buckets, "+Inf"), counts):
+                cumulative += n
+                yield f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+            yield f"{self.name}_sum{{{labels}}} {counts[-1]:.6f}"
+            yield f"{self.name}_count{{{labels}}} {cumulative}"
+
+
+class Counter:
+    """A labelled Prometheus counter."""
+
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = collections.Counter()
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values):
+        with self._lock:
+            self._values[label_values] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, n in values:
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values))
+            yield f"{self.name}{{{labels}}} {n}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time to response (streamed bodies: to first byte).",
+    ("view", "method", "status"), DURATION_BUCKETS,
+)
+DB_QUERIES = Histogram("http_request_db_queries", "Database queries per request.", ("view",), QUERY_BUCKETS)
+DB_DURATION = Histogram(
+    "http_request_db_duration_seconds", "Time in database queries per request.", ("view",), DURATION_BUCKETS,
+)
+SERIALIZER_DURATION = Histogram(
+    "http_request_serializer_duration_seconds", "Time in serializers per request.", ("view",), DURATION_BUCKETS,
+)
+RESPONSE_SIZE = Histogram("http_response_size_bytes", "Response body size.", ("view",), SIZE_BUCKETS)
+REPEATED_QUERIES = Counter(
+    "http_requests_repeated_queries_total", "Requests that ran one query many times (N+1).", ("view",),
+)
+REQUESTS_SHED = Counter(
+    "http_requests_shed_total", "Requests refused with 503 by admission control (core.admission).", ("view", "reason"),
+)
+METRICS = (
+    REQUEST_DURATION, DB_QUERIES, DB_DURATION, SERIALIZER_DURATION, RESPONSE_SIZE, REPEATED_QUERIES, REQUESTS_SHED,
+)
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = collections.Counter()  # sql -> times run
+        self.db_time = 0.0
+        self.timings = collections.Counter()  # timed() name -> seconds
+        self._depth = collections.Counter()
+
+    def most_repeated(self):
+        """(sql, count) of the query run most often, or (None, 0)."""
+        return self.queries.most_common(1)[0] if self.queries else (None, 0)
+
+
+_stats = ContextVar("request_stats", default=None)
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    """connection.execute_wrappers entry: counts and times queries of the current request."""
+    stats = _stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_time += time.perf_counter() - start
+        stats.queries[sql] += 1
+
+
+@contextmanager
+def timed(name):
+    """Add the time spent in the block to the current request's ``name`` timing (outermost block only)."""
+    stats = _stats.get()
+    if stats is None or stats._depth[name]:
+        yield
+        return
+    stats._depth[name] += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.timings[name] += time.perf_counter() - start
+        stats._depth[name] -= 1
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _stats.reset(token)
+        return self.record(request, response, stats, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _stats.reset(token)
+        return self.record(request, response, stats, time.perf_counter() - start)
+
+    def record(self, request, response, stats, duration):
+        match = request.resolver_match
+        view = (match.view_name if match else None) or "unmatched"
+        REQUEST_DURATION.observe(duration, view, request.method, response.status_code)
+        DB_QUERIES.observe(sum(stats.queries.values()), view)
+        DB_DURATION.observe(stats.db_time, view)
+        SERIALIZER_DURATION.observe(stats.timings["serializer"], view)
+        if not response.streaming:
+            RESPONSE_SIZE.observe(len(response.content), view)
+
+        sql, repeats = stats.most_repeated()
+        repeated = repeats >= settings.METRICS_REPEATED_QUERY_THRESHOLD
+        if repeated:
+            REPEATED_QUERIES.inc(view)
+        if settings.METRICS_DEBUG:
+            response["Server-Timing"] = ", ".join([
+                f'db;dur={stats.db_time * 1000:.1f};desc="{sum(stats.queries.values())} queries"',
+                f"serializer;dur={stats.timings['serializer'] * 1000:.1f}",
+                f"total;dur={duration * 1000:.1f}",
+            ])
+            if repeated:
+                logger.warning("%s %s ran the same query %d times: %s", request.method, request.path, repeats, sql)
+        return response
+
+
+def render():
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
+
+
+def metrics_view(request):
+    """GET /api/metrics/; scrapers send METRICS_TOKEN as a bearer token (none needed with DEBUG)."""
+    token = settings.METRICS_TOKEN
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponse("Set METRICS_TOKEN to serve metrics.\n", status=403, content_type="text/plain")
+    elif not secrets.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return HttpResponse(status=401)
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
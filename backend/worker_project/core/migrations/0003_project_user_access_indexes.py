@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:25
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0002_project_fields_and_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(models.F('worker'), django.db.models.functions.text.Lower('name'), name='project_worker_lower_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['worker', 'status'], name='project_worker_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', 'id'], name='user_role_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:31
+
+from django.db import migrations, models
+
+# core.geo.geo_cell() as of this migration, frozen here: later changes to
+# the app code must not change what this migration does
+CELL_BITS = 26
+
+
+def _index(value, low, span, bits):
+    i = int((value - low) / span * (1 << bits))
+    return min(max(i, 0), (1 << bits) - 1)
+
+
+def geo_cell(latitude, longitude):
+    lat_index = _index(float(latitude), -90.0, 180.0, CELL_BITS)
+    lng_index = _index(float(longitude), -180.0, 360.0, CELL_BITS)
+    code = 0
+    for bit in range(CELL_BITS - 1, -1, -1):
+        code = (code << 2) | (((lng_index >> bit) & 1) << 1) | ((lat_index >> bit) & 1)
+    return code
+
+
+def backfill_geo_cell(apps, schema_editor):
+    Project = apps.get_model("core", "Project")
+    located = Project.objects.filter(latitude__isnull=False, longitude__isnull=False)
+    batch = []
+    for project in located.only("id", "latitude", "longitude").iterator(chunk_size=2000):
+        project.geo_cell = geo_cell(project.latitude, project.longitude)
+        batch.append(project)
+        if len(batch) == 2000:
+            Project.objects.bulk_update(batch, ["geo_cell"])
+            batch = []
+    Project.objects.bulk_update(batch, ["geo_cell"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_project_user_access_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='geo_cell',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['geo_cell'], name='project_geo_cell_idx'),
+        ),
+        migrations.RunPython(backfill_geo_cell, migrations.RunPython.noop),
+    ]
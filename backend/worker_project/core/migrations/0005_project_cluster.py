@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:33
+
+from django.db import migrations, models
+from django.db.models import BigIntegerField, Count, ExpressionWrapper, F, Sum
+
+# core.clusters.rebuild() as of this migration, frozen here: later changes
+# to the app code must not change what this migration does
+CELL_BITS = 26
+CLUSTER_LEVELS = range(1, 13)
+
+
+def build_clusters(apps, schema_editor):
+    Project = apps.get_model("core", "Project")
+    ProjectCluster = apps.get_model("core", "ProjectCluster")
+    located = Project.objects.filter(geo_cell__isnull=False)
+    for level in CLUSTER_LEVELS:
+        shift = 2 * (CELL_BITS - level)
+        cell = ExpressionWrapper(F("geo_cell") / (1 << shift), output_field=BigIntegerField())
+        groups = located.values(cluster_cell=cell, cluster_status=F("status")).annotate(
+            n=Count("id"), lat=Sum("latitude"), lng=Sum("longitude"),
+        ).order_by()
+        ProjectCluster.objects.bulk_create(
+            (
+                ProjectCluster(
+                    level=level, cell=g["cluster_cell"], status=g["cluster_status"],
+                    count=g["n"], lat_sum=float(g["lat"]), lng_sum=float(g["lng"]),
+                )
+                for g in groups.iterator()
+            ),
+            batch_size=2000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_project_geo_cell'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectCluster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.PositiveSmallIntegerField()),
+                ('cell', models.BigIntegerField()),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('IN_PROGRESS', 'In Progress'), ('COMPLETED', 'Completed')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('lat_sum', models.FloatField(default=0)),
+                ('lng_sum', models.FloatField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('level', 'cell', 'status'), name='project_cluster_key')],
+            },
+        ),
+        migrations.RunPython(build_clusters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:37
+
+import re
+
+from django.db import migrations, models
+
+# The index and vocabulary of core.search as of this migration, frozen
+# here: later changes to the app code must not change what this migration
+# does
+FTS_TABLE = "core_project_fts"
+PG_INDEXES = {
+    "core_project_name_trgm": 'UPPER("name"::text)',
+    "core_project_description_trgm": 'UPPER("description"::text)',
+}
+MIN_FUZZY_LENGTH = 4
+MAX_WORD_LENGTH = 40
+BATCH_SIZE = 1000
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _words(text):
+    return {
+        w for w in (t.lower() for t in _TERM_RE.findall(text))
+        if MIN_FUZZY_LENGTH <= len(w) <= MAX_WORD_LENGTH
+    }
+
+
+def _deletions(word):
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def create_index(apps, schema_editor):
+    """SQLite: FTS5 trigram table; PostgreSQL: pg_trgm indexes. Backfills the vocabulary too."""
+    conn = schema_editor.connection
+    if conn.vendor == "sqlite":
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            "USING fts5(name, description, tokenize='trigram')"
+        )
+        # bm25 with the name column weighted 10x, exposed as the "rank" column
+        schema_editor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', 'bm25(10.0, 1.0)')")
+    elif conn.vendor == "postgresql":
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for name, expression in PG_INDEXES.items():
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS {name} ON core_project USING gin (({expression}) gin_trgm_ops)"
+            )
+
+    Project = apps.get_model("core", "Project")
+    SearchWord = apps.get_model("core", "SearchWord")
+    batch, words, known = [], set(), set()
+
+    def flush():
+        if conn.vendor == "sqlite" and batch:
+            with conn.cursor() as cursor:
+                cursor.executemany(
+                    f"INSERT OR REPLACE INTO {FTS_TABLE} (rowid, name, description) VALUES (%s, %s, %s)", batch,
+                )
+        new_words = words - known
+        SearchWord.objects.bulk_create(
+            [SearchWord(variant=variant, word=word) for word in new_words for variant in {word} | _deletions(word)],
+            ignore_conflicts=True,
+        )
+        known.update(new_words)
+        batch.clear()
+        words.clear()
+
+    for pk, name, description in Project.objects.values_list("id", "name", "description").iterator(chunk_size=2000):
+        batch.append((pk, name, description or ""))
+        words.update(_words(f"{name} {description or ''}"))
+        if len(batch) >= BATCH_SIZE:
+            flush()
+    flush()
+
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif vendor == "postgresql":
+        for name in PG_INDEXES:
+            schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_project_cluster'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchWord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('variant', models.CharField(max_length=40)),
+                ('word', models.CharField(max_length=40)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('variant', 'word'), name='search_word_variant_key')],
+            },
+        ),
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:20
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def updated_at_from_created_at(apps, schema_editor):
+    Project = apps.get_model("core", "Project")
+    Project.objects.update(updated_at=F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_outbox_email'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('project_id', models.BigIntegerField()),
+                ('worker_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['deleted_at', 'id'], name='tombstone_deleted_id_idx'), models.Index(fields=['worker_id', 'deleted_at', 'id'], name='tombstone_worker_deleted_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(updated_at_from_created_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['updated_at', 'id'], name='project_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['worker', 'updated_at', 'id'], name='project_worker_updated_idx'),
+        ),
+    ]
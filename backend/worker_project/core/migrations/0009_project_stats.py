@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:08
+
+import datetime
+
+from django.db import migrations, models
+from django.db.models import Case, Count, DateField, Q, Value, When
+from django.db.models.functions import TruncMonth
+
+# core.stats.rebuild() as of this migration, frozen here: later changes to
+# the app code must not change what this migration does
+NO_DUE = datetime.date.max
+OPEN_STATUSES = ("PENDING", "IN_PROGRESS")
+
+
+def build_stats(apps, schema_editor):
+    Project = apps.get_model("core", "Project")
+    ProjectStat = apps.get_model("core", "ProjectStat")
+    due_month = Case(
+        When(Q(status__in=OPEN_STATUSES) & Q(finish_date__isnull=False), then=TruncMonth("finish_date")),
+        default=Value(NO_DUE),
+        output_field=DateField(),
+    )
+    groups = Project.objects.values_list("worker_id", "status", due_month).annotate(Count("id")).order_by()
+    ProjectStat.objects.bulk_create(
+        (ProjectStat(worker_id=w, status=s, due_month=m, count=n) for w, s, m, n in groups.iterator()),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_project_delta_sync'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('worker_id', models.BigIntegerField()),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('IN_PROGRESS', 'In Progress'), ('COMPLETED', 'Completed')], max_length=20)),
+                ('due_month', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['finish_date', 'status', 'worker'], name='project_finish_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectstat',
+            index=models.Index(fields=['due_month'], name='project_stat_due_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='projectstat',
+            constraint=models.UniqueConstraint(fields=('worker_id', 'status', 'due_month'), name='project_stat_key'),
+        ),
+        migrations.RunPython(build_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:41
+
+import django.db.models.deletion
+import django.db.models.functions.text
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_import_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedProject',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('start_date', models.DateField(blank=True, null=True)),
+                ('finish_date', models.DateField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('IN_PROGRESS', 'In Progress'), ('COMPLETED', 'Completed')], max_length=20)),
+                ('latitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('longitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('geo_cell', models.BigIntegerField(blank=True, editable=False, null=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('worker', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_projects', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-created_at', '-id'], name='archive_created_id_idx'), models.Index(fields=['worker', '-created_at', '-id'], name='archive_worker_created_idx'), models.Index(models.F('worker'), django.db.models.functions.text.Lower('name'), name='archive_worker_lower_name_idx')],
+            },
+        ),
+    ]
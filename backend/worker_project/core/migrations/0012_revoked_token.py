@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:44
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_archived_project'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session', models.CharField(blank=True, max_length=64)),
+                ('user_id', models.BigIntegerField()),
+                ('revoked_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('expires_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['revoked_at'], name='revoked_token_revoked_idx'), models.Index(fields=['expires_at'], name='revoked_token_expires_idx')],
+            },
+        ),
+    ]
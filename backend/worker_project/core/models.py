@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
 
 # Create your models here.
 from django.contrib.auth.models import AbstractUser
@@ -10,12 +12,58 @@ class User(AbstractUser):
     )
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default="WORKER")
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # grouped_projects: filter(role="WORKER").order_by("id")
+            models.Index(fields=["role", "id"], name="user_role_idx"),
+            # Password reset: filter(email=..., role="WORKER")
+            models.Index(fields=["email"], name="user_email_idx"),
+        ]
+
     def __str__(self):
         return f"{self.username} ({self.role})"
 
 
+class RevokedToken(models.Model):
+    """
+    A revoked login session, or with no session all of a user's sessions
+    started before revoked_at. Mirrored in memory by core.revocation;
+    expired rows are deleted by ``manage.py prune_revocations``.
+    """
+    session = models.CharField(max_length=64, blank=True)  # "sid" claim; "" = every session of user_id
+    user_id = models.BigIntegerField()  # no FK: revocations must not block deleting the user
+    revoked_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField()  # the revoked tokens are all expired by then
+
+    class Meta:
+        indexes = [
+            # Incremental refresh: rows revoked since the last one
+            models.Index(fields=["revoked_at"], name="revoked_token_revoked_idx"),
+            # Startup load and pruning: rows still in force
+            models.Index(fields=["expires_at"], name="revoked_token_expires_idx"),
+        ]
+
+
 from django.db import models
 from django.conf import settings
+from . import geo
+
+class ProjectQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        """
+        bulk_create skips Project.save() and the post_save signal, so keep
+        derived data (geo_cell, map clusters, search index, response cache)
+        in sync here. Not meant for ignore_conflicts/update_conflicts.
+        """
+        from .signals import projects_bulk_created
+
+        objs = list(objs)
+        for obj in objs:
+            obj.set_geo_cell()
+        objs = super().bulk_create(objs, *args, **kwargs)
+        projects_bulk_created(objs)
+        return objs
+
 
 class Project(models.Model):
     STATUS_CHOICES = (
@@ -28,6 +76,9 @@ class Project(models.Model):
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Delta sync position (core.sync). auto_now only covers save(): code
+    # using QuerySet.update() must set it too
+    updated_at = models.DateTimeField(auto_now=True)
     start_date = models.DateField(null=True, blank=True)   # Optional start date
     finish_date = models.DateField(null=True, blank=True)  # Optional finish date
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="PENDING")  # Project status
@@ -36,7 +87,213 @@ class Project(models.Model):
     # Location fields
     latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    # Integer geohash of (latitude, longitude), see core.geo. Kept in sync by save().
+    geo_cell = models.BigIntegerField(null=True, blank=True, editable=False)
+
+    objects = ProjectQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination order (see core.pagination.KeysetPagination)
+            models.Index(fields=["-created_at", "-id"], name="project_created_id_idx"),
+            models.Index(fields=["worker", "-created_at", "-id"], name="project_worker_created_idx"),
+            # search: worker + case-insensitive name (see ProjectViewSet.search)
+            models.Index("worker", Lower("name"), name="project_worker_lower_name_idx"),
+            # Status dashboards: per-worker counts by status
+            models.Index(fields=["worker", "status"], name="project_worker_status_idx"),
+            # nearby / bbox queries
+            models.Index(fields=["geo_cell"], name="project_geo_cell_idx"),
+            # Stats: open projects overdue this month (see core.stats)
+            models.Index(fields=["finish_date", "status", "worker"], name="project_finish_status_idx"),
+            # Delta sync: changes since a position, in (updated_at, id) order
+            models.Index(fields=["updated_at", "id"], name="project_updated_id_idx"),
+            models.Index(fields=["worker", "updated_at", "id"], name="project_worker_updated_idx"),
+        ]
+
+    def set_geo_cell(self):
+        """Recompute geo_cell from latitude/longitude."""
+        self.geo_cell = geo.geo_cell(self.latitude, self.longitude)
+
+    def save(self, *args, **kwargs):
+        self.set_geo_cell()
+        update_fields = kwargs.get("update_fields")
+        if update_fields:
+            # auto_now only writes updated_at when it is listed, and delta
+            # sync (core.sync) and archival go by it
+            extra = {"updated_at"}
+            if {"latitude", "longitude"} & set(update_fields):
+                extra.add("geo_cell")
+            kwargs["update_fields"] = {*update_fields, *extra}
+        # One transaction with the locked read of the old row in
+        # core.signals, so the cluster and stats deltas match the write
+        with transaction.atomic(using=kwargs.get("using"), savepoint=False):
+            super().save(*args, **kwargs)
+
+    def __str__(self):
+        # Names the worker only when already loaded (select_related): a
+        # list of projects must not cost a query per row
+        if Project.worker.is_cached(self):
+            return f"{self.name} ({self.worker.username})"
+        return self.name
+
+
+
+class ArchivedProject(models.Model):
+    """
+    A completed project moved out of the Project table by core.archive
+    (``manage.py archive_projects``), same id and fields. Read-only: served
+    with ?include_archived=1.
+    """
+    id = models.BigIntegerField(primary_key=True)  # the Project id
+    worker = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="archived_projects")
+    name = models.CharField(max_length=200)
+    description = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    start_date = models.DateField(null=True, blank=True)
+    finish_date = models.DateField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=Project.STATUS_CHOICES)
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    geo_cell = models.BigIntegerField(null=True, blank=True, editable=False)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # The Project indexes that list, search and grouped_projects use
+            models.Index(fields=["-created_at", "-id"], name="archive_created_id_idx"),
+            models.Index(fields=["worker", "-created_at", "-id"], name="archive_worker_created_idx"),
+            models.Index("worker", Lower("name"), name="archive_worker_lower_name_idx"),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class ProjectTombstone(models.Model):
+    """
+    A deleted project, so delta sync (core.sync) can tell clients to drop
+    it. Written by the Project delete signal; pruned after
+    sync.TOMBSTONE_RETENTION by ``manage.py prune_tombstones``.
+    """
+    project_id = models.BigIntegerField()
+    worker_id = models.BigIntegerField()  # no FK: outlives the worker too
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["deleted_at", "id"], name="tombstone_deleted_id_idx"),
+            models.Index(fields=["worker_id", "deleted_at", "id"], name="tombstone_worker_deleted_idx"),
+        ]
+
+
+class ProjectCluster(models.Model):
+    """
+    Precomputed project counts per map cell and status, for the clusters
+    endpoint. Maintained by core.clusters; never edit rows by hand.
+    """
+    level = models.PositiveSmallIntegerField()  # bits per axis of the geo_cell prefix
+    cell = models.BigIntegerField()             # geo_cell >> 2 * (CELL_BITS - level)
+    status = models.CharField(max_length=20, choices=Project.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+    lat_sum = models.FloatField(default=0)
+    lng_sum = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["level", "cell", "status"], name="project_cluster_key"),
+        ]
+
+
+class ProjectStat(models.Model):
+    """
+    Precomputed project counts per worker, status and open deadline, for
+    the stats endpoint. Maintained by core.stats; never edit rows by hand.
+    """
+    worker_id = models.BigIntegerField()  # no FK: rows are removed with the worker (core.signals)
+    status = models.CharField(max_length=20, choices=Project.STATUS_CHOICES)
+    due_month = models.DateField()        # finish_date month of open projects, else stats.NO_DUE
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["worker_id", "status", "due_month"], name="project_stat_key"),
+        ]
+        indexes = [
+            # Overdue counts and deadlines by month
+            models.Index(fields=["due_month"], name="project_stat_due_idx"),
+        ]
+
+
+class SearchWord(models.Model):
+    """
+    Vocabulary of the full-text search, for typo correction: every word of
+    project names and descriptions, stored under itself and under each of
+    its one-letter deletions. Maintained by core.search.
+    """
+    variant = models.CharField(max_length=40)
+    word = models.CharField(max_length=40)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["variant", "word"], name="search_word_variant_key"),
+        ]
+
+
+class OutboxEmail(models.Model):
+    """
+    Email waiting to be sent by the outbox worker (core.outbox,
+    ``manage.py send_outbox``), so requests never wait on the mail server.
+    """
+    STATUS_CHOICES = (
+        ("PENDING", "Pending"),
+        ("SENT", "Sent"),
+        ("FAILED", "Failed"),
+    )
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    to = models.EmailField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="PENDING")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Due time while PENDING: retry backoff, or the lease of a worker sending it
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Worker poll: status="PENDING", next_attempt_at <= now
+            models.Index(fields=["status", "next_attempt_at"], name="outbox_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to} ({self.status})"
+
+
+class ImportJob(models.Model):
+    """
+    A bulk import of workers and projects (core.imports), committed chunk
+    by chunk: rows_done is the resume point.
+    """
+    STATUS_CHOICES = (
+        ("RUNNING", "Running"),
+        ("DONE", "Done"),
+        ("FAILED", "Failed"),
+    )
+
+    source = models.CharField(max_length=255)  # file name
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="RUNNING")
+    rows_done = models.PositiveIntegerField(default=0)  # input rows committed, rejected ones included
+    workers_created = models.PositiveIntegerField(default=0)
+    projects_created = models.PositiveIntegerField(default=0)
+    rows_rejected = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"{self.name} ({self.worker.username})"
+        return f"{self.source} ({self.status}, {self.rows_done} rows)"
 
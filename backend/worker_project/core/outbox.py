@@ -0,0 +1,132 @@
+"""
+Email outbox: requests enqueue() a row in OutboxEmail and return; a worker
+(``manage.py send_outbox``) delivers due messages in batches over one mail
+connection.
+
+Delivery is at least once. A worker claims a batch by pushing its
+next_attempt_at LEASE_SECONDS ahead (rows locked with SKIP LOCKED where the
+database supports it), so a crashed worker's messages are retried once the
+lease runs out. Failed sends are retried with exponential backoff and
+given up on (status FAILED) after MAX_ATTEMPTS.
+"""
+import logging
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+LEASE_SECONDS = 300
+MAX_ATTEMPTS = 8
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 6 * 3600
+
+
+def enqueue(subject, body, to, from_email=None):
+    """Queue one email; a single INSERT."""
+    return OutboxEmail.objects.create(
+        subject=subject,
+        body=body,
+        to=to,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+    )
+
+
+def enqueue_many(messages, from_email=None):
+    """Queue (subject, body, to) messages with one INSERT."""
+    return OutboxEmail.objects.bulk_create([
+        OutboxEmail(subject=subject, body=body, to=to, from_email=from_email or settings.DEFAULT_FROM_EMAIL)
+        for subject, body, to in messages
+    ])
+
+
+def backoff(attempts):
+    """Delay before retry number ``attempts``, with +-20% jitter."""
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (attempts - 1))
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim(batch_size=BATCH_SIZE):
+    """Lease up to ``batch_size`` due messages to this worker."""
+    now = timezone.now()
+    with transaction.atomic():
+        due = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status="PENDING", next_attempt_at__lte=now)
+            .order_by("next_attempt_at")[:batch_size]
+        )
+        if due:
+            OutboxEmail.objects.filter(pk__in=[m.pk for m in due]).update(
+                attempts=F("attempts") + 1,
+                next_attempt_at=now + timedelta(seconds=LEASE_SECONDS),
+            )
+    for message in due:
+        message.attempts += 1
+    return due
+
+
+def deliver(messages, connection=None):
+    """Send claimed messages over one connection; returns how many were sent."""
+    if not messages:
+        return 0
+    connection = connection or get_connection()
+    sent = 0
+    try:
+        connection.open()
+    except Exception as e:
+        for message in messages:
+            _failed(message, e)
+        return 0
+    try:
+        for message in messages:
+            email = EmailMessage(
+                message.subject, message.body, message.from_email, [message.to], connection=connection
+            )
+            try:
+                email.send()
+            except Exception as e:
+                _failed(message, e)
+                connection.close()  # don't reuse a connection in an unknown state
+                continue
+            OutboxEmail.objects.filter(pk=message.pk).update(
+                status="SENT", sent_at=timezone.now(), last_error=""
+            )
+            sent += 1
+    finally:
+        connection.close()
+    return sent
+
+
+def _failed(message, error):
+    give_up = message.attempts >= MAX_ATTEMPTS
+    logger.warning(
+        "Sending outbox email %s failed (attempt %s%s): %s",
+        message.pk, message.attempts, ", giving up" if give_up else "", error,
+    )
+    OutboxEmail.objects.filter(pk=message.pk).update(
+        status="FAILED" if give_up else "PENDING",
+        next_attempt_at=timezone.now() + backoff(message.attempts),
+        last_error=f"{type(error).__name__}: {error}",
+    )
+
+
+def run(batch_size=BATCH_SIZE, poll_interval=2.0, once=False, should_stop=lambda: False):
+    """Worker loop: deliver due batches, sleep when there are none."""
+    total = 0
+    while not should_stop():
+        batch = claim(batch_size)
+        total += deliver(batch)
+        if once and len(batch) < batch_size:
+            break
+        if not batch:
+            time.sleep(poll_interval)
+    return total
@@ -0,0 +1,120 @@
+import base64
+import heapq
+from itertools import islice
+from urllib.parse import urlencode
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination on (created_at, id), newest first.
+
+    The cursor encodes the last row of the previous page, so each page is a
+    single indexed range scan: cost does not grow with how deep you page or
+    with the table size, and rows inserted meanwhile never shift the pages.
+    """
+    page_size = 50
+    max_page_size = 500
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    ordering = ("-created_at", "-id")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request):
+        """paginate_queryset() for async views."""
+        return self.set_page([row async for row in self.page_queryset(queryset, request)])
+
+    def paginate_querysets(self, querysets, request):
+        """
+        paginate_queryset() over several querysets as if they were one
+        (hot and archived projects): a page is read from each and merged.
+        """
+        return self.set_page(self.merge([list(self.page_queryset(q, request)) for q in querysets]))
+
+    async def apaginate_querysets(self, querysets, request):
+        """paginate_querysets() for async views."""
+        return self.set_page(self.merge([
+            [row async for row in self.page_queryset(q, request)] for q in querysets
+        ]))
+
+    def merge(self, pages):
+        rows = heapq.merge(*pages, key=lambda row: (row.created_at, row.id), reverse=True)
+        return list(islice(rows, self.size + 1))
+
+    def page_queryset(self, queryset, request):
+        self.request = request
+        self.size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            created_at, pk = position
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            )
+
+        # Fetch one extra row to know whether there is a next page
+        return queryset[:self.size + 1]
+
+    def set_page(self, rows):
+        self.has_next = len(rows) > self.size
+        self.page = rows[:self.size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        # Works for model instances and values_list(named=True) rows alike
+        last = self.page[-1]
+        params = self.request.query_params.copy()
+        params[self.cursor_query_param] = self.encode_cursor(last.created_at, last.id)
+        url = self.request.build_absolute_uri(self.request.path)
+        return f"{url}?{urlencode(params, doseq=True)}"
+
+    def encode_cursor(self, created_at, pk):
+        raw = f"{created_at.isoformat()}|{pk}".encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            created_at, pk = base64.urlsafe_b64decode(encoded.encode()).decode().split("|")
+            created_at = parse_datetime(created_at)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound("Invalid cursor")
+        if created_at is None:
+            raise NotFound("Invalid cursor")
+        return created_at, pk
@@ -0,0 +1,52 @@
+"""
+API renderers (settings.REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"]).
+
+FastJSONRenderer produces the same bytes as DRF's JSONRenderer with orjson,
+which encodes dicts, lists, strings, numbers and dates in C. What orjson
+doesn't know (Decimal, lazy strings, querysets...) goes through DRF's own
+encoder, and pretty-printed output (``; indent=`` in Accept, the browsable
+API) is left to JSONRenderer. Without orjson installed it is JSONRenderer.
+
+MessagePackRenderer is picked with ``Accept: application/msgpack``: the
+same data in a binary encoding, smaller and quicker to decode on devices.
+It is only offered when the msgpack package is installed (see settings).
+"""
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional: plain JSONRenderer
+    orjson = None
+
+_default = JSONEncoder().default  # DRF's conversions for types orjson doesn't handle
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            content = orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+        except orjson.JSONEncodeError:  # e.g. integers beyond 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+        # Like JSONRenderer: U+2028/U+2029 escaped, so the output is valid JavaScript too
+        if b"\xe2\x80\xa8" in content or b"\xe2\x80\xa9" in content:
+            content = content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return content
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        import msgpack
+
+        return msgpack.packb(data, default=_default, use_bin_type=True, datetime=False)
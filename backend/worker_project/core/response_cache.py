@@ -0,0 +1,182 @@
+"""
+Versioned response cache for read-only project endpoints.
+
+Cached responses are keyed by who is asking (admins share one scope since
+they see every project; workers each get their own), the view action, the
+accepted renderer and the query string, plus the current data version of
+that scope:
+
+* ``v:global`` is bumped on every Project or User change (admin views);
+* ``v:worker:<id>`` is bumped when one of that worker's projects changes.
+
+Nothing is ever deleted on write: bumping a version makes old keys
+unreachable and the cache evicts them in time. Version bumps come from the
+signals in core.signals, and from bulk code paths that bypass them; they
+take effect when the write commits.
+
+Responses carry a strong ETag (hash of the body); a matching
+If-None-Match gets a 304 without rendering anything.
+
+The store is the "api" alias in settings.CACHES (a size-bounded in-process
+LRU by default, Redis when API_CACHE_REDIS_URL is set).
+"""
+import functools
+import hashlib
+import time
+
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+
+from . import db_routers
+
+CACHE_ALIAS = "api"
+GLOBAL_VERSION = "v:global"
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _worker_version(worker_id):
+    return f"v:worker:{worker_id}"
+
+
+def _get_version(key):
+    cache = _cache()
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock, not 1, so a version evicted and recreated can
+        # never point back at responses cached under its old value
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump(worker_ids=()):
+    """
+    Invalidate admin-scoped responses and those of the given workers, once
+    the current transaction commits (right away outside one). Bumped
+    before, a read in between would cache the old rows under the new
+    version.
+    """
+    worker_ids = list(worker_ids)
+    transaction.on_commit(lambda: bump_now(worker_ids))
+
+
+def bump_now(worker_ids=()):
+    """bump() for writes already committed, e.g. from async code (no on_commit there)."""
+    # The same readers must not be served from a lagging replica meanwhile
+    db_routers.pin_primary(worker_ids)
+    cache = _cache()
+    for key in [GLOBAL_VERSION, *{_worker_version(w) for w in worker_ids if w is not None}]:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), timeout=None)
+
+
+def _make_key(request, per_user, *parts):
+    user = request.user
+    if user.role == "ADMIN" and not per_user:
+        scope, version = "role:ADMIN", _get_version(GLOBAL_VERSION)
+    else:
+        scope, version = f"user:{user.pk}:{user.role}", _get_version(_worker_version(user.pk))
+    query = "&".join(sorted(
+        f"{name}={value}" for name, values in request.query_params.lists() for value in values
+    ))
+    raw = "|".join([scope, str(version), request.get_host(), *map(str, parts), query])
+    return "resp:" + hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _if_none_match(request, etag):
+    header = request.headers.get("If-None-Match", "")
+    # Weak comparison: compressed responses carry the tag as W/"..."
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(",")) or header.strip() == "*"
+
+
+def _not_modified(etag):
+    response = HttpResponseNotModified()
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def _cached_response(request, cached):
+    content, content_type, etag = cached
+    if _if_none_match(request, etag):
+        return _not_modified(etag)
+    response = HttpResponse(content, content_type=content_type)
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
+    response["X-Cache"] = "HIT"
+    return response
+
+
+def _store_response(request, key, response):
+    """Cache a rendered 200 response; returns what to send back."""
+    etag = '"%s"' % hashlib.md5(response.content, usedforsecurity=False).hexdigest()
+    _cache().set(key, (response.content, response["Content-Type"], etag))
+
+    if _if_none_match(request, etag):
+        return _not_modified(etag)
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
+    response["X-Cache"] = "MISS"
+    return response
+
+
+def cache_response(per_user=False, vary=None):
+    """
+    Decorator for read-only ViewSet actions. ``per_user=True`` keys admins
+    per user too, for actions whose output depends on who asks (search).
+    ``vary``, a function of the request, adds to the key what else the
+    output depends on and no version bump follows (the date, for stats).
+    Only 200 non-streaming responses are cached.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(view, request, *args, **kwargs):
+            key = _make_key(
+                request, per_user, view.basename, view.action,
+                view.kwargs.get("pk", ""), request.accepted_renderer.format,
+                vary(request) if vary else "",
+            )
+            cached = _cache().get(key)
+            if cached is not None:
+                return _cached_response(request, cached)
+
+            response = func(view, request, *args, **kwargs)
+            if response.status_code != 200 or response.streaming:
+                return response
+
+            # Render now (DRF would do it later) so the bytes can be stored
+            response.accepted_renderer = request.accepted_renderer
+            response.accepted_media_type = request.accepted_media_type
+            response.renderer_context = view.get_renderer_context()
+            response.render()
+            return _store_response(request, key, response)
+        return wrapper
+    return decorator
+
+
+def acache_response(per_user=False):
+    """
+    cache_response() for the async views in core.async_views, which return
+    rendered JSON HttpResponses. Cache calls stay synchronous: the default
+    store is in-process, so they don't block the event loop on I/O.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(request, *args, **kwargs):
+            key = _make_key(request, per_user, "async", func.__name__, kwargs.get("pk", ""), "json")
+            cached = _cache().get(key)
+            if cached is not None:
+                return _cached_response(request, cached)
+
+            response = await func(request, *args, **kwargs)
+            if response.status_code != 200 or response.streaming:
+                return response
+            return _store_response(request, key, response)
+        return wrapper
+    return decorator
@@ -0,0 +1,212 @@
+"""
+Token revocation (logout, "log out everywhere") checked without a query.
+
+Tokens issued at login carry two claims, copied into every access token
+refreshed from them:
+
+* SESSION_CLAIM, the login's session id (its refresh token's jti);
+* LOGIN_TIME_CLAIM, when the login happened (epoch seconds, float).
+
+A RevokedToken row revokes one session, or every session of a user that
+started before it. CachedJWTAuthentication and the refresh endpoint reject
+tokens of revoked sessions. Older tokens without the claims are matched on
+jti and iat instead.
+
+Each process mirrors the rows that are still in force in a
+RevocationFilter: session ids in a Bloom filter backed by an exact set
+(most tokens were never revoked and are turned away by the Bloom filter;
+a hit is confirmed in the set, so no false rejections), and per-user
+cutoffs in a dict. A check is a few hash probes, no database round trip.
+
+The filter loads on first use (one indexed query over unexpired rows) and
+is brought up to date every REFRESH_SECONDS with the rows revoked since,
+re-reading the last SETTLE_SECONDS as transactions commit out of order
+(as in core.sync). Revocations made by this process apply at once, other
+processes' within REFRESH_SECONDS. Every RELOAD_SECONDS it is rebuilt from
+scratch, which drops expired entries.
+
+Rows expire with the tokens they revoke and are deleted by ``manage.py
+prune_revocations``.
+"""
+import math
+import threading
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import RevokedToken
+
+SESSION_CLAIM = "sid"
+LOGIN_TIME_CLAIM = "auth_time"
+
+REFRESH_SECONDS = 5
+SETTLE_SECONDS = 10
+RELOAD_SECONDS = 3600
+BLOOM_CAPACITY = 10_000      # entries before the filter is rebuilt twice as large
+BLOOM_ERROR_RATE = 0.01
+
+
+class BloomFilter:
+    """Set membership in ``capacity`` x ~10 bits; may answer True for absent keys, never False for present ones."""
+
+    def __init__(self, capacity=BLOOM_CAPACITY, error_rate=BLOOM_ERROR_RATE):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing (Kirsch-Mitzenmacher): k positions from the two
+        # 32-bit halves of Python's string hash. It is seeded per process,
+        # and so is the filter.
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        h1, h2, size = h & 0xFFFFFFFF, (h >> 32) | 1, self.size
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % size
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        for position in self._positions(key):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False  # most absent keys stop at the first probe
+        return True
+
+
+def token_lifetime():
+    """The longest any token lives: a revocation row is useless after that."""
+    return max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME)
+
+
+class RevocationFilter:
+    """The unexpired RevokedToken rows of the database, in memory."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Forget everything: the next refresh_if_due() loads from the database."""
+        with self._lock:
+            self._bloom = BloomFilter()
+            self._sessions = set()
+            self._users = {}           # user id (str) -> cutoff (epoch seconds)
+            self._position = None      # revoked_at up to which rows were read
+            self._refreshed_at = None  # time.monotonic() of the last refresh
+            self._loaded_at = None     # ... and of the last full load
+
+    # --- writing ------------------------------------------------------------
+
+    def revoke_session(self, session, user_id):
+        now = timezone.now()
+        RevokedToken.objects.create(
+            session=session, user_id=user_id, revoked_at=now, expires_at=now + token_lifetime()
+        )
+        with self._lock:
+            self._add_session(session)
+
+    def revoke_user(self, user_id):
+        """Revoke every session of ``user_id`` started until now."""
+        now = timezone.now()
+        RevokedToken.objects.create(user_id=user_id, revoked_at=now, expires_at=now + token_lifetime())
+        with self._lock:
+            self._add_user(str(user_id), now.timestamp())
+
+    def _add_session(self, session):
+        if session in self._sessions:
+            return
+        # Readers don't lock: the filter is only replaced once complete,
+        # and a session only goes in the set once it is in the filter
+        if self._bloom.count >= self._bloom.capacity:
+            self._bloom = _bloom_of(self._sessions, self._bloom.capacity * 2)
+        self._bloom.add(session)
+        self._sessions.add(session)
+
+    def _add_user(self, user_id, cutoff):
+        if cutoff > self._users.get(user_id, 0):
+            self._users[user_id] = cutoff
+
+    # --- reading ------------------------------------------------------------
+
+    def is_revoked(self, payload):
+        """Whether a validated token's claims belong to a revoked session. Memory only."""
+        session = payload.get(SESSION_CLAIM) or payload.get(api_settings.JTI_CLAIM)
+        if session and session in self._bloom and session in self._sessions:
+            return True
+        cutoff = self._users.get(str(payload.get(api_settings.USER_ID_CLAIM)))
+        if cutoff is not None:
+            return payload.get(LOGIN_TIME_CLAIM, payload.get("iat", 0)) <= cutoff
+        return False
+
+    def refresh_if_due(self):
+        """Load or catch up with the database when due (sync code; see arefresh_if_due)."""
+        now = time.monotonic()
+        if self._refreshed_at is not None and now - self._refreshed_at < REFRESH_SECONDS:
+            return
+        if not self._lock.acquire(blocking=self._refreshed_at is None):
+            return  # another thread is refreshing: use what we have
+        try:
+            if self._loaded_at is None or now - self._loaded_at >= RELOAD_SECONDS:
+                self._load()
+                self._loaded_at = now
+            else:
+                self._catch_up()
+            self._refreshed_at = now
+        finally:
+            self._lock.release()
+
+    async def arefresh_if_due(self):
+        now = time.monotonic()
+        if self._refreshed_at is None or now - self._refreshed_at >= REFRESH_SECONDS:
+            await sync_to_async(self.refresh_if_due)()
+
+    def _load(self):
+        # Built aside and swapped in, so checks meanwhile use the old state
+        now = timezone.now()
+        sessions, users = set(), {}
+        for session, user_id, revoked_at in _rows(expires_at__gt=now):
+            if session:
+                sessions.add(session)
+            else:
+                users[str(user_id)] = max(users.get(str(user_id), 0), revoked_at.timestamp())
+        bloom = _bloom_of(sessions, max(BLOOM_CAPACITY, 2 * len(sessions)))
+        self._bloom, self._sessions, self._users = bloom, sessions, users
+        self._position = now
+
+    def _catch_up(self):
+        now = timezone.now()
+        since = self._position - timedelta(seconds=SETTLE_SECONDS)
+        for session, user_id, revoked_at in _rows(revoked_at__gte=since, expires_at__gt=now):
+            if session:
+                self._add_session(session)
+            else:
+                self._add_user(str(user_id), revoked_at.timestamp())
+        self._position = now
+
+
+def _rows(**filters):
+    return RevokedToken.objects.filter(**filters).values_list("session", "user_id", "revoked_at")
+
+
+def _bloom_of(sessions, capacity):
+    bloom = BloomFilter(capacity)
+    for session in sessions:
+        bloom.add(session)
+    return bloom
+
+
+revocations = RevocationFilter()
+
+
+def prune(now=None):
+    """Delete rows whose tokens have all expired; returns how many."""
+    deleted, _ = RevokedToken.objects.filter(expires_at__lte=now or timezone.now()).delete()
+    return deleted
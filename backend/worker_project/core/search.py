@@ -0,0 +1,282 @@
+"""
+Full-text search over project name and description.
+
+Matching is substring based (so prefixes match too) and case-insensitive.
+Work per query is bounded: matches are collected newest first up to
+RANK_WINDOW and only that window is ranked, so a query matching half the
+table costs the same as one matching a thousand rows. When the window
+overflows the result says so (``capped``) instead of counting every match.
+
+Where matches come from:
+
+* Admin (all projects) on SQLite: an FTS5 table with the trigram tokenizer
+  (SQLite >= 3.34), ``core_project_fts``, rowid = project id, ranked with
+  bm25 (name weighted over description). Kept in sync by the Project
+  signals (core.signals) and ProjectQuerySet.bulk_create.
+* Admin on PostgreSQL: icontains lookups served by pg_trgm GIN indexes on
+  UPPER(name) / UPPER(description), which the database maintains itself.
+* Workers (own projects): icontains over their rows via the worker index.
+
+Typo tolerance: when nothing matches, each term is replaced by the known
+words within allowed_typos() edits of it, looked up in the SearchWord
+vocabulary (a symmetric-deletion index: every word is stored under itself
+and each of its one-letter deletions), and the search runs again.
+"""
+import re
+from functools import partial, reduce
+from operator import and_, or_
+from typing import NamedTuple
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.html import escape
+
+FTS_TABLE = "core_project_fts"  # created by migration 0006, like the pg_trgm indexes
+
+RANK_WINDOW = 1000
+MAX_CORRECTIONS = 5
+MIN_FUZZY_LENGTH = 4   # shorter words are never corrected, nor stored in the vocabulary
+MAX_WORD_LENGTH = 40
+SNIPPET_CHARS = 80
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def terms(query):
+    """Lower-cased search terms of a query string."""
+    return [t.lower() for t in _TERM_RE.findall(query)]
+
+
+class SearchResult(NamedTuple):
+    total: int          # matches found (at most RANK_WINDOW)
+    capped: bool        # more than RANK_WINDOW matched
+    ids: list           # the requested page, best first
+    fuzzy: bool         # typo-corrected search
+    terms: list         # what was actually matched, for highlighting
+
+
+# --- index maintenance ------------------------------------------------------
+
+def _uses_fts():
+    return connection.vendor == "sqlite"
+
+
+def deletions(word):
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+# Words already in the vocabulary, so re-indexing doesn't re-insert them.
+# Only committed words: after a rollback they must be inserted again.
+_known_words = set()
+
+
+def _remember_words(words):
+    if len(_known_words) > 200_000:
+        _known_words.clear()
+    _known_words.update(words)
+
+
+def _index_rows(rows, SearchWord, conn, batch_size=1000):
+    fts = conn.vendor == "sqlite"
+    batch, words = [], set()
+
+    def flush():
+        if fts and batch:
+            with conn.cursor() as cursor:
+                cursor.executemany(
+                    f"INSERT OR REPLACE INTO {FTS_TABLE} (rowid, name, description) VALUES (%s, %s, %s)",
+                    batch,
+                )
+        new_words = words - _known_words
+        if new_words:
+            SearchWord.objects.bulk_create(
+                [
+                    SearchWord(variant=variant, word=word)
+                    for word in new_words
+                    for variant in {word} | deletions(word)
+                ],
+                ignore_conflicts=True,
+            )
+            transaction.on_commit(partial(_remember_words, new_words), using=conn.alias)
+        batch.clear()
+        words.clear()
+
+    for pk, name, description in rows:
+        batch.append((pk, name, description or ""))
+        words.update(
+            w for w in terms(f"{name} {description or ''}")
+            if MIN_FUZZY_LENGTH <= len(w) <= MAX_WORD_LENGTH
+        )
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+
+def index_projects(projects):
+    """(Re)index Project instances."""
+    from .models import SearchWord
+
+    _index_rows(((p.pk, p.name, p.description) for p in projects), SearchWord, connection)
+
+
+def unindex_projects(ids):
+    # The vocabulary only grows: a stale word can only suggest a correction
+    # that then finds nothing
+    if _uses_fts() and ids:
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(pk,) for pk in ids])
+
+
+# --- querying ---------------------------------------------------------------
+
+def search(query, worker_id=None, offset=0, limit=20):
+    """Search ``query``, in one worker's projects when ``worker_id`` is given."""
+    query_terms = terms(query)
+    if not query_terms:
+        return SearchResult(0, False, [], False, [])
+
+    groups = [[t] for t in query_terms]
+    ranked, capped = _matches(groups, worker_id)
+    fuzzy = False
+    if not ranked:
+        corrected = [[t] + corrections(t) for t in query_terms]
+        if corrected != groups:
+            groups, fuzzy = corrected, True
+            ranked, capped = _matches(groups, worker_id)
+
+    return SearchResult(
+        total=len(ranked),
+        capped=capped,
+        ids=ranked[offset:offset + limit],
+        fuzzy=fuzzy,
+        terms=sorted({t for group in groups for t in group}),
+    )
+
+
+def corrections(term):
+    """Known words within allowed_typos() of ``term``, closest first."""
+    from .models import SearchWord
+
+    if len(term) < MIN_FUZZY_LENGTH or len(term) > MAX_WORD_LENGTH:
+        return []
+    candidates = SearchWord.objects.filter(variant__in={term} | deletions(term)).values_list("word", flat=True)
+    scored = sorted(
+        (-term_similarity(term, word), word) for word in set(candidates) if word != term
+    )
+    return [word for score, word in scored if score < 0][:MAX_CORRECTIONS]
+
+
+def _matches(groups, worker_id):
+    """(ids best first, capped) for AND over groups of OR-ed alternatives."""
+    if worker_id is None and _uses_fts():
+        return _fts_matches(groups)
+    return _orm_matches(groups, worker_id)
+
+
+def _fts_phrase(term):
+    return '"%s"' % term.replace('"', '""')
+
+
+def _fts_matches(groups):
+    # The trigram tokenizer needs 3+ characters per term; shorter terms use
+    # LIKE, which FTS5 answers from the same table
+    where, params, match = [], [], []
+    for group in groups:
+        if all(len(t) >= 3 for t in group):
+            match.append("(" + " OR ".join(_fts_phrase(t) for t in group) + ")")
+        else:
+            where.append("(" + " OR ".join(["name LIKE %s OR description LIKE %s"] * len(group)) + ")")
+            params += [f"%{t}%" for t in group for _ in range(2)]
+    if match:
+        where.insert(0, f"{FTS_TABLE} MATCH %s")
+        params.insert(0, " AND ".join(match))
+    rank = "rank" if match else "0"
+
+    # Newest RANK_WINDOW matches, streamed in rowid order (no full scan of
+    # the matches), then ranked
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, {rank} FROM {FTS_TABLE} WHERE {' AND '.join(where)} "
+            f"ORDER BY rowid DESC LIMIT {RANK_WINDOW + 1}",
+            params,
+        )
+        rows = cursor.fetchall()
+    capped = len(rows) > RANK_WINDOW
+    rows = sorted(rows[:RANK_WINDOW], key=lambda row: (row[1], -row[0]))
+    return [pk for pk, _ in rows], capped
+
+
+def _orm_matches(groups, worker_id):
+    from .models import Project
+
+    condition = reduce(and_, (
+        reduce(or_, (Q(name__icontains=t) | Q(description__icontains=t) for t in group))
+        for group in groups
+    ))
+    projects = Project.objects.filter(condition)
+    if worker_id is not None:
+        projects = projects.filter(worker_id=worker_id)
+    rows = list(projects.order_by("-id").values_list("id", "name", "description")[:RANK_WINDOW + 1])
+    capped = len(rows) > RANK_WINDOW
+    alternatives = [t for group in groups for t in group]
+
+    def score(row):
+        _, name, description = row
+        name, description = name.lower(), (description or "").lower()
+        return sum(10 * name.count(t) + description.count(t) for t in alternatives)
+
+    rows = sorted(rows[:RANK_WINDOW], key=lambda row: (-score(row), -row[0]))
+    return [row[0] for row in rows], capped
+
+
+# --- typo scoring and highlighting -----------------------------------------
+
+def allowed_typos(term):
+    return 0 if len(term) < MIN_FUZZY_LENGTH else 1 if len(term) < 8 else 2
+
+
+def edit_distance(a, b):
+    """Optimal string alignment distance (Levenshtein plus transpositions)."""
+    previous2, previous = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            current[j] = min(
+                previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb),
+            )
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def term_similarity(term, word):
+    """1.0 for an exact match, lower per typo, 0 beyond allowed_typos()."""
+    distance = edit_distance(term, word)
+    if distance > allowed_typos(term):
+        return 0.0
+    return 1.0 - distance / len(term)
+
+
+def highlight(text, matched_terms, snippet=False):
+    """
+    HTML-escape ``text`` and wrap matches of ``matched_terms`` in <mark>.
+    With ``snippet=True`` the text is cut to about SNIPPET_CHARS around the
+    first match.
+    """
+    if not text or not matched_terms:
+        return escape(text) if text else text
+    pattern = "|".join(re.escape(t) for t in sorted(matched_terms, key=len, reverse=True))
+    regex = re.compile(f"({pattern})", re.IGNORECASE)
+
+    if snippet and len(text) > SNIPPET_CHARS:
+        match = regex.search(text)
+        start = max(0, (match.start() if match else 0) - SNIPPET_CHARS // 4)
+        end = start + SNIPPET_CHARS
+        text = ("…" if start else "") + text[start:end] + ("…" if end < len(text) else "")
+
+    # split() with one group alternates unmatched / matched pieces
+    return "".join(
+        f"<mark>{escape(part)}</mark>" if i % 2 else escape(part)
+        for i, part in enumerate(regex.split(text))
+    )
@@ -7,7 +7,7 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
-from django.core.mail import send_mail
+from . import metrics, outbox
 
 from django.utils.http import urlsafe_base64_decode
 from django.contrib.auth.tokens import default_token_generator
@@ -37,38 +37,85 @@ class PasswordResetConfirmSerializer(serializers.Serializer):
         user.set_password(self.validated_data["new_password"])
         user.save()
 
+def password_reset_link(user):
+    """One-time link to the frontend's reset form for ``user``."""
+    token = default_token_generator.make_token(user)
+    uidb64 = urlsafe_base64_encode(force_bytes(user.pk))
+    return f"http://localhost:3000/reset-password/{uidb64}/{token}/"
+
+
 class PasswordResetSerializer(serializers.Serializer):
     email = serializers.EmailField()
 
     def validate_email(self, value):
-        if not User.objects.filter(email=value, role="WORKER").exists():
+        # The one user lookup of the request; save() reuses it
+        self.user = User.objects.filter(email=value, role="WORKER").order_by("pk").first()
+        if self.user is None:
             raise serializers.ValidationError("Worker with this email does not exist")
         return value
 
     def save(self):
         email = self.validated_data["email"]
-        user = User.objects.get(email=email, role="WORKER")
-        token = default_token_generator.make_token(user)
-        uidb64 = urlsafe_base64_encode(force_bytes(user.pk))
-
-        # Construct reset link
-        reset_link = f"http://localhost:3000/reset-password/{uidb64}/{token}/"
+        reset_link = password_reset_link(self.user)
         
         # Print the link in the console for testing
         print(f"Password reset link for {email}: {reset_link}")
 
-        # Send email (console backend will print to terminal in dev)
-        send_mail(
+        # Queued, not sent: the send_outbox worker delivers it
+        outbox.enqueue(
             subject="Worker Password Reset",
-            message=f"Click the link to reset your password: {reset_link}",
+            body=f"Click the link to reset your password: {reset_link}",
             from_email="noreply@example.com",
-            recipient_list=[email],
+            to=email,
         )
         
         return reset_link
 
 
-class ProjectSerializer(serializers.ModelSerializer):
+class DynamicFieldsMixin:
+    """
+    Lets GET requests pick a subset of fields with ?fields=a,b,c so list
+    views can skip heavy columns like description.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        if request is None or request.method != "GET":
+            return
+        requested = self.requested_fields(request)
+        if requested:
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+
+    @classmethod
+    def requested_fields(cls, request):
+        """Return the known field names asked for in ?fields=, or None."""
+        raw = request.query_params.get("fields")
+        if not raw:
+            return None
+        requested = {f.strip() for f in raw.split(",")} & set(cls.Meta.fields)
+        return requested or None
+
+
+class TimedDataMixin:
+    """Counts building ``.data`` as serializer time in the request metrics (core.metrics)."""
+
+    @property
+    def data(self):
+        with metrics.timed("serializer"):
+            return super().data
+
+
+class ProjectListSerializer(TimedDataMixin, serializers.ListSerializer):
+    def create(self, validated_data):
+        # One INSERT for the whole batch instead of one per project
+        user = self.context['request'].user
+        return Project.objects.bulk_create(
+            [Project(**{"worker": user, **item}) for item in validated_data]
+        )
+
+
+class ProjectSerializer(TimedDataMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Project
         fields = [
@@ -84,11 +131,12 @@ class ProjectSerializer(serializers.ModelSerializer):
             'longitude',   # ✅ new
         ]
         read_only_fields = ['worker', 'created_at']  # worker cannot be changed
+        list_serializer_class = ProjectListSerializer
         
     def create(self, validated_data):
-        # Assign the current user as the worker
-        user = self.context['request'].user
-        return Project.objects.create(worker=user, **validated_data)
+        # Assign the current user as the worker (unless save(worker=...) did)
+        validated_data.setdefault("worker", self.context['request'].user)
+        return Project.objects.create(**validated_data)
         
 
 
@@ -138,7 +186,7 @@ class AdminRegisterSerializer(serializers.ModelSerializer):
 
 
 # Show user info (after login)
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedDataMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ["id", "username", "email", "role"]
@@ -0,0 +1,159 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import clusters, events, metrics, response_cache, search, stats
+from .authentication import user_cache
+from .models import Project, ProjectStat, ProjectTombstone, User
+
+# Fields whose change moves a project between clusters
+CLUSTER_FIELDS = {"status", "latitude", "longitude", "geo_cell"}
+# Fields whose change moves a project between stats rows
+STATS_FIELDS = {"status", "finish_date", "worker", "worker_id"}
+# Fields in the full-text index
+SEARCH_FIELDS = {"name", "description"}
+
+
+def projects_bulk_created(projects):
+    """What the Project receivers below do, for a bulk_create batch."""
+    clusters.track(added=[
+        clusters.point(p.geo_cell, p.status, p.latitude, p.longitude) for p in projects
+    ])
+    stats.track(added=[stats.key(p.worker_id, p.status, p.finish_date) for p in projects])
+    search.index_projects(projects)
+    response_cache.bump({p.worker_id for p in projects})
+    # One list serializer: a ProjectSerializer per project rebuilds its fields each time
+    for p, data in zip(projects, _event_data(projects, many=True)):
+        events.publish_on_commit(events.CREATED, p.worker_id, data)
+
+
+def _event_data(project, many=False):
+    from .serializers import ProjectSerializer
+
+    return ProjectSerializer(project, many=many).data
+
+
+@receiver(pre_save, sender=Project)
+def remember_cluster_point(sender, instance, update_fields=None, using=None, **kwargs):
+    # Look up the stored row so post_save can move the project out of its
+    # old cluster and stats row (and report status changes). Skipped for new
+    # rows and for saves that can't move it. Locked until Project.save's
+    # transaction ends: a concurrent save reads the row after this one.
+    instance._old_cluster_point = instance._old_stat_key = instance._old_status = None
+    if instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not (CLUSTER_FIELDS | STATS_FIELDS) & set(update_fields):
+        return
+    row = sender.objects.using(using).select_for_update().filter(pk=instance.pk).values_list(
+        "geo_cell", "status", "latitude", "longitude", "worker_id", "finish_date"
+    ).first()
+    if row:
+        geo_cell, status, latitude, longitude, worker_id, finish_date = row
+        instance._old_cluster_point = clusters.point(geo_cell, status, latitude, longitude)
+        instance._old_stat_key = stats.key(worker_id, status, finish_date)
+        instance._old_status = status
+
+
+@receiver(post_save, sender=Project)
+def update_clusters_on_save(sender, instance, created, update_fields=None, **kwargs):
+    if not created and update_fields is not None and not CLUSTER_FIELDS & set(update_fields):
+        return
+    old = getattr(instance, "_old_cluster_point", None)
+    new = clusters.point(instance.geo_cell, instance.status, instance.latitude, instance.longitude)
+    if old != new:
+        clusters.track(added=[new], removed=[old])
+
+
+@receiver(post_delete, sender=Project)
+def update_clusters_on_delete(sender, instance, **kwargs):
+    clusters.track(
+        removed=[clusters.point(instance.geo_cell, instance.status, instance.latitude, instance.longitude)]
+    )
+
+
+@receiver(post_save, sender=Project)
+def update_stats_on_save(sender, instance, created, update_fields=None, **kwargs):
+    if not created and update_fields is not None and not STATS_FIELDS & set(update_fields):
+        return
+    old = getattr(instance, "_old_stat_key", None)
+    new = stats.key(instance.worker_id, instance.status, instance.finish_date)
+    if old != new:
+        stats.track(added=[new], removed=[old])
+
+
+@receiver(post_delete, sender=Project)
+def update_stats_on_delete(sender, instance, **kwargs):
+    stats.track(removed=[stats.key(instance.worker_id, instance.status, instance.finish_date)])
+
+
+@receiver(post_save, sender=Project)
+def index_project_for_search(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not SEARCH_FIELDS & set(update_fields):
+        return
+    search.index_projects([instance])
+
+
+@receiver(post_delete, sender=Project)
+def unindex_project_for_search(sender, instance, **kwargs):
+    search.unindex_projects([instance.pk])
+
+
+@receiver(post_save, sender=Project)
+def publish_project_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        events.publish_on_commit(events.CREATED, instance.worker_id, _event_data(instance))
+        return
+    old_status = getattr(instance, "_old_status", None)
+    if old_status is not None and old_status != instance.status:
+        events.publish_on_commit(events.STATUS_CHANGED, instance.worker_id, events.status_changed_data(
+            instance.pk, instance.worker_id, instance.status, old_status
+        ))
+    if update_fields is None or set(update_fields) - {"status", "updated_at"}:
+        events.publish_on_commit(events.UPDATED, instance.worker_id, _event_data(instance))
+
+
+@receiver(post_delete, sender=Project)
+def publish_project_deleted(sender, instance, **kwargs):
+    events.publish_on_commit(events.DELETED, instance.worker_id, {"id": instance.pk, "worker": instance.worker_id})
+
+
+@receiver(post_delete, sender=Project)
+def record_project_tombstone(sender, instance, **kwargs):
+    # Delta sync (core.sync) reports the deletion from this row
+    ProjectTombstone.objects.create(project_id=instance.pk, worker_id=instance.worker_id)
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def invalidate_project_responses(sender, instance, **kwargs):
+    response_cache.bump([instance.worker_id])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_responses(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login, which no cached response shows
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    response_cache.bump([instance.pk])
+
+
+@receiver(post_delete, sender=User)
+def delete_worker_stats(sender, instance, **kwargs):
+    # Runs after the cascade deleted (and un-counted) their projects
+    ProjectStat.objects.filter(worker_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # Every save, last_login included: the cached row must match the table
+    user_cache.invalidate(str(instance.pk))
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    # Counts and times the queries of each request (core.metrics). Fires
+    # again when a persistent connection reconnects: add the wrapper once.
+    if metrics.execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(metrics.execute_wrapper)
@@ -0,0 +1,140 @@
+"""
+Precomputed project statistics for the stats endpoint
+(GET /api/projects/stats/, ProjectViewSet.stats).
+
+ProjectStat keeps the number of projects per (worker, status, due_month),
+where ``due_month`` is the first day of the finish_date's month for open
+projects. Projects that are COMPLETED or have no finish_date can never be
+overdue; they are counted under NO_DUE, so each worker has one such row per
+status. A dashboard reads O(workers x open deadline months) aggregate rows
+instead of every project:
+
+* per worker and status: sum over due_month;
+* overdue (finish_date passed, not COMPLETED): the rows of past months,
+  plus the open projects due earlier this month, counted live from the
+  (finish_date, status, worker) index;
+* deadlines ahead: open projects per due_month.
+
+Like core.clusters, the table is maintained incrementally: ``track()``
+applies +/- deltas for added, removed or changed projects in one upsert,
+from the Project signals (core.signals) and from bulk code paths that
+bypass them. ``rebuild()`` recomputes it in chunks of projects
+(``manage.py rebuild_stats``).
+"""
+import datetime
+from collections import Counter, defaultdict
+
+from django.db import connection
+from django.db.models import Case, Count, DateField, Q, Sum, Value, When
+from django.db.models.functions import TruncMonth
+
+from .models import ProjectStat
+
+NO_DUE = datetime.date.max  # COMPLETED or undated: never overdue
+OPEN_STATUSES = ("PENDING", "IN_PROGRESS")
+REBUILD_CHUNK_SIZE = 50_000  # projects per aggregate query
+
+
+def key(worker_id, status, finish_date):
+    """A project as seen by the stats table: (worker_id, status, due_month)."""
+    if status not in OPEN_STATUSES or finish_date is None:
+        return (worker_id, status, NO_DUE)
+    return (worker_id, status, finish_date.replace(day=1))
+
+
+def track(added=(), removed=()):
+    """Apply stats deltas for projects added and removed (``key()`` tuples)."""
+    deltas = Counter()
+    for sign, keys in ((1, added), (-1, removed)):
+        for k in keys:
+            if k is not None:
+                deltas[k] += sign
+
+    rows = [(*k, n) for k, n in deltas.items() if n]
+    if not rows:
+        return
+
+    # Same increment-on-conflict upsert as clusters.track()
+    table = connection.ops.quote_name(ProjectStat._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {table} (worker_id, status, due_month, count) VALUES (%s, %s, %s, %s) "
+            f"ON CONFLICT (worker_id, status, due_month) DO UPDATE SET count = {table}.count + excluded.count",
+            rows,
+        )
+
+
+def rebuild(Project, ProjectStat, chunk_size=REBUILD_CHUNK_SIZE):
+    """
+    Recompute the table from scratch, aggregating ``chunk_size`` projects
+    (by id) per query. Run it in a transaction so concurrent writes don't
+    interleave with the scan.
+    """
+    due_month = Case(
+        When(Q(status__in=OPEN_STATUSES) & Q(finish_date__isnull=False), then=TruncMonth("finish_date")),
+        default=Value(NO_DUE),
+        output_field=DateField(),
+    )
+    counts = Counter()
+    last_id = 0
+    while True:
+        ids = Project.objects.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)
+        chunk_end = ids[chunk_size - 1:chunk_size].first()
+        chunk = Project.objects.filter(id__gt=last_id)
+        if chunk_end is not None:
+            chunk = chunk.filter(id__lte=chunk_end)
+        groups = chunk.values_list("worker_id", "status", due_month).annotate(Count("id")).order_by()
+        for worker_id, status, month, n in groups:
+            counts[(worker_id, status, month)] += n
+        if chunk_end is None:
+            break
+        last_id = chunk_end
+
+    ProjectStat.objects.all().delete()
+    ProjectStat.objects.bulk_create(
+        (ProjectStat(worker_id=w, status=s, due_month=m, count=n) for (w, s, m), n in counts.items()),
+        batch_size=2000,
+    )
+
+
+def summary(stats, projects, today):
+    """
+    Totals from a ProjectStat queryset and the matching Project queryset
+    (for this month's overdue projects): {"statuses", "total", "open",
+    "overdue", "due_by_month", "workers": {worker_id: {...}}}.
+    """
+    workers = defaultdict(lambda: {"statuses": {}, "total": 0, "open": 0, "overdue": 0})
+    statuses = Counter()
+    for worker_id, status, n in stats.values_list("worker_id", "status").annotate(Sum("count")).order_by():
+        if not n:
+            continue
+        worker = workers[worker_id]
+        worker["statuses"][status] = n
+        worker["total"] += n
+        if status in OPEN_STATUSES:
+            worker["open"] += n
+        statuses[status] += n
+
+    this_month = today.replace(day=1)
+    overdue = Counter(dict(
+        stats.filter(due_month__lt=this_month, count__gt=0).values_list("worker_id").annotate(Sum("count")).order_by()
+    ))
+    overdue.update(dict(
+        projects.filter(status__in=OPEN_STATUSES, finish_date__gte=this_month, finish_date__lt=today)
+        .values_list("worker_id").annotate(Count("id")).order_by()
+    ))
+    for worker_id, n in overdue.items():
+        workers[worker_id]["overdue"] = n
+
+    due_by_month = (
+        stats.filter(count__gt=0).exclude(due_month=NO_DUE)
+        .values_list("due_month").annotate(Sum("count")).order_by("due_month")
+    )
+    return {
+        "statuses": dict(statuses),
+        "total": sum(statuses.values()),
+        "open": sum(statuses[s] for s in OPEN_STATUSES),
+        "overdue": sum(overdue.values()),
+        "due_by_month": {month.strftime("%Y-%m"): n for month, n in due_by_month if n},
+        "workers": workers,
+    }
@@ -0,0 +1,136 @@
+"""
+Delta sync for clients that keep a local copy of their projects
+(GET /api/projects/changes/?since=<token>, ProjectViewSet.changes).
+
+A sync token is an opaque position in two streams, both read in
+(time, id) order from an index: projects by updated_at, and deletions
+(ProjectTombstone) by deleted_at. Each request returns at most ``limit``
+rows of each past the position, so a sync costs what changed since the
+last one, not the size of the project list. Without a token the client
+gets its first full download, in the same batches.
+
+Transactions don't commit in updated_at order: a row stamped before a
+position already handed out can become visible afterwards. So once a
+stream is exhausted, its position is set back to SETTLE_SECONDS ago; the
+last few seconds of changes are sent again on the next sync, and clients
+apply them idempotently (upsert by id, delete by id).
+
+Tombstones are pruned after TOMBSTONE_RETENTION (``manage.py
+prune_tombstones``). Older tokens get 410 Gone and the client downloads
+the list again.
+"""
+import base64
+from datetime import timedelta
+from typing import NamedTuple
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
+
+from .models import ProjectTombstone
+
+BATCH_SIZE = 500
+MAX_BATCH_SIZE = 1000
+SETTLE_SECONDS = 10
+TOMBSTONE_RETENTION = timedelta(days=30)
+TOKEN_VERSION = "1"
+
+
+class SyncTokenExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = "Sync token expired, download the full project list again."
+    default_code = "sync_token_expired"
+
+
+class Changes(NamedTuple):
+    changed: list   # project rows (updated_at, id order)
+    deleted: list   # ids of deleted projects
+    has_more: bool  # call again with ``token`` right away
+    token: str
+
+
+def encode_token(project_position, tombstone_position):
+    parts = [TOKEN_VERSION]
+    for position in (project_position, tombstone_position):
+        at, pk = position or (None, 0)
+        parts += [at.isoformat() if at else "", str(pk)]
+    return base64.urlsafe_b64encode("|".join(parts).encode()).decode()
+
+
+def decode_token(token):
+    """(project position, tombstone position); a position is (time, id) or None."""
+    try:
+        version, *parts = base64.urlsafe_b64decode(token.encode()).decode().split("|")
+        if version != TOKEN_VERSION or len(parts) != 4:
+            raise ValueError(token)
+        positions = []
+        for at, pk in (parts[:2], parts[2:]):
+            if not at:
+                positions.append(None)
+                continue
+            at = parse_datetime(at)
+            if at is None:
+                raise ValueError(token)
+            positions.append((at, int(pk)))
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ParseError("Invalid sync token")
+    return positions
+
+
+def _after(queryset, time_field, position):
+    queryset = queryset.order_by(time_field, "id")
+    if position is None:
+        return queryset
+    at, pk = position
+    return queryset.filter(Q(**{f"{time_field}__gt": at}) | Q(**{time_field: at, "id__gt": pk}))
+
+
+def tombstones_for(user):
+    if user.role == "ADMIN":
+        return ProjectTombstone.objects.all()
+    return ProjectTombstone.objects.filter(worker_id=user.pk)
+
+
+def changes(projects, tombstones, token=None, limit=BATCH_SIZE):
+    """
+    The next batch of changes after ``token``. ``projects`` yields rows with
+    ``updated_at`` and ``id`` attributes (instances or named values rows),
+    ``tombstones`` is a ProjectTombstone queryset; both already scoped to
+    the user.
+    """
+    now = timezone.now()
+    horizon = (now - timedelta(seconds=SETTLE_SECONDS), 0)
+    if token:
+        project_position, tombstone_position = decode_token(token)
+        if tombstone_position is None or tombstone_position[0] < now - TOMBSTONE_RETENTION:
+            raise SyncTokenExpired()
+    else:
+        # First download: nothing to delete yet, only what is deleted from now on
+        project_position, tombstone_position = None, horizon
+
+    changed = list(_after(projects, "updated_at", project_position)[:limit + 1])
+    deleted = list(
+        _after(tombstones, "deleted_at", tombstone_position).values_list("deleted_at", "id", "project_id")[:limit + 1]
+    )
+
+    more_changed = len(changed) > limit
+    more_deleted = len(deleted) > limit
+    changed, deleted = changed[:limit], deleted[:limit]
+    # Exhausted streams continue from the horizon (see the module docstring)
+    project_position = (changed[-1].updated_at, changed[-1].id) if more_changed else horizon
+    tombstone_position = deleted[-1][:2] if more_deleted else horizon
+
+    return Changes(
+        changed=changed,
+        deleted=[project_id for _, _, project_id in deleted],
+        has_more=more_changed or more_deleted,
+        token=encode_token(project_position, tombstone_position),
+    )
+
+
+def prune_tombstones(older_than=TOMBSTONE_RETENTION):
+    """Delete tombstones past the retention; returns how many."""
+    deleted, _ = ProjectTombstone.objects.filter(deleted_at__lt=timezone.now() - older_than).delete()
+    return deleted
@@ -1,3 +1,2039 @@
-from django.test import TestCase
+import asyncio
+import base64
+import collections
+import csv
+import datetime
+import gzip
+import importlib.util
+import io
+import json
+import random
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.cache import caches
+from django.db import connection, connections, models, transaction
+from django.db.models import QuerySet
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import (
+    admin as core_admin, admission, archive, clusters, compression, db_routers, events, geo, imports, metrics,
+    outbox, renderers, response_cache, revocation, search, stats, sync, throttling,
+)
+from .authentication import user_cache
+from .cache_backends import LocalLRUCache
+from .fast_serializers import project_fast_serializer, user_fast_serializer
+from .models import (
+    ArchivedProject, ImportJob, OutboxEmail, ProjectCluster, ProjectStat, ProjectTombstone, RevokedToken, SearchWord,
+    User, Project,
+)
+from .serializers import ProjectSerializer, UserSerializer
+from .views import CustomTokenObtainPairSerializer, ProjectViewSet
+
+
+class QueryPlanTests(TestCase):
+    """
+    Run each endpoint, capture the SQL it sends and check with EXPLAIN that
+    the database answers it from an index rather than a full table scan.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username="admin", role="ADMIN")
+        cls.workers = [User.objects.create(username=f"worker{i}") for i in range(5)]
+        Project.objects.bulk_create([
+            Project(worker=w, name=f"Project {w.pk}-{i}", status=status)
+            for w in cls.workers
+            for i, status in enumerate(["PENDING", "IN_PROGRESS", "COMPLETED"] * 4)
+        ])
+
+    def setUp(self):
+        caches["api"].clear()  # every request must reach the database
+        self.client = APIClient()
+        if connection.vendor == "postgresql":
+            # Tiny tables always favour a seq scan; make the planner show
+            # whether an index is usable at all
+            with connection.cursor() as cursor:
+                cursor.execute("SET enable_seqscan TO off")
+
+    def captured_sql(self, url, user, table="core_project"):
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [q["sql"] for q in queries if f'FROM "{table}"' in q["sql"]]
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == "sqlite":
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                return "\n".join(row[-1] for row in cursor.fetchall())
+            cursor.execute(f"EXPLAIN {sql}")
+            return "\n".join(row[0] for row in cursor.fetchall())
+
+    def assertUsesIndex(self, sql, index_name):
+        if connection.vendor not in ("sqlite", "postgresql"):
+            self.skipTest(f"no plan assertions for {connection.vendor}")
+        plan = self.explain(sql)
+        self.assertIn(index_name, plan, plan)
+        # An ORDER BY the index can't satisfy shows up as an extra sort step
+        self.assertNotIn("TEMP B-TREE", plan, plan)
+
+    def test_admin_list_uses_created_index(self):
+        [sql] = self.captured_sql("/api/projects/", self.admin)
+        self.assertUsesIndex(sql, "project_created_id_idx")
+
+    def test_admin_list_next_page_uses_created_index(self):
+        self.client.force_authenticate(self.admin)
+        next_url = self.client.get("/api/projects/?page_size=5").json()["next"]
+        [sql] = self.captured_sql(next_url, self.admin)
+        self.assertUsesIndex(sql, "project_created_id_idx")
+
+    def test_worker_list_uses_worker_created_index(self):
+        [sql] = self.captured_sql("/api/projects/", self.workers[0])
+        self.assertUsesIndex(sql, "project_worker_created_idx")
+
+    def test_search_uses_lower_name_index(self):
+        worker = self.workers[0]
+        # exists() check + the result query
+        for sql in self.captured_sql(f"/api/projects/search/?name=project {worker.pk}-1", worker):
+            self.assertUsesIndex(sql, "project_worker_lower_name_idx")
+
+    def test_search_is_case_insensitive(self):
+        worker = self.workers[0]
+        self.client.force_authenticate(worker)
+        response = self.client.get(f"/api/projects/search/?name=PROJECT {worker.pk}-1")
+        self.assertEqual([p["name"] for p in response.json()], [f"Project {worker.pk}-1"])
+
+    def test_grouped_projects_uses_role_index(self):
+        [sql] = self.captured_sql("/api/projects/grouped_projects/", self.admin, table="core_user")
+        self.assertUsesIndex(sql, "user_role_idx")
+
+    def test_worker_changes_use_updated_indexes(self):
+        worker = self.workers[0]
+        self.client.force_authenticate(worker)
+        token = self.client.get("/api/projects/changes/").json()["sync_token"]
+        url = f"/api/projects/changes/?since={token}"
+        [sql] = self.captured_sql(url, worker)
+        self.assertUsesIndex(sql, "project_worker_updated_idx")
+        [sql] = self.captured_sql(url, worker, table="core_projecttombstone")
+        self.assertUsesIndex(sql, "tombstone_worker_deleted_idx")
+
+    def test_stats_overdue_this_month_uses_finish_index(self):
+        sql = [
+            q for q in self.captured_sql("/api/projects/stats/", self.admin)
+            if "finish_date" in q
+        ]
+        if connection.vendor not in ("sqlite", "postgresql"):
+            self.skipTest(f"no plan assertions for {connection.vendor}")
+        # A range scan of this month's deadlines; grouping those few rows
+        # by worker may sort, so no assertUsesIndex()
+        self.assertIn("project_finish_status_idx", self.explain(sql[0]))
+
+    def test_status_dashboard_uses_worker_status_index(self):
+        queryset = Project.objects.filter(worker=self.workers[0], status="COMPLETED")
+        with CaptureQueriesContext(connection) as queries:
+            queryset.count()
+        self.assertUsesIndex(queries[0]["sql"], "project_worker_status_idx")
+
+
+class KeysetPaginationTests(TestCase):
+    """The project list's keyset cursors (core.pagination)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.worker = User.objects.create(username="worker")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.worker)
+
+    def get(self, url):
+        caches["api"].clear()
+        return self.client.get(url)
+
+    def pages(self, url):
+        """The ids of each page, following the next links."""
+        pages = []
+        while url:
+            body = self.get(url).json()
+            pages.append([p["id"] for p in body["results"]])
+            url = body["next"]
+        return pages
+
+    def create(self, n):
+        return [Project.objects.create(worker=self.worker, name=f"P{i}").pk for i in range(n)]
+
+    def test_pages_are_stable_across_inserts(self):
+        ids = self.create(7)
+        first = self.get("/api/projects/?page_size=3").json()
+        self.assertEqual([p["id"] for p in first["results"]], ids[:-4:-1])
+        self.create(2)  # newer: before the cursor, so never seen by it
+        rest = self.pages(first["next"])
+        self.assertEqual(rest, [ids[3:0:-1], ids[:1]])
+
+    def test_ties_on_created_at_go_by_id(self):
+        ids = self.create(5)
+        Project.objects.update(created_at=timezone.now())
+        self.assertEqual(self.pages("/api/projects/?page_size=2"), [ids[:-3:-1], ids[2:0:-1], ids[:1]])
+
+    def test_invalid_cursor_is_404(self):
+        self.create(1)
+        for cursor in ["garbage", "eHwx", base64.urlsafe_b64encode(b"2025-01-01T00:00:00|abc").decode()]:
+            response = self.get(f"/api/projects/?cursor={cursor}")
+            self.assertEqual(response.status_code, 404, cursor)
+            self.assertEqual(response.json(), {"detail": "Invalid cursor"})
+
+    def test_page_size_is_capped(self):
+        Project.objects.bulk_create([Project(worker=self.worker, name=f"P{i}") for i in range(502)])
+        body = self.get("/api/projects/?page_size=100000").json()
+        self.assertEqual(len(body["results"]), 500)
+        self.assertIsNotNone(body["next"])
+        self.assertEqual(len(self.get("/api/projects/?page_size=0").json()["results"]), 1)
+        self.assertEqual(len(self.get("/api/projects/?page_size=x").json()["results"]), 50)
+
+    def test_fields_projection_pages_too(self):
+        ids = self.create(3)
+        pages = []
+        url = "/api/projects/?page_size=2&fields=id,name"
+        while url:
+            body = self.get(url).json()
+            self.assertTrue(all(set(p) == {"id", "name"} for p in body["results"]))
+            pages.append([p["id"] for p in body["results"]])
+            url = body["next"]
+        self.assertEqual(pages, [ids[:0:-1], ids[:1]])
+
+
+class GroupedProjectsTests(TestCase):
+    """grouped_projects: a fixed number of queries, and the same JSON streamed or not."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username="admin", role="ADMIN")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def add_workers(self, n):
+        for _ in range(n):
+            worker = User.objects.create(username=f"worker{User.objects.count()}")
+            Project.objects.bulk_create([
+                Project(worker=worker, name=f"{worker.username} P{i}", status="IN_PROGRESS") for i in range(3)
+            ])
+
+    def get(self, url):
+        caches["api"].clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+            body = b"".join(response.streaming_content) if response.streaming else response.content
+        return len(queries), json.loads(body)
+
+    def test_query_count_does_not_grow_with_workers(self):
+        self.add_workers(2)
+        few = [self.get(url)[0] for url in ("/api/projects/grouped_projects/", "/api/projects/grouped_projects/?stream=1")]
+        self.add_workers(8)
+        many = [self.get(url)[0] for url in ("/api/projects/grouped_projects/", "/api/projects/grouped_projects/?stream=1")]
+        self.assertEqual(few, many)
+
+        # Streamed, projects come a chunk of workers at a time
+        with mock.patch.object(ProjectViewSet, "GROUPED_CHUNK_SIZE", 4):
+            chunked, _ = self.get("/api/projects/grouped_projects/?stream=1")
+        self.assertEqual(chunked, many[1] + 2)  # 10 workers: 3 chunks
+
+    def test_stream_parses_to_the_same_json(self):
+        self.add_workers(5)
+        Project.objects.create(worker=User.objects.get(username="worker2"), name="Unlocated")
+        for url in ("/api/projects/grouped_projects/", "/api/projects/grouped_projects/?include_archived=1"):
+            _, plain = self.get(url)
+            _, streamed = self.get(url + ("&" if "?" in url else "?") + "stream=1")
+            self.assertEqual(len(plain), 5)
+            self.assertEqual(streamed, plain)
+        self.assertEqual(self.get("/api/projects/grouped_projects/?stream=1")[1][0]["worker"]["username"], "worker1")
+
+
+class FastSerializerTests(TestCase):
+    """The fast read path must render byte-for-byte like the DRF serializers."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.worker = User.objects.create(username="worker", email="w@example.com")
+        Project.objects.create(
+            worker=cls.worker, name="Full", description="Some text",
+            start_date=datetime.date(2025, 1, 2), finish_date=datetime.date(2025, 3, 4),
+            status="IN_PROGRESS", latitude=Decimal("37.9838"), longitude=Decimal("-23.727539"),
+        )
+        Project.objects.create(worker=cls.worker, name="Empty")
+
+    def assertSameJSON(self, fast, slow):
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(fast), renderer.render(slow))
+
+    def test_project_output_is_identical(self):
+        queryset = Project.objects.order_by("id")
+        fast = project_fast_serializer.serialize(project_fast_serializer.values(queryset))
+        self.assertSameJSON(fast, ProjectSerializer(queryset, many=True).data)
+
+    def test_user_output_is_identical(self):
+        queryset = User.objects.order_by("id")
+        fast = user_fast_serializer.serialize(user_fast_serializer.values(queryset))
+        self.assertSameJSON(fast, UserSerializer(queryset, many=True).data)
+
+    def test_list_endpoint_matches_slow_path(self):
+        client = APIClient()
+        client.force_authenticate(self.worker)
+        for url in ("/api/projects/", "/api/projects/?fields=id,latitude,created_at"):
+            caches["api"].clear()
+            fast = client.get(url).content
+            caches["api"].clear()
+            with mock.patch.object(ProjectViewSet, "fast_serializer", None):
+                slow = client.get(url).content
+            self.assertEqual(fast, slow)
+
+
+class ResponseCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.worker = User.objects.create(username="worker")
+        cls.other = User.objects.create(username="other")
+        cls.project = Project.objects.create(worker=cls.worker, name="Cached")
+
+    def setUp(self):
+        caches["api"].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.worker)
+
+    def test_second_read_is_served_from_cache(self):
+        first = self.client.get("/api/projects/")
+        with self.assertNumQueries(0):
+            second = self.client.get("/api/projects/")
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(second.content, first.content)
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get("/api/projects/")["ETag"]
+        response = self.client.get("/api/projects/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_own_change_invalidates_but_other_workers_do_not(self):
+        self.client.get("/api/projects/")
+        with self.captureOnCommitCallbacks(execute=True):
+            Project.objects.create(worker=self.other, name="Elsewhere")
+        self.assertEqual(self.client.get("/api/projects/")["X-Cache"], "HIT")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"/api/projects/{self.project.pk}/update_status/", {"status": "COMPLETED"})
+        response = self.client.get("/api/projects/")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json()["results"][0]["status"], "COMPLETED")
+
+    def test_bump_waits_for_commit(self):
+        self.client.get("/api/projects/")
+        key = response_cache._worker_version(self.worker.pk)
+        version = response_cache._get_version(key)
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                Project.objects.filter(pk=self.project.pk).update(status="COMPLETED")
+                response_cache.bump([self.worker.pk])
+                # A read before the commit must not be cached as the new version
+                self.assertEqual(response_cache._get_version(key), version)
+                self.assertEqual(self.client.get("/api/projects/")["X-Cache"], "HIT")
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(response_cache._get_version(key), version)
+        callbacks[0]()  # the commit
+        self.assertNotEqual(response_cache._get_version(key), version)
+        response = self.client.get("/api/projects/")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json()["results"][0]["status"], "COMPLETED")
+
+    def test_bulk_status_update_invalidates(self):
+        self.client.get("/api/projects/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                "/api/projects/update_status/", [{"id": self.project.pk, "status": "IN_PROGRESS"}], format="json"
+            )
+        self.assertEqual(self.client.get("/api/projects/").json()["results"][0]["status"], "IN_PROGRESS")
+
+
+class CachedJWTAuthenticationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.worker = User.objects.create_user(username="worker", password="pw-123456")
+        Project.objects.create(worker=cls.worker, name="Mine")
+
+    def setUp(self):
+        caches["api"].clear()
+        caches["throttle"].clear()  # logs in as the same user over and over
+        user_cache.clear()
+        self.client = APIClient()
+        response = self.client.post("/api/login/", {"username": "worker", "password": "pw-123456"})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['access']}")
+
+    def test_repeat_requests_do_not_query_users(self):
+        url = f"/api/projects/{Project.objects.get().pk}/update_status/"
+        self.client.patch(url, {"status": "IN_PROGRESS"})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(url, {"status": "COMPLETED"})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q for q in queries if "core_user" in q["sql"]])
+
+    def test_cached_read_needs_no_queries_at_all(self):
+        self.client.get("/api/projects/")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get("/api/projects/").status_code, 200)
+
+    def test_password_change_revokes_token(self):
+        self.client.get("/api/projects/")
+        self.worker.set_password("new-pw-654321")
+        self.worker.save()
+        self.assertEqual(self.client.get("/api/projects/").status_code, 401)
+
+    def test_role_change_rejects_token(self):
+        self.client.get("/api/projects/")
+        self.worker.role = "ADMIN"
+        self.worker.save(update_fields=["role"])
+        self.assertEqual(self.client.get("/api/projects/").status_code, 401)
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get("/api/projects/")
+        self.worker.is_active = False
+        self.worker.save()
+        self.assertEqual(self.client.get("/api/projects/").status_code, 401)
+
+
+class AsyncViewTests(TestCase):
+    """The /api/async/ views must answer exactly like the DRF ones."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username="admin", password="pw-123456", role="ADMIN")
+        cls.worker = User.objects.create_user(username="worker", password="pw-123456")
+        cls.other = User.objects.create_user(username="other", password="pw-123456")
+        for i in range(7):
+            Project.objects.create(worker=cls.worker, name=f"Project {i}", latitude=Decimal("37.9"), longitude=Decimal("23.7"))
+        cls.foreign = Project.objects.create(worker=cls.other, name="Foreign")
+
+    def setUp(self):
+        caches["api"].clear()
+        user_cache.clear()
+
+    def token_for(self, username):
+        user = User.objects.get(username=username) if isinstance(username, str) else username
+        return str(CustomTokenObtainPairSerializer.get_token(user).access_token)
+
+    def client_for(self, username):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token_for(username)}")
+        return client
+
+    def assertSameResponse(self, client, path, method="get", **kwargs):
+        sync = getattr(client, method)(f"/api/{path}", **kwargs)
+        caches["api"].clear()
+        asynchronous = getattr(client, method)(f"/api/async/{path}", **kwargs)
+        self.assertEqual(asynchronous.status_code, sync.status_code, path)
+        # Only the path of the "next" link differs
+        self.assertEqual(asynchronous.content.replace(b"/api/async/", b"/api/"), sync.content, path)
+        return asynchronous
+
+    def test_reads_match_sync_views(self):
+        worker, admin = self.client_for("worker"), self.client_for("admin")
+        pk = Project.objects.filter(worker=self.worker).first().pk
+        for path in ["projects/", "projects/?page_size=3&fields=name,status", f"projects/{pk}/",
+                     f"projects/{self.foreign.pk}/", "projects/search/?name=project 3",
+                     "projects/search/?name=nope", "projects/search/", "projects/grouped_projects/"]:
+            self.assertSameResponse(worker, path)
+        self.assertSameResponse(admin, "projects/grouped_projects/")
+        self.assertSameResponse(admin, "projects/")
+
+    def test_list_cursor_pages_match(self):
+        client = self.client_for("worker")
+        response = self.assertSameResponse(client, "projects/?page_size=3")
+        cursor = response.json()["next"].split("cursor=")[1]
+        self.assertSameResponse(client, f"projects/?page_size=3&cursor={cursor}")
+
+    async def test_grouped_stream_matches(self):
+        headers = {"Authorization": f"Bearer {self.token_for(self.admin)}"}
+        response = await self.async_client.get("/api/async/projects/grouped_projects/?stream=1", headers=headers)
+        asynchronous = b"".join([chunk async for chunk in response.streaming_content])
+
+        def sync_stream():
+            response = self.client.get("/api/projects/grouped_projects/?stream=1", headers=headers)
+            return b"".join(response.streaming_content)
+        self.assertEqual(asynchronous, await sync_to_async(sync_stream)())
+
+    def test_update_status_matches_and_keeps_clusters(self):
+        client = self.client_for("worker")
+        project = Project.objects.filter(worker=self.worker).first()
+        response = client.patch(f"/api/async/projects/{project.pk}/update_status/", {"status": "COMPLETED"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "COMPLETED")
+        expected = client.patch(f"/api/projects/{project.pk}/update_status/", {"status": "COMPLETED"}).json()
+        self.assertEqual(response.json(), expected)
+        self.assertEqual(
+            ProjectCluster.objects.filter(level=1, status="COMPLETED").get().count, 1
+        )
+        for path in [f"projects/{self.foreign.pk}/update_status/", "projects/999999/update_status/"]:
+            self.assertSameResponse(client, path, method="patch", data={"status": "COMPLETED"})
+        self.assertSameResponse(client, f"projects/{project.pk}/update_status/", method="patch", data={"status": "X"})
+        self.assertSameResponse(self.client_for("admin"), f"projects/{project.pk}/update_status/",
+                                method="patch", data={"status": "PENDING"})
+
+    def test_interleaved_status_updates_keep_aggregates(self):
+        project = Project.objects.filter(worker=self.worker).first()
+        aupdate = QuerySet.aupdate
+        other = self.client_for("worker")
+
+        async def racing_aupdate(queryset, **kwargs):
+            # Another request changes the status between this one's read and write
+            if not racing_aupdate.raced:
+                racing_aupdate.raced = True
+                await sync_to_async(other.patch)(f"/api/projects/{project.pk}/update_status/", {"status": "IN_PROGRESS"})
+            return await aupdate(queryset, **kwargs)
+        racing_aupdate.raced = False
+
+        with mock.patch.object(QuerySet, "aupdate", racing_aupdate):
+            response = self.client_for("worker").patch(
+                f"/api/async/projects/{project.pk}/update_status/", {"status": "COMPLETED"}
+            )
+        self.assertEqual(response.json()["status"], "COMPLETED")
+        stored_stats = set(ProjectStat.objects.exclude(count=0).values_list("worker_id", "status", "due_month", "count"))
+        stored_clusters = set(ProjectCluster.objects.exclude(count=0).values_list("level", "cell", "status", "count"))
+        stats.rebuild(Project, ProjectStat)
+        clusters.rebuild(Project, ProjectCluster)
+        self.assertEqual(stored_stats, set(ProjectStat.objects.values_list("worker_id", "status", "due_month", "count")))
+        self.assertEqual(stored_clusters, set(ProjectCluster.objects.values_list("level", "cell", "status", "count")))
+
+    def test_requires_authentication(self):
+        self.assertSameResponse(APIClient(), "projects/")
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Bearer garbage")
+        self.assertSameResponse(client, "projects/")
+
+
+class ProjectEventTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.worker = User.objects.create_user(username="worker", password="pw-123456")
+        cls.other = User.objects.create_user(username="other", password="pw-123456")
+
+    def published(self, func):
+        broadcaster = events.get_broadcaster()
+        last = broadcaster.last_event_id()
+        with self.captureOnCommitCallbacks(execute=True):
+            func()
+        return [(e.type, e.data) for e in broadcaster._since(last)]
+
+    def test_signals_publish_create_status_change_and_delete(self):
+        project = None
+
+        def create():
+            nonlocal project
+            project = Project.objects.create(worker=self.worker, name="Live")
+        self.assertEqual([t for t, _ in self.published(create)], [events.CREATED])
+
+        def update_status():
+            project.status = "COMPLETED"
+            project.save(update_fields=["status"])
+        self.assertEqual(self.published(update_status), [(events.STATUS_CHANGED, {
+            "id": project.pk, "worker": self.worker.pk, "status": "COMPLETED", "previous_status": "PENDING",
+        })])
+        self.assertEqual([t for t, _ in self.published(project.delete)], [events.DELETED])
+
+    def test_bulk_status_update_publishes_changes_only(self):
+        projects = Project.objects.bulk_create([Project(worker=self.worker, name=f"P{i}") for i in range(2)])
+        client = APIClient()
+        client.force_authenticate(self.worker)
+        published = self.published(lambda: client.patch("/api/projects/update_status/", [
+            {"id": projects[0].pk, "status": "PENDING"}, {"id": projects[1].pk, "status": "IN_PROGRESS"},
+        ], format="json"))
+        self.assertEqual([(t, d["id"]) for t, d in published], [(events.STATUS_CHANGED, projects[1].pk)])
+
+    async def connect(self, user, last_event_id=None):
+        token = str(CustomTokenObtainPairSerializer.get_token(user).access_token)
+        headers = {"Authorization": f"Bearer {token}"}
+        if last_event_id:
+            headers["Last-Event-ID"] = last_event_id
+        response = await self.async_client.get("/api/async/projects/events/", headers=headers)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = response.streaming_content
+        self.assertTrue((await anext(stream)).startswith(b"retry:"))
+        return stream
+
+    async def next_message(self, stream):
+        return (await asyncio.wait_for(anext(stream), 2)).decode()
+
+    async def test_stream_is_filtered_per_user(self):
+        worker_stream = await self.connect(self.worker)
+        admin = await User.objects.acreate(username="admin", role="ADMIN")
+        admin_stream = await self.connect(admin)
+        events.publish(events.DELETED, self.other.pk, {"id": 1, "worker": self.other.pk})
+        events.publish(events.DELETED, self.worker.pk, {"id": 2, "worker": self.worker.pk})
+
+        self.assertIn('"id":2', await self.next_message(worker_stream))
+        self.assertIn('"id":1', await self.next_message(admin_stream))
+        self.assertIn('"id":2', await self.next_message(admin_stream))
+        await worker_stream.aclose()
+        await admin_stream.aclose()
+
+    async def test_last_event_id_resumes_or_asks_for_resync(self):
+        broadcaster = events.get_broadcaster()
+        events.publish(events.DELETED, self.worker.pk, {"id": 1, "worker": self.worker.pk})
+        seen = broadcaster.last_event_id()
+        events.publish(events.DELETED, self.worker.pk, {"id": 2, "worker": self.worker.pk})
+
+        stream = await self.connect(self.worker, last_event_id=seen)
+        message = await self.next_message(stream)
+        self.assertIn("event: project.deleted", message)
+        self.assertIn('"id":2', message)
+        await stream.aclose()
+
+        stream = await self.connect(self.worker, last_event_id="unknown-1")
+        self.assertIn("event: resync", await self.next_message(stream))
+        await stream.aclose()
+
+
+class BulkEndpointTests(TestCase):
+    """bulk_create and the batch update_status: per-item results, ownership and limits."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.worker = User.objects.create_user(username="worker", password="pw-123456")
+        cls.other = User.objects.create_user(username="other", password="pw-123456")
+        cls.admin = User.objects.create_user(username="admin", password="pw-123456", role="ADMIN")
+        cls.own = Project.objects.bulk_create([Project(worker=cls.worker, name=f"P{i}") for i in range(3)])
+        cls.foreign = Project.objects.create(worker=cls.other, name="Theirs")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.worker)
+
+    def patch(self, items):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.patch("/api/projects/update_status/", items, format="json")
+
+    def test_bulk_create_belongs_to_the_caller(self):
+        response = self.client.post("/api/projects/bulk_create/", [
+            {"name": "A", "worker": self.other.pk}, {"name": "B", "status": "COMPLETED"},
+        ], format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([p["name"] for p in response.json()], ["A", "B"])
+        created = Project.objects.filter(pk__in=[p["id"] for p in response.json()])
+        self.assertEqual({p.worker_id for p in created}, {self.worker.pk})
+
+    def test_bulk_create_is_all_or_nothing(self):
+        response = self.client.post("/api/projects/bulk_create/", [
+            {"name": "Fine"}, {"name": "Bad", "status": "NOPE"},
+        ], format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.json()), ["1"])  # errors by item index
+        self.assertIn("status", response.json()["1"])
+        self.assertFalse(Project.objects.filter(name="Fine").exists())
+
+    def test_bulk_limits(self):
+        too_many = ProjectViewSet.BULK_MAX_ITEMS + 1
+        response = self.client.post("/api/projects/bulk_create/", [{"name": "X"}] * too_many, format="json")
+        self.assertEqual(response.status_code, 400)
+        response = self.patch([{"id": self.own[0].pk, "status": "COMPLETED"}] * too_many)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("detail", response.json())
+        self.assertEqual(self.client.post("/api/projects/bulk_create/", {"name": "X"}, format="json").status_code, 400)
+        self.assertEqual(self.patch({"id": self.own[0].pk}).status_code, 400)
+        self.assertFalse(Project.objects.filter(name="X").exists())
+        self.assertFalse(Project.objects.filter(status="COMPLETED").exists())
+
+    def test_workers_only(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        self.assertEqual(client.post("/api/projects/bulk_create/", [{"name": "X"}], format="json").status_code, 403)
+        self.assertEqual(client.patch(
+            "/api/projects/update_status/", [{"id": self.own[0].pk, "status": "COMPLETED"}], format="json"
+        ).status_code, 403)
+
+    def test_update_status_reports_each_item(self):
+        response = self.patch([
+            {"id": self.own[0].pk, "status": "COMPLETED"},
+            {"id": self.foreign.pk, "status": "COMPLETED"},
+            {"id": 999999, "status": "COMPLETED"},
+            {"id": self.own[1].pk, "status": "NOPE"},
+            {"id": "1", "status": "COMPLETED"},
+            {"id": 2**70, "status": "COMPLETED"},
+            "junk",
+            {"id": self.own[2].pk, "status": "IN_PROGRESS"},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(r["id"], r["code"]) for r in response.json()], [
+            (self.own[0].pk, 200), (self.foreign.pk, 403), (999999, 404), (self.own[1].pk, 400),
+            ("1", 400), (2**70, 400), (None, 400), (self.own[2].pk, 200),
+        ])
+        statuses = dict(Project.objects.values_list("id", "status"))
+        self.assertEqual(statuses[self.own[0].pk], "COMPLETED")
+        self.assertEqual(statuses[self.own[1].pk], "PENDING")
+        self.assertEqual(statuses[self.own[2].pk], "IN_PROGRESS")
+        self.assertEqual(statuses[self.foreign.pk], "PENDING")
+
+    def test_update_status_last_item_for_an_id_wins(self):
+        pk = self.own[0].pk
+        response = self.patch([
+            {"id": pk, "status": "IN_PROGRESS"}, {"id": pk, "status": "NOPE"}, {"id": pk, "status": "COMPLETED"},
+        ])
+        self.assertEqual([(r["code"], r.get("status")) for r in response.json()], [
+            (409, "IN_PROGRESS"), (400, None), (200, "COMPLETED"),
+        ])
+        self.assertEqual(Project.objects.get(pk=pk).status, "COMPLETED")
+
+        # Someone else's project stays 403 however often it comes up
+        response = self.patch([{"id": self.foreign.pk, "status": "COMPLETED"}] * 2)
+        self.assertEqual([r["code"] for r in response.json()], [409, 403])
+
+
+class DeltaSyncTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.worker = User.objects.create(username="worker")
+        cls.other = User.objects.create(username="other")
+        cls.projects = Project.objects.bulk_create([Project(worker=cls.worker, name=f"P{i}") for i in range(5)])
+        Project.objects.create(worker=cls.other, name="Not mine")
+        # Changed long before the first sync, outside the settle window
+        Project.objects.update(updated_at=datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.worker)
+
+    def sync(self, token=None, limit=2):
+        batches = []
+        while True:
+            url = f"/api/projects/changes/?limit={limit}" + (f"&since={token}" if token else "")
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            batches.append(body)
+            token = body["sync_token"]
+            if not body["has_more"]:
+                return batches, token
+
+    def test_first_sync_downloads_own_projects_in_batches(self):
+        batches, _ = self.sync()
+        self.assertEqual([len(b["changed"]) for b in batches], [2, 2, 1])
+        self.assertEqual(
+            [p["id"] for b in batches for p in b["changed"]], sorted(p.pk for p in self.projects)
+        )
+
+    def test_sync_returns_only_changes_since_token(self):
+        _, token = self.sync()
+        changed, deleted, updated = self.projects[:3]
+        changed.name = "Renamed"
+        changed.save()
+        deleted_pk = deleted.pk
+        deleted.delete()
+        self.client.patch("/api/projects/update_status/", [{"id": updated.pk, "status": "COMPLETED"}], format="json")
+
+        [batch], _ = self.sync(token, limit=10)
+        self.assertEqual(
+            {p["id"]: (p["name"], p["status"]) for p in batch["changed"]},
+            {changed.pk: ("Renamed", "PENDING"), updated.pk: (updated.name, "COMPLETED")},
+        )
+        self.assertEqual(batch["deleted"], [deleted_pk])
+
+    def test_single_status_update_is_reported(self):
+        _, token = self.sync()
+        project = self.projects[0]
+        response = self.client.patch(f"/api/projects/{project.pk}/update_status/", {"status": "COMPLETED"})
+        self.assertEqual(response.status_code, 200)
+
+        [batch], _ = self.sync(token, limit=10)
+        self.assertEqual([(p["id"], p["status"]) for p in batch["changed"]], [(project.pk, "COMPLETED")])
+
+    def test_other_workers_deletions_are_not_reported(self):
+        _, token = self.sync()
+        Project.objects.get(worker=self.other).delete()
+        [batch], _ = self.sync(token)
+        self.assertEqual((batch["changed"], batch["deleted"]), ([], []))
+
+    def test_bad_and_expired_tokens(self):
+        self.assertEqual(self.client.get("/api/projects/changes/?since=nope").status_code, 400)
+        old = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+        response = self.client.get(f"/api/projects/changes/?since={sync.encode_token(None, (old, 0))}")
+        self.assertEqual(response.status_code, 410)
+
+    def test_prune_tombstones(self):
+        self.projects[0].delete()
+        ProjectTombstone.objects.update(deleted_at=datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc))
+        kept_pk = self.projects[1].pk
+        self.projects[1].delete()
+        self.assertEqual(sync.prune_tombstones(), 1)
+        self.assertEqual(list(ProjectTombstone.objects.values_list("project_id", flat=True)), [kept_pk])
+
+
+class GeoTests(TestCase):
+    """nearby and bbox against brute force over every project, including the awkward places."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.worker = User.objects.create(username="worker")
+        other = User.objects.create(username="other")
+        rng = random.Random(6)
+
+        def around(lat, lng, spread, count):
+            for _ in range(count):
+                yield lat + rng.uniform(-spread, spread), lng + rng.uniform(-spread, spread)
+
+        points = [
+            *around(37.9, 23.7, 0.2, 60),  # a city
+            *around(-17.0, 179.7, 0.5, 30),  # both sides of the antimeridian
+            *around(89.6, 0.0, 0.4, 20),  # the poles
+            *around(-89.7, 120.0, 0.3, 10),
+            *around(0.0, 0.0, 0.001, 20),  # the top-level cell corner
+            (0.0, 0.0), (0.0, -0.000001), (-0.000001, 0.0), (45.0, 90.0), (44.999999, 89.999999),
+            (90.0, 180.0), (-90.0, -180.0), (10.0, 180.0), (10.0, -180.0),
+        ]
+        located = []
+        for lat, lng in points:
+            lat = min(max(lat, -90.0), 90.0)
+            lng = (lng + 180.0) % 360.0 - 180.0 if abs(lng) != 180.0 else lng
+            located.append((Decimal(f"{lat:.6f}"), Decimal(f"{lng:.6f}")))
+        Project.objects.bulk_create(
+            [Project(worker=cls.worker, name=f"P{i}", latitude=lat, longitude=lng)
+             for i, (lat, lng) in enumerate(located)]
+            + [Project(worker=cls.worker, name="Nowhere"), Project(worker=cls.worker, name="Half", latitude=1)]
+            + [Project(worker=other, name="Not mine", latitude=Decimal("37.9"), longitude=Decimal("23.7"))]
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.worker)
+        self.located = [
+            (p.pk, float(p.latitude), float(p.longitude))
+            for p in Project.objects.filter(worker=self.worker, latitude__isnull=False, longitude__isnull=False)
+        ]
+
+    def test_projects_without_a_location_have_no_cell(self):
+        self.assertIsNone(geo.geo_cell(None, 1))
+        self.assertEqual(
+            set(Project.objects.filter(geo_cell__isnull=True).values_list("name", flat=True)), {"Nowhere", "Half"}
+        )
+
+    def test_nearby_matches_brute_force(self):
+        for lat, lng, radius in [
+            (37.9, 23.7, 10_000), (37.9, 23.7, 20_000), (0.0, 0.0, 100), (0.0, 0.0, 50_000),
+            (-17.0, 179.9, 60_000), (-17.0, -179.95, 30_000), (89.9, 0.0, 50_000), (-89.8, 120.0, 100_000),
+            (10.0, 179.9999, 1000), (45.0, 90.0, 1),
+        ]:
+            with self.subTest(lat=lat, lng=lng, radius=radius):
+                response = self.client.get(f"/api/projects/nearby/?lat={lat}&lng={lng}&radius={radius}&limit=1000")
+                self.assertEqual(response.status_code, 200)
+                expected = {
+                    pk: geo.haversine_m(lat, lng, p_lat, p_lng) for pk, p_lat, p_lng in self.located
+                    if geo.haversine_m(lat, lng, p_lat, p_lng) <= radius
+                }
+                results = response.json()
+                self.assertEqual({p["id"] for p in results}, set(expected))
+                distances = [p["distance_m"] for p in results]
+                self.assertEqual(distances, sorted(distances))
+                for p in results:
+                    self.assertAlmostEqual(p["distance_m"], expected[p["id"]], delta=0.1)
+        self.assertGreater(len(self.client.get("/api/projects/nearby/?lat=37.9&lng=23.7&radius=20000").json()), 10)
+
+    def test_bbox_matches_brute_force(self):
+        for west, south, east, north in [
+            (23.6, 37.8, 23.8, 38.0), (179.5, -18.0, -179.5, -16.0), (170.0, -20.0, -170.0, 20.0),
+            (-180, 89.0, 180, 90), (-180, -90, 180, -89.5), (-0.000001, -0.000001, 0.0, 0.0),
+            (0.0, 0.0, 90.0, 45.0), (-180, -90, 180, 90),
+        ]:
+            with self.subTest(bbox=(west, south, east, north)):
+                response = self.client.get(f"/api/projects/bbox/?bbox={west},{south},{east},{north}&limit=5000")
+                self.assertEqual(response.status_code, 200)
+
+                def inside(lat, lng):
+                    in_lng = west <= lng <= east if west <= east else (lng >= west or lng <= east)
+                    return south <= lat <= north and in_lng
+
+                expected = sorted(pk for pk, lat, lng in self.located if inside(lat, lng))
+                self.assertEqual([p["id"] for p in response.json()["results"]], expected)
+                self.assertFalse(response.json()["truncated"])
+        self.assertEqual(self.client.get("/api/projects/bbox/?bbox=1,2,3").status_code, 400)
+
+    def test_cover_contains_every_cell_in_the_box(self):
+        rng = random.Random(7)
+        for _ in range(200):
+            south, north = sorted(rng.uniform(-90, 90) for _ in range(2))
+            west, east = rng.uniform(-180, 180), rng.uniform(-180, 180)  # west > east: across the antimeridian
+            ranges = geo.cover(south, west, north, east)
+            self.assertLessEqual(len(ranges), 2 * geo.MAX_COVER_CELLS)
+            for _ in range(20):
+                lat = rng.uniform(south, north)
+                lng = rng.uniform(west, east) if west <= east else rng.choice(
+                    [rng.uniform(west, 180), rng.uniform(-180, east)]
+                )
+                cell = geo.geo_cell(lat, lng)
+                self.assertTrue(any(start <= cell < stop for start, stop in ranges), (south, west, north, east))
+            for lat, lng in [(south, west), (north, east), (south, east), (north, west)]:  # the corners
+                cell = geo.geo_cell(lat, lng)
+                self.assertTrue(any(start <= cell < stop for start, stop in ranges))
+
+
+class ClusterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username="admin", role="ADMIN")
+        cls.worker = User.objects.create(username="worker")
+        cls.other = User.objects.create(username="other")
+
+    def setUp(self):
+        caches["api"].clear()
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+        return client
+
+    def snapshot(self):
+        return sorted(
+            (level, cell, status, count, round(lat_sum, 6), round(lng_sum, 6))
+            for level, cell, status, count, lat_sum, lng_sum in ProjectCluster.objects.filter(count__gt=0).values_list(
+                "level", "cell", "status", "count", "lat_sum", "lng_sum"
+            )
+        )
+
+    def test_incremental_upkeep_matches_rebuild(self):
+        def located(name, lat, lng, worker=self.worker, **fields):
+            return Project(worker=worker, name=name, latitude=Decimal(lat), longitude=Decimal(lng), **fields)
+
+        saved = [located(f"S{i}", f"37.{i}", f"23.{i}") for i in range(4)]
+        for project in saved:
+            project.save()
+        Project.objects.create(worker=self.worker, name="Nowhere")
+        bulk = Project.objects.bulk_create(
+            [located(f"B{i}", f"-33.{i}", f"151.{i}", status="IN_PROGRESS") for i in range(4)]
+            + [located("Elsewhere", "40.7", "-74.0", worker=self.other)]
+        )
+
+        saved[0].latitude, saved[0].longitude = Decimal("48.85"), Decimal("2.35")  # moved to another cell
+        saved[0].save()
+        saved[1].longitude = Decimal("23.100001")  # moved inside its cell
+        saved[1].save(update_fields=["longitude"])
+        saved[2].latitude = None  # no longer located
+        saved[2].save()
+        saved[3].status = "COMPLETED"
+        saved[3].save()
+        bulk[0].delete()
+
+        worker = self.client_for(self.worker)
+        responses = [
+            worker.patch(f"/api/projects/{bulk[1].pk}/update_status/", {"status": "COMPLETED"}),
+            worker.patch("/api/projects/update_status/", [
+                {"id": bulk[2].pk, "status": "PENDING"}, {"id": saved[3].pk, "status": "IN_PROGRESS"},
+            ], format="json"),
+            worker.patch(f"/api/async/projects/{bulk[3].pk}/update_status/", {"status": "COMPLETED"}),
+            worker.post("/api/projects/bulk_create/", [
+                {"name": "New", "latitude": "-1.5", "longitude": "36.8"}, {"name": "New nowhere"},
+            ], format="json"),
+        ]
+        self.assertEqual([r.status_code for r in responses], [200, 200, 200, 201])
+
+        incremental = self.snapshot()
+        self.assertTrue(incremental)
+        clusters.rebuild(Project, ProjectCluster)
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_endpoint_groups_the_viewport(self):
+        rng = random.Random(7)
+        Project.objects.bulk_create([
+            Project(
+                worker=self.worker if i % 3 else self.other, name=f"P{i}",
+                status=rng.choice(["PENDING", "IN_PROGRESS", "COMPLETED"]),
+                latitude=Decimal(f"{rng.uniform(35, 42):.6f}"), longitude=Decimal(f"{rng.uniform(19, 28):.6f}"),
+            )
+            for i in range(60)
+        ] + [Project(worker=self.worker, name="Far", latitude=Decimal("-33.9"), longitude=Decimal("151.2"))])
+
+        def expected(projects, level):
+            by_cell = {}
+            for p in projects:
+                cell = by_cell.setdefault(p.geo_cell >> clusters.shift_for(level), [])
+                cell.append(p)
+            return {
+                cell: (len(ps), collections.Counter(p.status for p in ps),
+                       sum(float(p.latitude) for p in ps) / len(ps), sum(float(p.longitude) for p in ps) / len(ps))
+                for cell, ps in by_cell.items()
+            }
+
+        greece = Project.objects.exclude(name="Far")
+        for user, zoom, projects in [
+            (self.admin, 2, greece),  # stored aggregates
+            (self.admin, 12, greece),  # too fine to store: aggregated live
+            (self.worker, 2, greece.filter(worker=self.worker)),  # own projects only
+        ]:
+            with self.subTest(user=user.username, zoom=zoom):
+                body = self.client_for(user).get(f"/api/projects/clusters/?z={zoom}&bbox=18,34,29,43").json()
+                self.assertEqual(body["level"], clusters.level_for_zoom(zoom))
+                want = expected(projects, body["level"])
+                got = {c["cell"]: (c["count"], collections.Counter(c["statuses"]), c["lat"], c["lng"])
+                       for c in body["clusters"]}
+                self.assertEqual(set(got), set(want))
+                for cell, (count, statuses, lat, lng) in got.items():
+                    self.assertEqual((count, statuses), want[cell][:2])
+                    self.assertAlmostEqual(lat, want[cell][2], places=5)
+                    self.assertAlmostEqual(lng, want[cell][3], places=5)
+
+        response = self.client_for(self.admin).get("/api/projects/clusters/?z=2")
+        self.assertEqual(response.status_code, 400)
+
+
+class FullTextSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username="admin", role="ADMIN")
+        cls.worker = User.objects.create(username="worker")
+        cls.other = User.objects.create(username="other")
+        cls.name_match = Project.objects.create(worker=cls.worker, name="North bridge repair")
+        cls.text_match = Project.objects.create(
+            worker=cls.worker, name="Road works", description="Resurfacing the road up to the bridge",
+        )
+        cls.unsafe = Project.objects.create(
+            worker=cls.worker, name='<script>alert("x")</script> Tunnel', description="<b>tunnel</b> & drains",
+        )
+        cls.foreign = Project.objects.create(worker=cls.other, name="South bridge painting")
+
+    def setUp(self):
+        caches["api"].clear()
+
+    def fulltext(self, user, query):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(f"/api/projects/fulltext/?q={query}")
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_matches_substrings_case_insensitively_and_ranks_names_first(self):
+        for user in [self.admin, self.worker]:  # FTS5 for admins, the ORM for workers
+            with self.subTest(user=user.username):
+                body = self.fulltext(user, "BRID")
+                ids = [p["id"] for p in body["results"]]
+                if user is self.admin:
+                    self.assertEqual(set(ids), {self.name_match.pk, self.text_match.pk, self.foreign.pk})
+                else:
+                    self.assertEqual(ids, [self.name_match.pk, self.text_match.pk])
+                self.assertLess(ids.index(self.name_match.pk), ids.index(self.text_match.pk))
+                self.assertFalse(body["fuzzy"])
+                self.assertEqual(
+                    [p["id"] for p in self.fulltext(user, "road bridge")["results"]], [self.text_match.pk]
+                )
+
+    def test_workers_only_find_their_own_projects(self):
+        self.assertEqual(self.fulltext(self.worker, "painting")["count"], 0)
+        self.assertEqual([p["id"] for p in self.fulltext(self.admin, "painting")["results"]], [self.foreign.pk])
+
+    def test_typos_fall_back_to_known_words(self):
+        for user in [self.admin, self.worker]:
+            with self.subTest(user=user.username):
+                body = self.fulltext(user, "bridg repiar")
+                self.assertTrue(body["fuzzy"])
+                self.assertEqual([p["id"] for p in body["results"]], [self.name_match.pk])
+                self.assertIn("<mark>repair</mark>", body["results"][0]["highlight"]["name"])
+        self.assertEqual(self.fulltext(self.admin, "qwertyuiop")["count"], 0)
+
+    def test_highlight_escapes_html(self):
+        [result] = self.fulltext(self.worker, "script tunnel")["results"]
+        self.assertEqual(
+            result["highlight"]["name"],
+            "&lt;<mark>script</mark>&gt;alert(&quot;x&quot;)&lt;/<mark>script</mark>&gt; <mark>Tunnel</mark>",
+        )
+        self.assertEqual(result["highlight"]["description"], "&lt;b&gt;<mark>tunnel</mark>&lt;/b&gt; &amp; drains")
+        self.assertEqual(search.highlight("<i>", ["i"]), "&lt;<mark>i</mark>&gt;")
+
+    def test_rolled_back_words_are_not_remembered(self):
+        search._known_words.discard("zeppelin")
+        try:
+            with transaction.atomic():
+                Project.objects.create(worker=self.worker, name="Zeppelin hangar")
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertNotIn("zeppelin", search._known_words)
+        self.assertFalse(SearchWord.objects.filter(word="zeppelin").exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Project.objects.create(worker=self.worker, name="Zeppelin shed")
+        self.assertIn("zeppelin", search._known_words)
+        self.assertTrue(SearchWord.objects.filter(word="zeppelin").exists())
+        self.assertTrue(self.fulltext(self.worker, "zepelin")["fuzzy"])
+
+
+class ProjectStatsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username="admin", role="ADMIN")
+        cls.workers = [User.objects.create(username=f"worker{i}") for i in range(3)]
+        cls.past = datetime.date(2020, 1, 15)
+        cls.future = datetime.date(2999, 3, 1)
+        cls.projects = Project.objects.bulk_create([
+            Project(worker=cls.workers[0], name="Late", finish_date=cls.past),
+            Project(worker=cls.workers[0], name="Late but done", finish_date=cls.past, status="COMPLETED"),
+            Project(worker=cls.workers[0], name="Upcoming", finish_date=cls.future, status="IN_PROGRESS"),
+            Project(worker=cls.workers[1], name="Undated"),
+        ])
+
+    def setUp(self):
+        caches["api"].clear()
+        self.client = APIClient()
+
+    def stored(self):
+        return sorted(ProjectStat.objects.filter(count__gt=0).values_list("worker_id", "status", "due_month", "count"))
+
+    def assertMatchesRebuild(self):
+        incremental = self.stored()
+        stats.rebuild(Project, ProjectStat, chunk_size=2)
+        self.assertEqual(incremental, self.stored())
+
+    def test_incremental_updates_match_rebuild(self):
+        self.assertMatchesRebuild()
+        late, _, upcoming, undated = self.projects
+        late.status = "COMPLETED"
+        late.save(update_fields=["status"])
+        upcoming.finish_date = self.past
+        upcoming.save()
+        undated.delete()
+        Project.objects.create(worker=self.workers[2], name="New", finish_date=self.past)
+        self.assertMatchesRebuild()
+
+        self.client.force_authenticate(self.workers[0])
+        self.client.patch(
+            "/api/projects/update_status/", [{"id": upcoming.pk, "status": "PENDING"}], format="json"
+        )
+        self.assertMatchesRebuild()
+
+    def test_admin_stats(self):
+        self.client.force_authenticate(self.admin)
+        # 3 aggregates over ProjectStat, this month's overdue projects, the workers
+        with self.assertNumQueries(5):
+            body = self.client.get("/api/projects/stats/").json()
+        self.assertEqual(body["statuses"], {"PENDING": 2, "COMPLETED": 1, "IN_PROGRESS": 1})
+        self.assertEqual((body["total"], body["open"], body["overdue"]), (4, 3, 1))
+        self.assertEqual(body["due_by_month"], {"2020-01": 1, "2999-03": 1})
+        self.assertEqual(
+            [(w["worker"]["username"], w["total"], w["open"], w["overdue"]) for w in body["workers"]],
+            [("worker0", 3, 2, 1), ("worker1", 1, 1, 0), ("worker2", 0, 0, 0)],
+        )
+
+    def test_overdue_this_month_is_counted_to_the_day(self):
+        self.client.force_authenticate(self.workers[0])
+        # "Upcoming" is due 2999-03-01, in the stats row for March 2999
+        # Cached, but per day: no version bump comes at midnight
+        for today, overdue in ((datetime.date(2999, 3, 1), 1), (datetime.date(2999, 3, 2), 2)):
+            with mock.patch("django.utils.timezone.localdate", return_value=today):
+                self.assertEqual(self.client.get("/api/projects/stats/").json()["overdue"], overdue)
+
+    def test_worker_sees_own_stats(self):
+        self.client.force_authenticate(self.workers[1])
+        body = self.client.get("/api/projects/stats/").json()
+        self.assertEqual((body["total"], [w["worker"]["id"] for w in body["workers"]]), (1, [self.workers[1].pk]))
+
+    def test_deleting_worker_deletes_their_stats(self):
+        worker_id = self.workers[0].pk
+        self.workers[0].delete()
+        self.assertFalse(ProjectStat.objects.filter(worker_id=worker_id).exists())
+
+
+class ExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username="admin", role="ADMIN")
+        cls.worker = User.objects.create(username="worker")
+        cls.other = User.objects.create(username="other")
+        Project.objects.bulk_create(
+            [Project(worker=cls.worker, name=f"P{i}", latitude=Decimal("1.5"), longitude=Decimal("2")) for i in range(5)]
+            + [Project(worker=cls.other, name="Theirs, quoted")]
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def download(self, user, query=""):
+        self.client.force_authenticate(user)
+        response = self.client.get(f"/api/projects/export/{query}")
+        self.assertEqual(response.status_code, 200)
+        return response, b"".join(response.streaming_content)
+
+    def test_csv_has_api_values_in_id_order(self):
+        response, body = self.download(self.admin)
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="projects.csv"')
+        rows = list(csv.DictReader(io.StringIO(body.decode())))
+        expected = ProjectSerializer(Project.objects.order_by("id"), many=True).data
+        self.assertEqual(rows, [{k: "" if v is None else str(v) for k, v in p.items()} for p in expected])
+
+    def test_ndjson_fields_and_worker_scope(self):
+        _, body = self.download(self.worker, "?output=ndjson&fields=name,latitude")
+        lines = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual(lines[0], {"name": "P0", "latitude": "1.500000"})
+        self.assertEqual(len(lines), 5)
+
+    def test_gzip(self):
+        response, body = self.download(self.worker, "?output=ndjson&gzip=1")
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertEqual(len(gzip.decompress(body).splitlines()), 5)
+
+    def test_unknown_output_and_missing_pyarrow(self):
+        self.client.force_authenticate(self.worker)
+        self.assertEqual(self.client.get("/api/projects/export/?output=xml").status_code, 400)
+        with mock.patch.dict("sys.modules", {"pyarrow": None}):
+            self.assertEqual(self.client.get("/api/projects/export/?output=parquet").status_code, 501)
+
+    def test_export_projects_command(self):
+        with tempfile.NamedTemporaryFile(suffix=".csv.gz") as f:
+            call_command(
+                "export_projects", "--gzip", "--fields=id,name", "--chunk-size=2", f"--worker={self.other.pk}", f"-o{f.name}"
+            )
+            self.assertEqual(gzip.decompress(f.read()).decode().splitlines(), [
+                "id,name", f'{Project.objects.get(worker=self.other).pk},"Theirs, quoted"'
+            ])
+
+
+class ImportTests(TestCase):
+    CSV = (
+        "worker,email,password,name,status,finish_date,latitude,longitude\n"
+        "ana,ana@example.com,,Bridge,PENDING,2027-01-31,37.9,23.7\n"
+        "ana,,,Tunnel,COMPLETED,,,\n"
+        "bob,not-an-email,,Road,,,,\n"
+        "carl,carl@example.com,,Pier,DONE,,,\n"
+        "dora,dora@example.com,,,,,,\n"
+    )
+
+    def run_import(self, data, format="csv", job=None, **options):
+        job = job or ImportJob.objects.create(source="test")
+        rows = imports.read_rows(io.BytesIO(data.encode()), format)
+        updates = list(imports.run(rows, job, processes=0, **options))
+        return updates[-1][0], [e for _, errors in updates for e in errors]
+
+    def test_import_creates_workers_and_projects(self):
+        job, errors = self.run_import(self.CSV, chunk_size=2, send_reset_emails=True)
+        self.assertEqual(
+            (job.status, job.rows_done, job.workers_created, job.projects_created, job.rows_rejected),
+            ("DONE", 5, 2, 2, 2),
+        )
+        self.assertEqual([(e["line"], list(e["errors"])) for e in errors], [(4, ["email"]), (5, ["status"])])
+        ana = User.objects.get(username="ana")
+        self.assertEqual((ana.role, ana.has_usable_password()), ("WORKER", False))
+        self.assertEqual(
+            sorted(Project.objects.filter(worker=ana).values_list("name", "status")),
+            [("Bridge", "PENDING"), ("Tunnel", "COMPLETED")],
+        )
+        self.assertEqual(sorted(OutboxEmail.objects.values_list("to", flat=True)), ["ana@example.com", "dora@example.com"])
+        # Kept in sync like any other bulk_create
+        self.assertEqual(ProjectCluster.objects.filter(level=1).aggregate(n=models.Sum("count"))["n"], 1)
+
+    def test_resume_skips_committed_rows(self):
+        job = ImportJob.objects.create(source="test", rows_done=2)
+        job, _ = self.run_import(self.CSV, job=job)
+        self.assertEqual((job.rows_done, job.projects_created), (5, 0))
+        self.assertFalse(Project.objects.exists())
+        self.assertEqual(list(User.objects.values_list("username", flat=True)), ["dora"])
+
+    def test_passwords_are_validated_and_hashed(self):
+        User.objects.create(username="admin", role="ADMIN")
+        data = "\n".join(json.dumps(row) for row in [
+            {"worker": "eve", "password": "123", "name": "Weak"},
+            {"worker": "eve", "name": "Also dropped"},
+            {"worker": "fay", "password": "correct-horse-battery", "name": "Strong"},
+            {"worker": "admin", "name": "Not a worker"},
+            ["not", "an", "object"],
+        ])
+        job, errors = self.run_import(data, format="ndjson")
+        self.assertEqual([(e["line"], list(e["errors"])) for e in errors], [
+            (1, ["password"]), (2, ["worker"]), (4, ["worker"]), (5, ["row"]),
+        ])
+        self.assertTrue(User.objects.get(username="fay").check_password("correct-horse-battery"))
+        self.assertFalse(User.objects.filter(username="eve").exists())
+
+    def test_admin_upload_streams_progress(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="worker"))
+        upload = SimpleUploadedFile("region.csv", self.CSV.encode())
+        self.assertEqual(client.post("/api/projects/import/", {"file": upload}).status_code, 403)
+
+        client.force_authenticate(User.objects.create(username="admin", role="ADMIN"))
+        upload = SimpleUploadedFile("region.csv.gz", gzip.compress(self.CSV.encode()))
+        response = client.post("/api/projects/import/", {"file": upload})
+        lines = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual(lines[-1]["status"], "DONE")
+        self.assertEqual((lines[-1]["rows_done"], lines[-1]["projects_created"]), (5, 2))
+        self.assertEqual(len(lines[0]["errors"]), 2)
+
+    def test_upload_errors(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="admin", role="ADMIN"))
+        for job in ["abc", str(2**70)]:
+            upload = SimpleUploadedFile("region.csv", self.CSV.encode())
+            response = client.post("/api/projects/import/", {"file": upload, "job": job})
+            self.assertEqual(response.status_code, 400, job)
+            self.assertIn("detail", response.json())
+
+        # Failing after the first chunk: the stream ends with a FAILED line
+        write, calls = imports._write, []
+
+        def flaky_write(*args):
+            calls.append(args)
+            if len(calls) > 1:
+                raise OSError("disk full")
+            write(*args)
+        data = "worker\n" + "".join(f"w{i}\n" for i in range(imports.CHUNK_SIZE + 1))
+        with mock.patch.object(imports, "_write", flaky_write), self.assertLogs("core.views", "ERROR"):
+            response = client.post("/api/projects/import/", {"file": SimpleUploadedFile("w.csv", data.encode())})
+            lines = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(lines[0]["rows_done"], imports.CHUNK_SIZE)
+        self.assertEqual(lines[-1], {"job": lines[0]["job"], "status": "FAILED", "detail": "OSError: disk full"})
+        self.assertEqual(ImportJob.objects.get(pk=lines[0]["job"]).status, "FAILED")
+
+    def test_new_workers_invalidate_admin_responses(self):
+        version = response_cache._get_version(response_cache.GLOBAL_VERSION)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.run_import("worker\nnew-worker\n")
+        self.assertNotEqual(response_cache._get_version(response_cache.GLOBAL_VERSION), version)
+
+    @override_settings(IMPORT_HTTP_PROCESSES=2)
+    def test_uploads_share_a_small_pool(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="admin", role="ADMIN"))
+        pools = []
+
+        def executor(processes, mp_context, initializer):
+            self.assertEqual(mp_context.get_start_method(), "spawn")
+            pools.append(ThreadPoolExecutor(processes))  # hashes like the process pool would
+            return pools[-1]
+        self.addCleanup(lambda: [pool.shutdown() for pool in pools])
+
+        with mock.patch.object(imports, "ProcessPoolExecutor", side_effect=executor), \
+                mock.patch.object(imports, "_shared_pool", None):
+            for upload in range(2):
+                data = "worker,password\n" + "".join(
+                    f"w{upload}-{i},correct-horse-battery-{i}\n" for i in range(imports.POOL_MIN_PASSWORDS)
+                )
+                response = client.post("/api/projects/import/", {"file": SimpleUploadedFile("w.csv", data.encode())})
+                self.assertEqual(json.loads(list(response.streaming_content)[-1])["status"], "DONE")
+        self.assertEqual([pool._max_workers for pool in pools], [2])
+        self.assertFalse(pools[0]._shutdown)  # kept for the next upload
+        self.assertTrue(User.objects.get(username="w1-0").check_password("correct-horse-battery-0"))
+
+
+class DatabaseProfileTests(TestCase):
+    def setUp(self):
+        caches["api"].clear()
+        self.worker = User.objects.create(username="worker")
+        self.admin = User.objects.create(username="admin", role="ADMIN")
+
+    def test_sqlite_connections_are_tuned(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("SQLite profile")
+        with tempfile.TemporaryDirectory() as tmp:
+            db = type(connections["default"])({**connection.settings_dict, "NAME": f"{tmp}/profile.sqlite3"}, "profile")
+            try:
+                with db.cursor() as cursor:
+                    pragmas = [
+                        cursor.execute(f"PRAGMA {name}").fetchone()[0]
+                        for name in ("journal_mode", "synchronous", "mmap_size")
+                    ]
+                self.assertEqual(pragmas, ["wal", 1, 256 * 1024 * 1024])
+                self.assertEqual(db.transaction_mode, "IMMEDIATE")
+            finally:
+                db.close()
+
+    @override_settings(DATABASE_REPLICAS=["replica0"])
+    def test_router_reads_from_replica_within_request(self):
+        router = db_routers.ReplicaRouter()
+        with db_routers.request_scope():
+            db_routers.read_from_replica(self.worker)
+            self.assertEqual(router.db_for_read(Project), "replica0")
+            self.assertEqual(router.db_for_write(Project), "default")
+            body = db_routers.keep_routing(router.db_for_read(Project) for _ in range(2))
+        self.assertIsNone(router.db_for_read(Project))
+        # A streamed body is read after the request, still from its replica
+        self.assertEqual(list(body), ["replica0", "replica0"])
+        self.assertFalse(router.allow_migrate("replica0", "core"))
+
+    @override_settings(DATABASE_REPLICAS=["replica0"])
+    def test_writes_pin_readers_to_primary(self):
+        router = db_routers.ReplicaRouter()
+        other = User.objects.create(username="other")
+        caches["api"].clear()  # creating users pins too
+        response_cache.bump_now([self.worker.pk])
+        for user, alias in ((self.worker, None), (self.admin, None), (other, "replica0")):
+            with db_routers.request_scope():
+                db_routers.read_from_replica(user)
+                self.assertEqual(router.db_for_read(Project), alias)
+
+    def test_only_safe_project_requests_use_replicas(self):
+        project = Project.objects.create(worker=self.worker, name="Bridge")
+        client = APIClient()
+        client.force_authenticate(self.worker)
+        with mock.patch("core.db_routers.read_from_replica") as read_from_replica:
+            client.get("/api/projects/")
+            client.patch(f"/api/projects/{project.pk}/update_status/", {"status": "COMPLETED"})
+        read_from_replica.assert_called_once_with(self.worker)
+
+
+@override_settings(METRICS_TOKEN="s3cret")
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        caches["api"].clear()
+        self.admin = User.objects.create(username="admin", role="ADMIN")
+        self.workers = [User.objects.create(username=f"worker{i}") for i in range(12)]
+        Project.objects.bulk_create([Project(worker=w, name=f"Project {w.pk}") for w in self.workers])
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def sample(self, name, **labels):
+        """The value of one series in the /api/metrics/ output."""
+        selector = ",".join(f'{k}="{v}"' for k, v in labels.items())
+        scrape = self.client.get("/api/metrics/", HTTP_AUTHORIZATION="Bearer s3cret")
+        for line in scrape.content.decode().splitlines():
+            if line.startswith(f"{name}{{{selector}}} ") or line.startswith(f"{name}{{{selector},"):
+                return float(line.rsplit(" ", 1)[1])
+        return 0
+
+    @override_settings(METRICS_DEBUG=True)
+    def test_records_queries_and_timings_per_view(self):
+        count = self.sample("http_request_db_queries_count", view="projects-list")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/projects/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f'desc="{len(queries)} queries"', response["Server-Timing"])
+        self.assertIn("serializer;dur=", response["Server-Timing"])
+        self.assertNotIn("X-Repeated-Queries", response)
+        self.assertEqual(self.sample("http_request_db_queries_count", view="projects-list"), count + 1)
+        self.assertGreater(self.sample("http_response_size_bytes_sum", view="projects-list"), 0)
+
+        response = self.client.get("/api/metrics/", HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertEqual(response["Content-Type"], metrics.CONTENT_TYPE)
+        self.assertIn(
+            'http_request_duration_seconds_bucket{view="projects-list",method="GET",status="200",le="+Inf"}',
+            response.content.decode(),
+        )
+
+    @override_settings(METRICS_DEBUG=True)
+    def test_flags_repeated_queries(self):
+        def worker_group(view, worker):
+            # grouped_projects without its prefetch: one query per worker
+            return {"projects": list(Project.objects.filter(worker=worker).values_list("id", flat=True))}
+
+        flagged = self.sample("http_requests_repeated_queries_total", view="projects-grouped-projects")
+        response = self.client.get("/api/projects/grouped_projects/")
+        self.assertNotIn("X-Repeated-Queries", response)
+
+        caches["api"].clear()
+        with mock.patch.object(ProjectViewSet, "_worker_group", worker_group), self.assertLogs("core.metrics") as logs:
+            response = self.client.get("/api/projects/grouped_projects/")
+        self.assertIn("ran the same query 12 times: SELECT", logs.output[0])
+        self.assertNotIn("X-Repeated-Queries", response)  # SQL stays in the server log
+        self.assertEqual(
+            self.sample("http_requests_repeated_queries_total", view="projects-grouped-projects"), flagged + 1
+        )
+
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get("/api/metrics/").status_code, 401)
+        self.assertEqual(self.client.get("/api/metrics/", HTTP_AUTHORIZATION="Bearer wrong").status_code, 401)
+        response = self.client.get("/api/metrics/", HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertEqual(response.status_code, 200)
+
+        # No token: only for local debugging
+        with override_settings(METRICS_TOKEN=""):
+            self.assertEqual(self.client.get("/api/metrics/").status_code, 403)
+            with override_settings(DEBUG=True):
+                self.assertEqual(self.client.get("/api/metrics/").status_code, 200)
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Queries per request for the main endpoints. Each budget must hold as the
+    data grows (more queries with more rows is the N+1 pattern).
+    ``manage.py bench_api --compare`` checks the same counts, with timings,
+    against the stored baseline.
+    """
+
+    def setUp(self):
+        self.admin = User.objects.create(username="admin", role="ADMIN")
+        self.worker = User.objects.create_user(username="worker", password="pw-123456")
+        self.project = Project.objects.create(worker=self.worker, name="Bridge repair")
+
+    def add_data(self, workers, projects_per_worker):
+        workers = [self.worker, *User.objects.bulk_create(
+            User(username=f"worker-{User.objects.count()}-{i}") for i in range(workers)
+        )]
+        Project.objects.bulk_create(
+            Project(worker=w, name=f"Bridge {w.pk}-{i}", status="IN_PROGRESS", finish_date=datetime.date(2025, 1, 1))
+            for w in workers for i in range(projects_per_worker)
+        )
+
+    def requests(self):
+        login = {"username": "worker", "password": "pw-123456"}
+        return [
+            # (name, user, method, url, data, budget)
+            ("login", None, "post", "/api/login/", login, 1),
+            ("list", self.worker, "get", "/api/projects/", None, 1),
+            ("list, admin", self.admin, "get", "/api/projects/?page_size=100", None, 1),
+            ("retrieve", self.worker, "get", f"/api/projects/{self.project.pk}/", None, 1),
+            ("search", self.worker, "get", "/api/projects/search/?name=Bridge repair", None, 2),
+            ("fulltext", self.admin, "get", "/api/projects/fulltext/?q=bridge", None, 2),
+            ("grouped_projects", self.admin, "get", "/api/projects/grouped_projects/", None, 2),
+            ("stats", self.admin, "get", "/api/projects/stats/", None, 5),
+            ("changes", self.worker, "get", "/api/projects/changes/", None, 2),
+            ("update_status", self.worker, "patch", f"/api/projects/{self.project.pk}/update_status/",
+             {"status": "COMPLETED"}, 5),
+        ]
+
+    def test_budgets_hold_as_data_grows(self):
+        for workers, projects_per_worker in ((2, 3), (20, 10)):
+            self.add_data(workers, projects_per_worker)
+            for name, user, method, url, data, budget in self.requests():
+                with self.subTest(name, workers=workers):
+                    caches["api"].clear()
+                    client = APIClient()
+                    if user is not None:
+                        client.force_authenticate(user)
+                    with CaptureQueriesContext(connection) as queries:
+                        response = getattr(client, method)(url, data, format="json")
+                    self.assertEqual(response.status_code, 200)
+                    self.assertLessEqual(len(queries), budget, [q["sql"] for q in queries])
+
+
+class AdminTests(TestCase):
+    def setUp(self):
+        self.superuser = User.objects.create_superuser(username="root", password="pw-123456", role="ADMIN")
+        self.client.force_login(self.superuser)
+
+    def add_projects(self, workers, per_worker):
+        workers = User.objects.bulk_create(
+            User(username=f"w-{User.objects.count()}-{i}") for i in range(workers)
+        )
+        Project.objects.bulk_create(
+            Project(worker=w, name=f"Project {i}", status="PENDING", latitude=Decimal("37.9"),
+                    longitude=Decimal("23.7"), finish_date=datetime.date(2030, 1, 1))
+            for w in workers for i in range(per_worker)
+        )
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        urls = [
+            "/admin/core/project/",
+            "/admin/core/project/?status__exact=PENDING",
+            f"/admin/core/project/?created_at__gte={timezone.localdate().replace(day=1)}",
+            "/admin/core/user/?role__exact=WORKER",
+        ]
+        self.add_projects(2, 2)
+        small = [self.count_queries(url) for url in urls]
+        self.add_projects(20, 5)
+        self.assertEqual([self.count_queries(url) for url in urls], small)
+        self.assertLessEqual(max(small), 8)
+
+    def test_big_tables_show_estimated_count(self):
+        self.add_projects(1, 3)
+        with mock.patch.object(core_admin, "estimated_count", return_value=2_000_000), \
+                CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/admin/core/project/")
+        self.assertEqual(response.context["cl"].result_count, 2_000_000)
+        self.assertFalse([q for q in queries if q["sql"].startswith("SELECT COUNT(*)")])
+
+        # Filtered lists are counted exactly
+        with mock.patch.object(core_admin, "estimated_count", return_value=2_000_000):
+            response = self.client.get("/admin/core/project/?status__exact=PENDING")
+        self.assertEqual(response.context["cl"].result_count, 3)
+
+    def test_status_action_is_one_update(self):
+        self.add_projects(3, 4)
+        ids = list(Project.objects.values_list("id", flat=True)[:10])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/admin/core/project/", {
+                "action": "mark_completed", "_selected_action": ids,
+            })
+        self.assertEqual(response.status_code, 302)
+        updates = [q for q in queries if q["sql"].startswith('UPDATE "core_project"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(Project.objects.filter(status="COMPLETED").count(), 10)
+
+        # Derived data as if every project had been saved
+        expected_stats = set(ProjectStat.objects.filter(count__gt=0).values_list("worker_id", "status", "due_month", "count"))
+        expected_clusters = set(ProjectCluster.objects.filter(count__gt=0).values_list("level", "cell", "status", "count"))
+        stats.rebuild(Project, ProjectStat)
+        clusters.rebuild(Project, ProjectCluster)
+        self.assertEqual(set(ProjectStat.objects.values_list("worker_id", "status", "due_month", "count")), expected_stats)
+        self.assertEqual(
+            set(ProjectCluster.objects.filter(count__gt=0).values_list("level", "cell", "status", "count")),
+            expected_clusters,
+        )
+
+    def test_worker_autocomplete_offers_only_workers(self):
+        User.objects.create(username="wanda")
+        User.objects.create(username="walter", role="ADMIN")
+        response = self.client.get(
+            "/admin/autocomplete/",
+            {"app_label": "core", "model_name": "project", "field_name": "worker", "term": "wa"},
+        )
+        self.assertEqual([r["text"] for r in response.json()["results"]], ["wanda (WORKER)"])
+
+
+class RendererTests(TestCase):
+    def test_fast_json_renderer_matches_drf(self):
+        data = {
+            "price": Decimal("12.50"), "day": datetime.date(2026, 10, 1),
+            "at": datetime.datetime(2026, 10, 1, 12, 30, 5, 123456, tzinfo=datetime.timezone.utc),
+            "workers": {1: [1, 2], 2: []}, "text": "line\u2028separator \u00e9", "none": None,
+        }
+        self.assertEqual(renderers.FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(renderers.FastJSONRenderer().render(None), b"")
+        pretty = renderers.FastJSONRenderer().render(data, "application/json; indent=2")
+        self.assertEqual(pretty, JSONRenderer().render(data, "application/json; indent=2"))
+
+    @skipUnless(importlib.util.find_spec("msgpack"), "msgpack is not installed")
+    def test_msgpack_is_chosen_with_accept(self):
+        import msgpack
+
+        worker = User.objects.create(username="worker")
+        Project.objects.create(worker=worker, name="Bridge")
+        client = APIClient()
+        client.force_authenticate(worker)
+        response = client.get("/api/projects/", HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(response.content)["results"][0]["name"], "Bridge")
+
+
+@override_settings(COMPRESSION_MIN_SIZE=1024)
+class CompressionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.worker = User.objects.create(username="worker")
+        Project.objects.bulk_create([
+            Project(worker=cls.worker, name=f"Project {i}", description="road repair " * 10) for i in range(30)
+        ])
+
+    def setUp(self):
+        caches["api"].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.worker)
+
+    def test_large_json_is_gzipped(self):
+        plain = self.client.get("/api/projects/")
+        self.assertNotIn("Content-Encoding", plain)
+        self.assertIn("Accept-Encoding", plain["Vary"])
+
+        response = self.client.get("/api/projects/", HTTP_ACCEPT_ENCODING="gzip, br;q=0")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(response["ETag"], "W/" + plain["ETag"])
+
+        # The weak tag still validates
+        response = self.client.get("/api/projects/", HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get("/api/projects/", HTTP_ACCEPT_ENCODING="gzip;q=0")
+        self.assertNotIn("Content-Encoding", response)
+
+    def test_small_bodies_are_not_compressed(self):
+        response = self.client.get("/api/projects/?page_size=1", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertLess(len(response.content), 1024)
+        self.assertNotIn("Content-Encoding", response)
+
+    def test_streams_are_compressed_chunk_by_chunk(self):
+        admin = User.objects.create(username="admin", role="ADMIN")
+        self.client.force_authenticate(admin)
+        plain = self.client.get("/api/projects/grouped_projects/?stream=1")
+        response = self.client.get("/api/projects/grouped_projects/?stream=1", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), b"".join(plain.streaming_content))
+
+        # Every chunk is flushed: what has arrived so far decodes
+        chunks = compression.compress_sequence([b'{"a": 1}\n', b'{"b": 2}\n'], "gzip")
+        decoder = zlib.decompressobj(31)
+        self.assertEqual(decoder.decompress(next(chunks)), b'{"a": 1}\n')
+
+    def test_event_streams_and_html_are_left_alone(self):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip")
+        for response in (
+            StreamingHttpResponse(iter([b"data: {}\n\n"]), content_type="text/event-stream"),
+            HttpResponse("<p>" + "x" * 4096, content_type="text/html"),
+        ):
+            response = compression.CompressionMiddleware(lambda request: response)(request)
+            self.assertNotIn("Content-Encoding", response)
+
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username="admin", role="ADMIN")
+        cls.worker = User.objects.create(username="worker")
+        old = timezone.now() - datetime.timedelta(days=400)
+        cls.old_completed = Project.objects.bulk_create([
+            Project(worker=cls.worker, name=f"Old bridge {i}", status="COMPLETED",
+                    latitude=Decimal("37.9"), longitude=Decimal("23.7")) for i in range(3)
+        ])
+        cls.old_open = Project.objects.create(worker=cls.worker, name="Old road", status="IN_PROGRESS")
+        cls.recent = Project.objects.create(worker=cls.worker, name="New bridge", status="COMPLETED")
+        Project.objects.exclude(pk=cls.recent.pk).update(updated_at=old)
+
+    def setUp(self):
+        caches["api"].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.worker)
+
+    def test_moves_old_completed_projects_in_chunks(self):
+        call_command("archive_projects", "--days", "180", "--chunk-size", "2", stdout=io.StringIO())
+        archived = {p.pk for p in self.old_completed}
+        self.assertEqual(set(ArchivedProject.objects.values_list("id", flat=True)), archived)
+        self.assertFalse(Project.objects.filter(pk__in=archived).exists())
+        self.assertEqual(Project.objects.count(), 2)
+        self.assertEqual(ArchivedProject.objects.get(pk=self.old_completed[0].pk).name, "Old bridge 0")
+
+        # Derived data covers hot projects only, as a rebuild would
+        self.assertFalse(ProjectCluster.objects.filter(status="COMPLETED", count__gt=0).exists())
+        self.assertEqual(sum(ProjectStat.objects.values_list("count", flat=True)), 2)
+        self.assertEqual(set(ProjectTombstone.objects.values_list("project_id", flat=True)), archived)
+        self.assertEqual(archive.archive_completed(datetime.timedelta(days=180)), 0)
+
+    def test_just_completed_projects_stay_hot(self):
+        response = self.client.patch(f"/api/projects/{self.old_open.pk}/update_status/", {"status": "COMPLETED"})
+        self.assertEqual(response.status_code, 200)
+        archive.archive_completed(datetime.timedelta(days=180))
+        self.assertTrue(Project.objects.filter(pk=self.old_open.pk).exists())
+        self.assertFalse(ArchivedProject.objects.filter(pk=self.old_open.pk).exists())
+
+    def test_include_archived_lists_both(self):
+        archive.archive_completed(datetime.timedelta(days=180))
+        hot = self.client.get("/api/projects/").json()["results"]
+        self.assertEqual({p["name"] for p in hot}, {"Old road", "New bridge"})
+
+        expected = list(Project.objects.values_list("id", "created_at")) + list(
+            ArchivedProject.objects.values_list("id", "created_at")
+        )
+        expected = [pk for pk, _ in sorted(expected, key=lambda row: (row[1], row[0]), reverse=True)]
+        seen, url = [], "/api/projects/?include_archived=1&page_size=2"
+        while url:
+            with self.assertNumQueries(2):
+                page = self.client.get(url).json()
+            seen += [p["id"] for p in page["results"]]
+            url = page["next"]
+        self.assertEqual(seen, expected)
+
+        pk = self.old_completed[0].pk
+        self.assertEqual(self.client.get(f"/api/projects/{pk}/").status_code, 404)
+        self.assertEqual(self.client.get(f"/api/projects/{pk}/?include_archived=1").json()["name"], "Old bridge 0")
+        self.assertEqual(self.client.get("/api/projects/search/?name=old bridge 1").status_code, 404)
+        response = self.client.get("/api/projects/search/?name=old bridge 1&include_archived=1")
+        self.assertEqual([p["id"] for p in response.json()], [self.old_completed[1].pk])
+
+        self.client.force_authenticate(self.admin)
+        groups = self.client.get("/api/projects/grouped_projects/?include_archived=1").json()
+        self.assertEqual([p["id"] for p in groups[0]["projects"]], sorted(expected))
+
+    def test_async_views_match(self):
+        archive.archive_completed(datetime.timedelta(days=180))
+        for user in (self.worker, self.admin):
+            client = APIClient()
+            client.credentials(
+                HTTP_AUTHORIZATION=f"Bearer {CustomTokenObtainPairSerializer.get_token(user).access_token}"
+            )
+            for path in [
+                "projects/?include_archived=1&page_size=3",
+                f"projects/{self.old_completed[0].pk}/?include_archived=1",
+                "projects/search/?name=old bridge 2&include_archived=1",
+                "projects/grouped_projects/?include_archived=1",
+            ]:
+                caches["api"].clear()
+                sync = client.get(f"/api/{path}")
+                caches["api"].clear()
+                asynchronous = client.get(f"/api/async/{path}")
+                self.assertEqual(asynchronous.status_code, sync.status_code, path)
+                self.assertEqual(asynchronous.content.replace(b"/api/async/", b"/api/"), sync.content, path)
+
+
+class RevocationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username="admin", password="pw-123456", role="ADMIN")
+        cls.worker = User.objects.create_user(username="worker", password="pw-123456")
+
+    def setUp(self):
+        caches["throttle"].clear()
+        user_cache.clear()
+        revocation.revocations.clear()
+        self.addCleanup(revocation.revocations.clear)
+
+    def login(self, username="worker"):
+        tokens = APIClient().post("/api/login/", {"username": username, "password": "pw-123456"}).json()
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        return client, tokens["refresh"]
+
+    def refresh(self, refresh):
+        return APIClient().post("/api/token/refresh/", {"refresh": refresh})
+
+    def test_logout_revokes_the_session(self):
+        client, refresh = self.login()
+        refreshed = APIClient()
+        refreshed.credentials(HTTP_AUTHORIZATION=f"Bearer {self.refresh(refresh).json()['access']}")
+        other, _ = self.login()
+        self.assertEqual(client.get("/api/projects/").status_code, 200)
+
+        self.assertEqual(client.post("/api/logout/").status_code, 200)
+        self.assertEqual(client.get("/api/projects/").status_code, 401)
+        self.assertEqual(client.get("/api/async/projects/").status_code, 401)
+        self.assertEqual(refreshed.get("/api/projects/").status_code, 401)  # same session
+        self.assertEqual(self.refresh(refresh).status_code, 401)
+        self.assertEqual(other.get("/api/projects/").status_code, 200)
+
+    def test_logout_all_revokes_every_session_until_now(self):
+        first, refresh = self.login()
+        second, _ = self.login()
+        self.assertEqual(second.post("/api/logout/all/").status_code, 200)
+        self.assertEqual(first.get("/api/projects/").status_code, 401)
+        self.assertEqual(second.get("/api/projects/").status_code, 401)
+        self.assertEqual(self.refresh(refresh).status_code, 401)
+
+        client, _ = self.login()
+        self.assertEqual(client.get("/api/projects/").status_code, 200)
+
+    def test_admins_revoke_other_users(self):
+        worker, _ = self.login()
+        self.assertEqual(worker.post("/api/logout/all/", {"user": self.admin.pk}).status_code, 403)
+        admin, _ = self.login("admin")
+        self.assertEqual(admin.post("/api/logout/all/", {"user": self.worker.pk}).status_code, 200)
+        self.assertEqual(worker.get("/api/projects/").status_code, 401)
+        self.assertEqual(admin.get("/api/projects/").status_code, 200)
+
+    def test_other_processes_revocations_are_loaded(self):
+        client, _ = self.login()
+        session = APIClient()  # a second session, logged out by "another process"
+        tokens = session.post("/api/login/", {"username": "worker", "password": "pw-123456"}).json()
+        session.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        sid = RefreshToken(tokens["refresh"])[revocation.SESSION_CLAIM]
+        self.assertEqual(session.get("/api/projects/").status_code, 200)
+
+        now = timezone.now()
+        RevokedToken.objects.create(session=sid, user_id=self.worker.pk, expires_at=now + revocation.token_lifetime())
+        with mock.patch.object(revocation, "REFRESH_SECONDS", 0):
+            self.assertEqual(session.get("/api/projects/").status_code, 401)
+        revocation.revocations.clear()  # a process starting
+        self.assertEqual(session.get("/api/projects/").status_code, 401)
+        self.assertEqual(client.get("/api/projects/").status_code, 200)
+
+        RevokedToken.objects.create(session="old", user_id=self.worker.pk, expires_at=now)
+        self.assertEqual(revocation.prune(), 1)
+        self.assertTrue(RevokedToken.objects.filter(session=sid).exists())
+
+    def test_bloom_filter(self):
+        bloom = revocation.BloomFilter(capacity=1000)
+        keys = [f"session-{i}" for i in range(1000)]
+        for key in keys:
+            bloom.add(key)
+        self.assertTrue(all(key in bloom for key in keys))
+        false_positives = sum(f"other-{i}" in bloom for i in range(10_000))
+        self.assertLess(false_positives, 300)  # ~1% expected
+
+        revoked = revocation.RevocationFilter()
+        revoked._bloom = revocation.BloomFilter(capacity=4)
+        for key in keys[:10]:
+            revoked._add_session(key)  # outgrows the filter: rebuilt larger
+        self.assertTrue(all(revoked.is_revoked({revocation.SESSION_CLAIM: key}) for key in keys[:10]))
+        self.assertFalse(revoked.is_revoked({revocation.SESSION_CLAIM: keys[10]}))
+
+
+
+class AdmissionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.worker = User.objects.create_user(username="worker", password="pw-123456")
+        Project.objects.create(worker=cls.worker, name="Mine")
+
+    def setUp(self):
+        caches["api"].clear()
+        caches["throttle"].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.worker)
+
+    def rates(self, **rates):
+        return mock.patch.object(throttling.TokenBucketThrottle, "THROTTLE_RATES", rates)
+
+    def test_token_bucket_allows_a_burst_then_refills(self):
+        clock = mock.patch.object(throttling.TokenBucketThrottle, "timer", return_value=1000.0)
+        with self.rates(user="2/min"), clock as timer:
+            self.assertEqual(self.client.get("/api/projects/").status_code, 200)
+            self.assertEqual(self.client.get("/api/projects/search/?name=Mine").status_code, 200)
+            response = self.client.get("/api/projects/")
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response["Retry-After"], "30")
+
+            timer.return_value = 1030.0  # one token back
+            self.assertEqual(self.client.get("/api/projects/").status_code, 200)
+            self.assertEqual(self.client.get("/api/projects/").status_code, 429)
+
+            other = APIClient()
+            other.force_authenticate(User.objects.create_user(username="other"))
+            self.assertEqual(other.get("/api/projects/").status_code, 200)
+
+    def test_async_views_share_the_bucket(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.worker).access_token}")
+        with self.rates(user="1/min"):
+            self.assertEqual(client.get("/api/projects/").status_code, 200)
+            response = client.get("/api/async/projects/")
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response["Retry-After"], "60")
+            self.assertIn("detail", response.json())
+
+    def test_login_is_throttled_per_username_and_per_ip(self):
+        anonymous = APIClient()
+        with self.rates(login="100/min", login_username="2/min"):
+            for password in ["wrong", "pw-123456"]:
+                anonymous.post("/api/login/", {"username": "worker", "password": password})
+            response = anonymous.post("/api/login/", {"username": "Worker", "password": "pw-123456"})
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(anonymous.post("/api/login/", {"username": "other", "password": "x"}).status_code, 401)
+            # Guessing from one address doesn't lock the worker out elsewhere
+            elsewhere = APIClient(REMOTE_ADDR="203.0.113.9")
+            self.assertEqual(elsewhere.post("/api/login/", {"username": "worker", "password": "pw-123456"}).status_code, 200)
+        with self.rates(login="1/min", login_username="100/min"):
+            caches["throttle"].clear()
+            anonymous.post("/api/login/", {"username": "a", "password": "x"})
+            self.assertEqual(anonymous.post("/api/login/", {"username": "b", "password": "x"}).status_code, 429)
+
+    def test_low_priority_routes_are_shed_when_overloaded(self):
+        shed = metrics.REQUESTS_SHED._values[("projects-search", "depth")]
+        with mock.patch.object(admission.load, "in_flight", settings.ADMISSION_SHED_DEPTH):
+            response = self.client.get("/api/projects/search/?name=Mine")
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response["Retry-After"], "1")
+            self.assertIn("detail", response.json())
+            self.assertEqual(self.client.get("/api/projects/").status_code, 200)
+            with override_settings(ADMISSION_ENABLED=False):
+                self.assertEqual(self.client.get("/api/projects/search/?name=Mine").status_code, 200)
+        self.assertEqual(metrics.REQUESTS_SHED._values[("projects-search", "depth")], shed + 1)
+        self.assertEqual(self.client.get("/api/projects/search/?name=Mine").status_code, 200)
+
+        # Slow with others waiting: overloaded; slow alone: not
+        with mock.patch.object(admission.load, "latency", return_value=2.5):
+            self.assertEqual(self.client.get("/api/projects/search/?name=Mine").status_code, 200)
+            with mock.patch.object(admission.load, "in_flight", 1):
+                response = self.client.get("/api/projects/search/?name=Mine")
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response["Retry-After"], "3")
+
+    def test_concurrency_limit_queues_then_refuses(self):
+        with override_settings(ADMISSION_CONCURRENCY={"login": 1}, ADMISSION_QUEUE_TIMEOUT=0.01):
+            slot = admission.limiter("login")
+            self.assertTrue(slot.acquire(0))  # a login in progress
+            try:
+                response = APIClient().post("/api/login/", {"username": "worker", "password": "pw-123456"})
+            finally:
+                slot.release()
+            self.assertEqual(response.status_code, 503)
+            self.assertIn("Retry-After", response)
+            response = APIClient().post("/api/login/", {"username": "worker", "password": "pw-123456"})
+            self.assertEqual(response.status_code, 200)
+
+    def test_limiter_follows_settings(self):
+        with override_settings(ADMISSION_CONCURRENCY={"login": 4}, ADMISSION_QUEUE_DEPTH=3):
+            self.assertEqual((admission.limiter("login").limit, admission.limiter("login").queue), (4, 3))
+        with override_settings(ADMISSION_CONCURRENCY={"login": 4}, ADMISSION_QUEUE_DEPTH=6):
+            self.assertEqual(admission.limiter("login").queue, 6)
+        self.assertGreaterEqual(settings.ADMISSION_CONCURRENCY["login"], 1)
+        self.assertLess(settings.ADMISSION_QUEUE_DEPTH, settings.SERVER_THREADS)
+
+    def test_limiter(self):
+        limiter = admission.Limiter(1, queue=0)
+        self.assertTrue(limiter.acquire())
+        self.assertFalse(limiter.acquire(5))  # no room to wait: refused at once
+        limiter.queue = 1
+        self.assertFalse(limiter.acquire(0))
+        threading.Timer(0.05, limiter.release).start()
+        self.assertTrue(limiter.acquire(5))  # woken by the release
+        self.assertEqual((limiter.running, limiter.waiting), (1, 0))
+
+    def test_latency_average_and_proxy_queue_time(self):
+        monitor = admission.LoadMonitor()
+        for latency in [0.1, 0.1, 3.0]:
+            monitor.enter()
+            monitor.leave(latency)
+        self.assertGreater(monitor.latency(), 0.1)
+        with mock.patch.object(admission.time, "monotonic", return_value=time.monotonic() + admission.LATENCY_WINDOW):
+            self.assertEqual(monitor.latency(), 0.0)  # nothing recent
+
+        request = RequestFactory().get("/", HTTP_X_REQUEST_START=f"t={(time.time() - 2) * 1000:.0f}")
+        self.assertAlmostEqual(admission.queued_for(request), 2, delta=0.5)
+        self.assertEqual(admission.queued_for(RequestFactory().get("/")), 0.0)
+
+
+class OutboxTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.worker = User.objects.create_user(username="worker", email="w@example.com", password="pw-123456")
+
+    def test_password_reset_only_enqueues(self):
+        # One user lookup, one INSERT; nothing is sent during the request
+        with self.assertNumQueries(2):
+            response = APIClient().post("/api/password-reset/", {"email": "w@example.com"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(OutboxEmail.objects.get().to, "w@example.com")
+
+    def test_worker_delivers_batch(self):
+        for i in range(3):
+            outbox.enqueue(f"Subject {i}", "Body", "w@example.com")
+        self.assertEqual(outbox.run(once=True), 3)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(OutboxEmail.objects.exclude(status="SENT").exists())
+        self.assertEqual(outbox.run(once=True), 0)
+
+    def test_failure_is_retried_with_backoff_then_given_up(self):
+        message = outbox.enqueue("Subject", "Body", "w@example.com")
+        with mock.patch("django.core.mail.EmailMessage.send", side_effect=OSError("SMTP down")):
+            outbox.run(once=True)
+            message.refresh_from_db()
+            self.assertEqual((message.status, message.attempts), ("PENDING", 1))
+            self.assertGreater(message.next_attempt_at, message.created_at + datetime.timedelta(seconds=20))
+            self.assertEqual(outbox.run(once=True), 0)  # not due yet
+
+            OutboxEmail.objects.update(attempts=outbox.MAX_ATTEMPTS - 1, next_attempt_at=message.created_at)
+            outbox.run(once=True)
+        message.refresh_from_db()
+        self.assertEqual(message.status, "FAILED")
+        self.assertIn("SMTP down", message.last_error)
+
+
+class LocalLRUCacheTests(SimpleTestCase):
+
+    def test_evicts_least_recently_used_beyond_max_bytes(self):
+        cache = LocalLRUCache("lru-test", {"OPTIONS": {"MAX_BYTES": 3000}})
+        cache.clear()
+        cache.set("a", "x" * 1000)
+        cache.set("b", "x" * 1000)
+        cache.get("a")  # b is now the least recently used
+        cache.set("c", "x" * 1000)
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
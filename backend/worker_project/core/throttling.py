@@ -0,0 +1,101 @@
+"""
+Token-bucket rate limits per user and per IP, as DRF throttles.
+
+A rate in DRF's format, "N/period" in REST_FRAMEWORK's
+DEFAULT_THROTTLE_RATES, is a bucket of N tokens refilled at N per period:
+a burst of N requests passes at once, after that one every period/N.
+(DRF's own SimpleRateThrottle keeps a list of request times per key
+instead, and lets nothing through for the rest of the window once it is
+full.) A refused request gets 429 with Retry-After: the time until the
+next token.
+
+    UserTokenBucketThrottle   "user"            every DRF view by default;
+                                                per user, per IP if anonymous
+    LoginIPThrottle           "login"           CustomLoginView, per IP
+    LoginUsernameThrottle     "login_username"  CustomLoginView, per username
+                                                tried and IP (password
+                                                guessing; per IP too, or
+                                                anyone could lock a worker
+                                                out by guessing wrong)
+    RegisterThrottle          "register"        registration, per IP
+
+Buckets live in the "throttle" cache: local memory by default, so each
+process has its own and a client gets up to N per process; set
+THROTTLE_REDIS_URL to share them. Updates are serialized per process
+only, so processes sharing a store may let a few extra requests through.
+
+Concurrency limits and load shedding are core.admission.
+"""
+import threading
+
+from django.core.cache import caches
+from rest_framework.throttling import SimpleRateThrottle
+
+CACHE_ALIAS = "throttle"
+
+_lock = threading.Lock()
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """SimpleRateThrottle's rates, scopes and keys with a token bucket per key."""
+
+    cache = caches[CACHE_ALIAS]
+    cache_format = "tb:%(scope)s:%(ident)s"
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        refill = self.num_requests / self.duration  # tokens per second
+        with _lock:
+            now = self.timer()  # time.time(): comparable across processes sharing a store
+            tokens, at = self.cache.get(self.key, (self.num_requests, now))
+            tokens = min(self.num_requests, tokens + (now - at) * refill)
+            if tokens < 1:
+                self._wait = (1 - tokens) / refill
+                return False
+            # Kept until the bucket would be full again: then it's the default
+            self.cache.set(self.key, (tokens - 1, now), int((self.num_requests - tokens + 1) / refill) + 1)
+        return True
+
+    def wait(self):
+        return self._wait
+
+    def ident(self, request):
+        return self.get_ident(request)
+
+    def get_cache_key(self, request, view):
+        ident = self.ident(request)
+        if ident is None:
+            return None
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    scope = "user"
+
+    def ident(self, request):
+        if request.user and request.user.is_authenticated:
+            return f"u{request.user.pk}"
+        return self.get_ident(request)
+
+
+class LoginIPThrottle(TokenBucketThrottle):
+    scope = "login"
+
+
+class LoginUsernameThrottle(TokenBucketThrottle):
+    scope = "login_username"
+
+    def ident(self, request):
+        username = request.data.get("username") if hasattr(request.data, "get") else None
+        if not isinstance(username, str) or not username:
+            return None
+        return f"{self.get_ident(request)}:{username.strip().lower()[:150]}"
+
+
+class RegisterThrottle(TokenBucketThrottle):
+    scope = "register"
@@ -1,10 +1,11 @@
 from django.urls import path, include
-from .views import WorkerRegisterView, AdminRegisterView, CustomLoginView, api_root
-from rest_framework_simplejwt.views import TokenRefreshView
+from .views import WorkerRegisterView, AdminRegisterView, CustomLoginView, CustomTokenRefreshView, api_root
+from .views import LogoutAllView, LogoutView
 from rest_framework.routers import DefaultRouter
 from .views import ProjectViewSet
 from django.contrib import admin
 from .views import WorkerPasswordResetRequestView, WorkerPasswordResetConfirmView
+from . import async_views, metrics
 
 router = DefaultRouter()
 router.register("projects", ProjectViewSet, basename="projects")
@@ -14,9 +15,19 @@ urlpatterns = [
     path("register/worker/", WorkerRegisterView.as_view(), name="register_worker"),
     path("register/admin/", AdminRegisterView.as_view(), name="register_admin"),
     path("login/", CustomLoginView.as_view(), name="login"),
-    path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    path("token/refresh/", CustomTokenRefreshView.as_view(), name="token_refresh"),
+    path("logout/", LogoutView.as_view(), name="logout"),
+    path("logout/all/", LogoutAllView.as_view(), name="logout_all"),
     path("password-reset/", WorkerPasswordResetRequestView.as_view(), name="worker-password-reset"),
     path('password-reset-confirm/<uidb64>/<token>/', WorkerPasswordResetConfirmView.as_view(), name='worker-password-reset-confirm'),
     path("", include(router.urls)),  # for /api/projects/
+    path("metrics/", metrics.metrics_view, name="metrics"),  # Prometheus scrape target
+    # Native async versions of the hot project endpoints (see core.async_views)
+    path("async/projects/", async_views.project_list, name="async-projects-list"),
+    path("async/projects/search/", async_views.project_search, name="async-projects-search"),
+    path("async/projects/grouped_projects/", async_views.grouped_projects, name="async-projects-grouped"),
+    path("async/projects/events/", async_views.project_events, name="async-projects-events"),
+    path("async/projects/<int:pk>/", async_views.project_detail, name="async-projects-detail"),
+    path("async/projects/<int:pk>/update_status/", async_views.update_status, name="async-projects-update-status"),
 
 ]
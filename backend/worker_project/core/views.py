@@ -1,13 +1,15 @@
 from rest_framework import generics, permissions
-from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
 from .serializers import WorkerRegisterSerializer, AdminRegisterSerializer, UserSerializer
 from .models import User
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import viewsets, permissions
 from .serializers import ProjectSerializer
-from .models import Project
+from .models import ArchivedProject, ImportJob, Project, ProjectStat
 from rest_framework.decorators import api_view, action
 from rest_framework import status
 from rest_framework_simplejwt.exceptions import TokenError, InvalidToken
@@ -15,6 +17,31 @@ from rest_framework import serializers
 from .serializers import PasswordResetSerializer, PasswordResetConfirmSerializer
 from rest_framework.views import APIView
 from .serializers import PasswordResetConfirmSerializer
+from .fast_serializers import project_fast_serializer
+from . import archive, clusters, db_routers, events, geo, imports, response_cache, stats, sync
+from . import export as project_export  # module; ProjectViewSet.export is the action
+from . import search as text_search  # module; ProjectViewSet.search is the exact-name action
+from .response_cache import cache_response
+from .authentication import ROLE_CLAIM
+from .revocation import LOGIN_TIME_CLAIM, SESSION_CLAIM, revocations
+from .throttling import LoginIPThrottle, LoginUsernameThrottle, RegisterThrottle
+from rest_framework.exceptions import AuthenticationFailed, ParseError
+import gzip
+import itertools
+import json
+import logging
+import time
+from django.db import transaction
+from django.utils import timezone
+from django.db.models import Prefetch, Value
+from django.db.models.functions import Lower
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from rest_framework.utils.encoders import JSONEncoder
+
+logger = logging.getLogger(__name__)
+
+ID_RANGE = range(-2**63, 2**63)  # primary keys: BigAutoField (SQLite INTEGER, PostgreSQL bigint)
 
 class WorkerPasswordResetConfirmView(APIView):
     def post(self, request, uidb64, token):
@@ -47,6 +74,7 @@ class WorkerRegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = WorkerRegisterSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [RegisterThrottle]
 
 
 # Admin Register
@@ -54,10 +82,22 @@ class AdminRegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = AdminRegisterSerializer
     permission_classes = [permissions.AllowAny]   # (optionally: restrict to superuser)
+    throttle_classes = [RegisterThrottle]
 
 
 # Custom JWT login with role in response
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        # Signed role claim, checked by core.authentication.CachedJWTAuthentication
+        token = super().get_token(user)
+        token[ROLE_CLAIM] = user.role
+        # Copied into every access token refreshed from this one, so logout
+        # can revoke the whole session (core.revocation)
+        token[SESSION_CLAIM] = token[jwt_settings.JTI_CLAIM]
+        token[LOGIN_TIME_CLAIM] = time.time()
+        return token
+
     def validate(self, attrs):
         try:
             data = super().validate(attrs)
@@ -71,6 +111,8 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
 
 class CustomLoginView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
+    # Per IP and per username tried; core.admission caps concurrent logins
+    throttle_classes = [LoginIPThrottle, LoginUsernameThrottle]
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -84,54 +126,488 @@ class CustomLoginView(TokenObtainPairView):
             return Response({"detail": "Wrong username or password"}, status=status.HTTP_401_UNAUTHORIZED)
 
         return Response(serializer.validated_data, status=status.HTTP_200_OK)
+
+
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        revocations.refresh_if_due()
+        if revocations.is_revoked(refresh.payload):
+            raise AuthenticationFailed("The session has been logged out.", code="token_revoked")
+        return super().validate(attrs)
+
+
+class CustomTokenRefreshView(TokenRefreshView):
+    serializer_class = CustomTokenRefreshSerializer
+
+
+def _session(payload):
+    return payload.get(SESSION_CLAIM) or payload.get(jwt_settings.JTI_CLAIM)
+
+
+class LogoutView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        """
+        Log out the session of the access token used: it, its refresh token
+        and every access token refreshed from it stop working. Tokens from
+        before sessions existed are revoked one by one: send the refresh
+        token as "refresh".
+        """
+        revocations.revoke_session(_session(request.auth.payload), request.user.pk)
+        if request.data.get("refresh"):
+            try:
+                refresh = RefreshToken(request.data["refresh"])
+            except TokenError:
+                return Response({"detail": "Invalid refresh token"}, status=400)
+            if str(refresh.get(jwt_settings.USER_ID_CLAIM)) != str(request.user.pk):
+                return Response({"detail": "Refresh token of another user"}, status=400)
+            if _session(refresh.payload) != _session(request.auth.payload):
+                revocations.revoke_session(_session(refresh.payload), request.user.pk)
+        return Response({"detail": "Logged out."}, status=status.HTTP_200_OK)
+
+
+class LogoutAllView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        """
+        Log out every session of the current user, or of {"user": id} for
+        admins. Logins after this work as usual.
+        """
+        try:
+            user_id = int(request.data.get("user", request.user.pk))
+        except (TypeError, ValueError):
+            return Response({"detail": "Invalid user"}, status=400)
+        if user_id != request.user.pk:
+            if request.user.role != "ADMIN":
+                return Response({"detail": "You are not authorized"}, status=403)
+            if not User.objects.filter(pk=user_id).exists():
+                return Response({"detail": "User not found"}, status=404)
+        revocations.revoke_user(user_id)
+        return Response({"detail": "All sessions logged out."}, status=status.HTTP_200_OK)
+
     
 class ProjectViewSet(viewsets.ModelViewSet):
     serializer_class = ProjectSerializer
     permission_classes = [permissions.IsAuthenticated]  # Default permission
+    GROUPED_CHUNK_SIZE = 500  # workers per prefetch batch in streaming mode
+    BULK_MAX_ITEMS = 500  # max projects per bulk_create / bulk update_status call
+    NEARBY_MAX_RADIUS_M = 100_000
+    # Read-only fast path for list/search (same output, no model instances).
+    # Set to None to fall back to plain ProjectSerializer.
+    fast_serializer = project_fast_serializer
     
 
+    def dispatch(self, request, *args, **kwargs):
+        with db_routers.request_scope():
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # Reads go to a replica (if configured) once the user is authenticated
+        if request.method in permissions.SAFE_METHODS:
+            db_routers.read_from_replica(request.user)
+
     def get_permissions(self):
-        if self.action == "create":
+        if self.action in ("create", "bulk_create", "bulk_update_status"):
             return [IsWorker()]
         return [permissions.IsAuthenticated()]
 
     def get_queryset(self):
+        return self._scoped(Project.objects.all())
+
+    def get_archived_queryset(self):
+        """get_queryset() for archived projects (core.archive)."""
+        return self._scoped(ArchivedProject.objects.all())
+
+    def _scoped(self, queryset):
         user = self.request.user
-        if user.role == "ADMIN":
-            return Project.objects.all()
-        return Project.objects.filter(worker=user)
+        if user.role != "ADMIN":
+            queryset = queryset.filter(worker=user)
+
+        # ?fields= projection: only load the requested columns (plus the
+        # pagination key) for list views
+        if self.action == "list":
+            fields = ProjectSerializer.requested_fields(self.request)
+            if fields:
+                columns = {"worker_id" if f == "worker" else f for f in fields}
+                queryset = queryset.only("id", "created_at", *columns)
+        return queryset
+
+    @cache_response()
+    def list(self, request, *args, **kwargs):
+        if archive.requested(request):
+            return self._list_with_archived(request)
+        if self.fast_serializer is None:
+            return super().list(request, *args, **kwargs)
+
+        fields = ProjectSerializer.requested_fields(request)
+        queryset = self.filter_queryset(self.get_queryset())
+        # created_at/id are the pagination key, fetched even if not requested
+        rows = self.fast_serializer.values(queryset, fields, extra=("created_at", "id"))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(self.fast_serializer.serialize(page, fields))
+        return Response(self.fast_serializer.serialize(rows, fields))
+
+    def _list_with_archived(self, request):
+        """list() of hot and archived projects: a keyset page of each, merged."""
+        querysets = [self.filter_queryset(self.get_queryset()), self.get_archived_queryset()]
+        if self.fast_serializer is None:
+            page = self.paginator.paginate_querysets(querysets, request)
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+        fields = ProjectSerializer.requested_fields(request)
+        querysets = [self.fast_serializer.values(q, fields, extra=("created_at", "id")) for q in querysets]
+        page = self.paginator.paginate_querysets(querysets, request)
+        return self.get_paginated_response(self.fast_serializer.serialize(page, fields))
+
+    @cache_response()
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            if not archive.requested(request):
+                raise
+        project = get_object_or_404(self.get_archived_queryset(), pk=kwargs["pk"])
+        return Response(self.get_serializer(project).data)
 
     def perform_create(self, serializer):
         serializer.save(worker=self.request.user)
 
     @action(detail=False, methods=["GET"], permission_classes=[permissions.IsAuthenticated])
+    @cache_response()
     def grouped_projects(self, request):
         user = request.user
         if user.role != "ADMIN":
             return Response({"detail": "You are not authorized"}, status=403)
 
-        workers = User.objects.filter(role="WORKER")
+        # One query for workers + one for all their projects (no N+1)
+        workers = User.objects.filter(role="WORKER").order_by("id").prefetch_related(
+            Prefetch("projects", queryset=Project.objects.order_by("id"))
+        )
+        if archive.requested(request):
+            workers = workers.prefetch_related(
+                Prefetch("archived_projects", queryset=ArchivedProject.objects.order_by("id"))
+            )
+
+        # ?stream=1 -> yield one worker group at a time so memory stays flat
+        if request.query_params.get("stream") in ("1", "true"):
+            return StreamingHttpResponse(
+                db_routers.keep_routing(self._stream_worker_groups(workers)),
+                content_type="application/json",
+            )
+
+        data = [self._worker_group(w) for w in workers]
+        return Response(data)
+
+    def _worker_group(self, worker):
+        projects = worker.projects.all()
+        if archive.requested(self.request):
+            projects = sorted([*projects, *worker.archived_projects.all()], key=lambda p: p.id)
+        return {
+            "worker": UserSerializer(worker).data,
+            "projects": ProjectSerializer(projects, many=True).data
+        }
+
+    def _stream_worker_groups(self, workers):
+        # iterator() prefetches projects per chunk of workers, so we only
+        # ever hold GROUPED_CHUNK_SIZE workers (and their projects) in memory
+        yield "["
+        for i, w in enumerate(workers.iterator(chunk_size=self.GROUPED_CHUNK_SIZE)):
+            if i:
+                yield ","
+            yield json.dumps(self._worker_group(w), cls=JSONEncoder)
+        yield "]"
+
+    @action(detail=False, methods=["GET"], permission_classes=[permissions.IsAuthenticated])
+    @cache_response()
+    def nearby(self, request):
+        """
+        Projects within ?radius= meters of ?lat=&lng=, nearest first, each with
+        a distance_m. Index ranges + bbox prefilter in SQL, exact haversine here.
+        """
+        lat = _float_param(request, "lat", -90, 90)
+        lng = _float_param(request, "lng", -180, 180)
+        radius = _float_param(request, "radius", 0, self.NEARBY_MAX_RADIUS_M, default=1000)
+        limit = int(_float_param(request, "limit", 1, 1000, default=100))
+
+        candidates = self.get_queryset().filter(
+            geo.bbox_q(*geo.radius_bbox(lat, lng, radius))
+        ).values_list("id", "latitude", "longitude")
+        hits = []
+        for pk, p_lat, p_lng in candidates:
+            distance = geo.haversine_m(lat, lng, float(p_lat), float(p_lng))
+            if distance <= radius:
+                hits.append((distance, pk))
+        hits.sort()
+        hits = hits[:limit]
+
+        rows = {p["id"]: p for p in self._serialize_rows(Project.objects.filter(pk__in=[pk for _, pk in hits]))}
         data = []
-        for w in workers:
-            projects = Project.objects.filter(worker=w)
-            data.append({
-                "worker": UserSerializer(w).data,
-                "projects": ProjectSerializer(projects, many=True).data
-            })
+        for distance, pk in hits:
+            rows[pk]["distance_m"] = round(distance, 1)
+            data.append(rows[pk])
         return Response(data)
 
     @action(detail=False, methods=["GET"], permission_classes=[permissions.IsAuthenticated])
+    @cache_response()
+    def bbox(self, request):
+        """Projects inside ?bbox=west,south,east,north (up to ?limit=, by id)."""
+        south, west, north, east = _bbox_param(request)
+        limit = int(_float_param(request, "limit", 1, 5000, default=500))
+
+        projects = self.get_queryset().filter(geo.bbox_q(south, west, north, east)).order_by("id")
+        data = self._serialize_rows(projects[:limit + 1])
+        return Response({
+            "truncated": len(data) > limit,
+            "results": data[:limit],
+        })
+
+    @action(detail=False, methods=["GET"], url_path="clusters", permission_classes=[permissions.IsAuthenticated])
+    @cache_response()
+    def map_clusters(self, request):
+        """
+        Project clusters for a map viewport: ?z=<zoom>&bbox=west,south,east,north.
+        One entry per grid cell with its centroid, total and per-status counts.
+
+        Admins at low zoom read the precomputed ProjectCluster table; workers
+        (own projects only) and high zoom levels aggregate projects on the fly.
+        """
+        zoom = int(_float_param(request, "z", 0, 22))
+        south, west, north, east = _bbox_param(request)
+        level = clusters.level_for_zoom(zoom)
+        ranges = clusters.cell_ranges(south, west, north, east, level)
+
+        if request.user.role == "ADMIN" and level in clusters.CLUSTER_LEVELS:
+            rows = clusters.stored_clusters(ranges, level)
+        else:
+            rows = clusters.live_clusters(self.get_queryset(), ranges, level)
+        return Response({"z": zoom, "level": level, "clusters": clusters.group(rows)})
+
+    def _serialize_rows(self, queryset):
+        if self.fast_serializer is not None:
+            return self.fast_serializer.serialize(self.fast_serializer.values(queryset))
+        return ProjectSerializer(queryset, many=True).data
+
+    @action(detail=False, methods=["GET"], permission_classes=[permissions.IsAuthenticated])
+    @cache_response()
+    def fulltext(self, request):
+        """
+        Ranked substring/prefix search over name and description:
+        ?q=<text>&page=<n>&page_size=<n>. Workers search their own projects,
+        admins everyone's. Falls back to typo-tolerant matching when nothing
+        matches exactly ("fuzzy": true). Each result has a "highlight" with
+        HTML-escaped name and description snippet, matches in <mark>.
+
+        Only the newest text_search.RANK_WINDOW matches are ranked; when more
+        match, "count_capped" is true and "count" is that window.
+        """
+        query = request.query_params.get("q", "").strip()
+        if not text_search.terms(query):
+            return Response({"detail": "Please provide a search query (?q=...)"}, status=400)
+        page = int(_float_param(request, "page", 1, 1000, default=1))
+        page_size = int(_float_param(request, "page_size", 1, 50, default=20))
+
+        worker_id = None if request.user.role == "ADMIN" else request.user.pk
+        found = text_search.search(
+            query, worker_id=worker_id, offset=(page - 1) * page_size, limit=page_size
+        )
+
+        rows = {p["id"]: p for p in self._serialize_rows(Project.objects.filter(pk__in=found.ids))}
+        results = []
+        for pk in found.ids:
+            if pk not in rows:
+                continue  # deleted after it was indexed
+            row = rows[pk]
+            row["highlight"] = {
+                "name": text_search.highlight(row.get("name"), found.terms),
+                "description": text_search.highlight(row.get("description"), found.terms, snippet=True),
+            }
+            results.append(row)
+        return Response({
+            "count": found.total,
+            "count_capped": found.capped,
+            "page": page,
+            "fuzzy": found.fuzzy,
+            "has_next": page * page_size < found.total,
+            "results": results,
+        })
+
+    @action(detail=False, methods=["GET"], permission_classes=[permissions.IsAuthenticated])
+    @cache_response(vary=lambda request: timezone.localdate())  # overdue counts change at midnight
+    def stats(self, request):
+        """
+        Project counts by status, overdue (finish_date passed, not completed),
+        open projects by deadline month, and per-worker workload. Read from
+        the precomputed ProjectStat table (core.stats). Admins get every
+        worker, workers themselves.
+        """
+        user = request.user
+        today = timezone.localdate()
+        if user.role == "ADMIN":
+            summary = stats.summary(ProjectStat.objects.all(), Project.objects.all(), today)
+            workers = User.objects.filter(role="WORKER").order_by("id").values_list("id", "username")
+        else:
+            summary = stats.summary(
+                ProjectStat.objects.filter(worker_id=user.pk), Project.objects.filter(worker=user), today
+            )
+            workers = [(user.pk, user.username)]
+
+        per_worker = summary.pop("workers")
+        empty = {"statuses": {}, "total": 0, "open": 0, "overdue": 0}
+        return Response({
+            "date": today,
+            **summary,
+            "workers": [
+                {"worker": {"id": pk, "username": username}, **per_worker.get(pk, empty)}
+                for pk, username in workers
+            ],
+        })
+
+    @action(detail=False, methods=["GET"], permission_classes=[permissions.IsAuthenticated])
+    def export(self, request):
+        """
+        Download all projects (workers: their own) as a file streamed while
+        it is read: ?output=csv|ndjson|parquet, ?fields=a,b,c, ?gzip=1.
+        See core.export.
+        """
+        output = request.query_params.get("output", "csv")
+        if output not in project_export.FORMATS:
+            choices = ", ".join(project_export.FORMATS)
+            return Response({"detail": f"Unknown output, expected one of: {choices}"}, status=400)
+        compress = request.query_params.get("gzip") in ("1", "true")
+        try:
+            stream = project_export.export(
+                self.get_queryset(), output, ProjectSerializer.requested_fields(request), gzip=compress
+            )
+        except project_export.ExportUnavailable as e:
+            return Response({"detail": str(e)}, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+        response = StreamingHttpResponse(
+            db_routers.keep_routing(stream), content_type=project_export.content_type(output, compress)
+        )
+        response["Content-Disposition"] = f'attachment; filename="{project_export.filename(output, compress)}"'
+        return response
+
+    @action(detail=False, methods=["post"], url_path="import", permission_classes=[permissions.IsAuthenticated])
+    def import_file(self, request):
+        """
+        Admins: import workers and projects from an uploaded CSV/NDJSON file
+        (multipart "file"; "format" when the name doesn't tell; "job" to
+        resume an interrupted import; "send_reset_emails"). See core.imports.
+
+        Streams NDJSON progress, one line per committed chunk:
+        {"job", "rows_done", "workers_created", "projects_created",
+        "rows_rejected", "status", "errors": [{"line", "errors"}]}; if the
+        import fails after the first chunk, a last {"job", "status":
+        "FAILED", "detail"} line.
+        """
+        if request.user.role != "ADMIN":
+            return Response({"detail": "You are not authorized"}, status=403)
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"detail": 'Please upload a file (multipart field "file")'}, status=400)
+        file_format = request.data.get("format") or imports.format_for(upload.name)
+        if file_format not in imports.FORMATS:
+            choices = ", ".join(imports.FORMATS)
+            return Response({"detail": f"Unknown format, expected one of: {choices}"}, status=400)
+
+        if request.data.get("job"):
+            try:
+                job_id = int(request.data["job"])
+            except (TypeError, ValueError):
+                job_id = None
+            if job_id is None or job_id not in ID_RANGE:
+                return Response({"detail": "job must be an import job id"}, status=400)
+            job = ImportJob.objects.filter(pk=job_id).exclude(status="DONE").first()
+            if job is None:
+                return Response({"detail": "No unfinished import job with this id"}, status=404)
+        else:
+            job = ImportJob.objects.create(source=upload.name)
+
+        file = gzip.GzipFile(fileobj=upload.file) if upload.name.endswith(".gz") else upload.file
+        updates = imports.run(
+            imports.read_rows(file, file_format), job,
+            send_reset_emails=request.data.get("send_reset_emails") in ("1", "true", True),
+            pool=imports.shared_pool(),  # not a CPU's worth of processes per upload
+        )
+        # The first chunk runs before the response starts: failing at once
+        # (a bad file, the database) is an error response, not an empty 200
+        first = next(updates)
+
+        def progress():
+            try:
+                for job, errors in itertools.chain([first], updates):
+                    yield json.dumps({
+                        "job": job.pk,
+                        "rows_done": job.rows_done,
+                        "workers_created": job.workers_created,
+                        "projects_created": job.projects_created,
+                        "rows_rejected": job.rows_rejected,
+                        "status": job.status,
+                        "errors": errors,
+                    }) + "\n"
+            except Exception as e:
+                # The status line is sent: end the stream with what happened
+                logger.exception("Import job %s failed", first[0].pk)
+                yield json.dumps({"job": first[0].pk, "status": "FAILED", "detail": f"{type(e).__name__}: {e}"}) + "\n"
+        return StreamingHttpResponse(progress(), content_type="application/x-ndjson")
+
+    @action(detail=False, methods=["GET"], permission_classes=[permissions.IsAuthenticated])
+    def changes(self, request):
+        """
+        Delta sync: projects created or changed and ids of projects deleted
+        since ?since=<sync_token>, at most ?limit= of each (see core.sync).
+        Without ?since= returns everything. Keep calling with the returned
+        sync_token while has_more is true; store it for the next sync.
+        """
+        limit = int(_float_param(request, "limit", 1, sync.MAX_BATCH_SIZE, default=sync.BATCH_SIZE))
+        projects = self.get_queryset()
+        if self.fast_serializer is not None:
+            projects = self.fast_serializer.values(projects, extra=("updated_at", "id"))
+        found = sync.changes(
+            projects, sync.tombstones_for(request.user), request.query_params.get("since"), limit
+        )
+
+        if self.fast_serializer is not None:
+            changed = self.fast_serializer.serialize(found.changed)
+        else:
+            changed = ProjectSerializer(found.changed, many=True).data
+        return Response({
+            "changed": changed,
+            "deleted": found.deleted,
+            "has_more": found.has_more,
+            "sync_token": found.token,
+        })
+
+    @action(detail=False, methods=["GET"], permission_classes=[permissions.IsAuthenticated])
+    @cache_response(per_user=True)
     def search(self, request):
         name = request.query_params.get("name", "").strip()
         if not name:
             return Response({"detail": "Please provide a project name (?name=...)"}, status=400)
 
-        projects = Project.objects.filter(worker=request.user, name__iexact=name)
-        if not projects.exists():
+        # Same semantics as name__iexact, but written as Lower(name) = Lower(value)
+        # so it can use the (worker, Lower(name)) index
+        querysets = [Project.objects]
+        if archive.requested(request):
+            querysets.append(ArchivedProject.objects)
+        querysets = [
+            q.annotate(name_lower=Lower("name")).filter(worker=request.user, name_lower=Lower(Value(name)))
+            for q in querysets
+        ]
+        if not any(projects.exists() for projects in querysets):
             return Response({"detail": f"No project found with name '{name}'"}, status=404)
 
-        serializer = ProjectSerializer(projects, many=True)
-        return Response(serializer.data)
+        if self.fast_serializer is not None:
+            return Response([
+                row for projects in querysets
+                for row in self.fast_serializer.serialize(self.fast_serializer.values(projects))
+            ])
+        return Response([row for projects in querysets for row in ProjectSerializer(projects, many=True).data])
 
     @action(detail=True, methods=['patch'], permission_classes=[IsWorker])
     def update_status(self, request, pk=None):
@@ -158,13 +634,13 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
             
-        if project.worker != request.user:
+        if project.worker_id != request.user.pk:
             return Response(
                 {"detail": f"You cannot update project '{project.name}' because it does not belong to you."},
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        if project.worker != request.user:
+        if project.worker_id != request.user.pk:
             return Response({"detail": "Not authorized"}, status=403)
 
         status_value = request.data.get("status")
@@ -172,10 +648,139 @@ class ProjectViewSet(viewsets.ModelViewSet):
             return Response({"detail": "Invalid status"}, status=400)
 
         project.status = status_value
-        project.save()
+        project.save(update_fields=["status"])
         serializer = self.get_serializer(project)
         return Response(serializer.data)
 
+    @action(detail=False, methods=["post"], permission_classes=[IsWorker])
+    def bulk_create(self, request):
+        """Create a list of projects for the current worker with one INSERT."""
+        if not isinstance(request.data, list):
+            return Response({"detail": "Expected a list of projects"}, status=400)
+
+        serializer = self.get_serializer(data=request.data, many=True, max_length=self.BULK_MAX_ITEMS)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save(worker=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(
+        detail=False, methods=["patch"], permission_classes=[IsWorker],
+        url_path="update_status", url_name="bulk-update-status",
+    )
+    def bulk_update_status(self, request):
+        """
+        Batch version of update_status: body is [{"id": ..., "status": ...}].
+
+        One SELECT to classify ids (own / someone else's / missing) and one
+        ownership-checked UPDATE ... WHERE id IN (...) per status value.
+        Returns one result per item, in request order; when an id comes up
+        more than once the last item is applied and the earlier ones get 409.
+        """
+        items = request.data
+        if not isinstance(items, list):
+            return Response({"detail": "Expected a list of {id, status} objects"}, status=400)
+        if len(items) > self.BULK_MAX_ITEMS:
+            return Response({"detail": f"At most {self.BULK_MAX_ITEMS} items per batch"}, status=400)
+
+        valid_statuses = {value for value, _ in Project.STATUS_CHOICES}
+        results = []
+        wanted = {}  # id -> status; a later item for the same id wins
+        latest = {}  # id -> its result in that later item
+        for item in items:
+            pk = item.get("id") if isinstance(item, dict) else None
+            status_value = item.get("status") if isinstance(item, dict) else None
+            if not isinstance(pk, int) or isinstance(pk, bool) or pk not in ID_RANGE:
+                results.append({"id": pk, "code": 400, "detail": "Invalid id"})
+            elif status_value not in valid_statuses:
+                results.append({"id": pk, "code": 400, "detail": "Invalid status"})
+            else:
+                if pk in latest:
+                    latest[pk].update(code=409, detail="Superseded by a later item for the same id")
+                wanted[pk] = status_value
+                latest[pk] = {"id": pk, "status": status_value}
+                results.append(latest[pk])
+
+        with transaction.atomic():
+            # Locked: the cluster and stats deltas below go by these rows
+            current = {
+                row[0]: row[1:] for row in Project.objects.select_for_update().filter(pk__in=wanted).values_list(
+                    "id", "worker_id", "status", "geo_cell", "latitude", "longitude", "finish_date"
+                )
+            }
+            owners = {pk: row[0] for pk, row in current.items()}
+            by_status = {}
+            for pk, status_value in wanted.items():
+                if owners.get(pk) == request.user.pk:
+                    by_status.setdefault(status_value, []).append(pk)
+            now = timezone.now()
+            for status_value, pks in by_status.items():
+                Project.objects.filter(pk__in=pks, worker=request.user).update(
+                    status=status_value, updated_at=now
+                )
+
+            # update() skips the post_save signal; move map clusters and
+            # stats rows by hand
+            moved = [
+                (current[pk], status_value)
+                for status_value, pks in by_status.items() for pk in pks
+                if current[pk][1] != status_value
+            ]
+            clusters.track(
+                added=[clusters.point(cell, new, lat, lng) for (_, _, cell, lat, lng, _), new in moved],
+                removed=[clusters.point(cell, old, lat, lng) for (_, old, cell, lat, lng, _), _ in moved],
+            )
+            stats.track(
+                added=[stats.key(worker, new, due) for (worker, _, _, _, _, due), new in moved],
+                removed=[stats.key(worker, old, due) for (worker, old, _, _, _, due), _ in moved],
+            )
+            if by_status:
+                response_cache.bump([request.user.pk])
+            for status_value, pks in by_status.items():
+                for pk in pks:
+                    if current[pk][1] != status_value:
+                        events.publish_on_commit(events.STATUS_CHANGED, request.user.pk, events.status_changed_data(
+                            pk, request.user.pk, status_value, current[pk][1]
+                        ))
+
+        for result in results:
+            if "code" in result:
+                continue
+            pk = result["id"]
+            if pk not in owners:
+                result.update(code=404, detail="Project not found")
+            elif owners[pk] != request.user.pk:
+                result.update(code=403, detail="You are not authorized to update this project")
+            else:
+                result["code"] = 200
+        return Response(results)
+
+
+
+def _float_param(request, name, low, high, default=None):
+    raw = request.query_params.get(name)
+    if raw is None or raw == "":
+        if default is None:
+            raise ParseError(f"Missing ?{name}= parameter")
+        return default
+    try:
+        value = float(raw)
+    except ValueError:
+        raise ParseError(f"?{name}= must be a number")
+    if not (low <= value <= high):
+        raise ParseError(f"?{name}= must be between {low} and {high}")
+    return value
+
+
+def _bbox_param(request):
+    """Parse ?bbox=west,south,east,north into (south, west, north, east)."""
+    try:
+        west, south, east, north = (float(v) for v in request.query_params["bbox"].split(","))
+    except (KeyError, ValueError):
+        raise ParseError("?bbox= must be west,south,east,north")
+    if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+        raise ParseError("?bbox= is out of range")
+    return south, west, north, east
 
 
 @api_view(["GET"])
@@ -185,6 +790,8 @@ def api_root(request):
         "register_admin": "/api/register/admin/",
         "login": "/api/login/",
         "refresh_token": "/api/token/refresh/",
+        "logout": "/api/logout/",
+        "logout_all": "/api/logout/all/",
         "projects": "/api/projects/"
     })
 
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import importlib.util
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,8 +46,32 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
-    )
+        # JWTAuthentication with a per-process user cache
+        "core.authentication.CachedJWTAuthentication",
+    ),
+    # Keyset pagination on (created_at, id): /api/projects/?cursor=...&page_size=...
+    "DEFAULT_PAGINATION_CLASS": "core.pagination.KeysetPagination",
+    # JSON through orjson; MessagePack with "Accept: application/msgpack"
+    # when the msgpack package is installed (core.renderers)
+    "DEFAULT_RENDERER_CLASSES": (
+        "core.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+        *(("core.renderers.MessagePackRenderer",) if importlib.util.find_spec("msgpack") else ()),
+    ),
+    # Token buckets (core.throttling): "N/period" lets a burst of N through,
+    # then one every period/N. Login and registration set their own.
+    "DEFAULT_THROTTLE_CLASSES": ("core.throttling.UserTokenBucketThrottle",),
+    "DEFAULT_THROTTLE_RATES": {
+        "user": os.environ.get("THROTTLE_USER_RATE", "1200/min"),  # per user (anonymous: per IP)
+        "login": os.environ.get("THROTTLE_LOGIN_RATE", "300/min"),  # per IP: sites share NAT addresses
+        "login_username": "10/min",  # per username tried
+        "register": "30/hour",  # per IP
+    },
+}
+
+SIMPLE_JWT = {
+    # Tokens carry a hash of the password: changing it revokes older tokens
+    "CHECK_REVOKE_TOKEN": True,
 }
 
 AUTH_USER_MODEL = "core.User"  # custom user model
@@ -67,6 +93,9 @@ EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",  # must be at the top
+    "core.metrics.MetricsMiddleware",  # times everything below it
+    "core.compression.CompressionMiddleware",  # gzip/brotli API responses
+    "core.admission.AdmissionMiddleware",  # concurrency limits, load shedding
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -98,13 +127,173 @@ WSGI_APPLICATION = 'worker_project.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+#
+# SQLite by default, set up on connect for concurrent use: WAL so readers
+# never wait for the writer, synchronous=NORMAL (durable in WAL mode, one
+# fsync per checkpoint instead of per commit), memory-mapped reads, and
+# write transactions that take the write lock when they begin (IMMEDIATE)
+# and wait up to SQLITE_BUSY_TIMEOUT seconds for it instead of failing with
+# "database is locked". `manage.py bench_db` compares this with the plain
+# defaults.
+#
+# Set POSTGRES_DB (and POSTGRES_HOST, POSTGRES_PORT, POSTGRES_USER,
+# POSTGRES_PASSWORD) for PostgreSQL. Connections are kept for
+# POSTGRES_CONN_MAX_AGE seconds and checked before reuse; with
+# POSTGRES_POOL_SIZE they come from a psycopg pool instead (needs
+# psycopg[pool]), which suits the threaded and async servers better.
+# POSTGRES_REPLICA_HOSTS (comma-separated) adds read replicas that serve the
+# project API's GET requests (core.db_routers).
 
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get("SQLITE_PATH", BASE_DIR / 'db.sqlite3'),
+        'OPTIONS': {
+            "init_command": (
+                "PRAGMA journal_mode=WAL;"
+                "PRAGMA synchronous=NORMAL;"
+                "PRAGMA mmap_size=268435456;"  # 256 MiB
+                "PRAGMA temp_store=MEMORY;"
+            ),
+            "transaction_mode": "IMMEDIATE",
+            "timeout": float(os.environ.get("SQLITE_BUSY_TIMEOUT", 5)),  # sqlite3 busy timeout
+        },
+    }
+}
+
+if os.environ.get("POSTGRES_DB"):
+    DATABASES["default"] = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": os.environ["POSTGRES_DB"],
+        "USER": os.environ.get("POSTGRES_USER", ""),
+        "PASSWORD": os.environ.get("POSTGRES_PASSWORD", ""),
+        "HOST": os.environ.get("POSTGRES_HOST", ""),
+        "PORT": os.environ.get("POSTGRES_PORT", ""),
+        "CONN_MAX_AGE": int(os.environ.get("POSTGRES_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {},
+    }
+    if os.environ.get("POSTGRES_POOL_SIZE"):
+        # A pooled connection goes back to the pool after each request
+        DATABASES["default"]["CONN_MAX_AGE"] = 0
+        DATABASES["default"]["OPTIONS"]["pool"] = {
+            "min_size": 2,
+            "max_size": int(os.environ["POSTGRES_POOL_SIZE"]),
+            "timeout": 10,
+        }
+    for i, host in enumerate(h.strip() for h in os.environ.get("POSTGRES_REPLICA_HOSTS", "").split(",") if h.strip()):
+        DATABASES[f"replica{i}"] = {
+            **DATABASES["default"],
+            "HOST": host,
+            "OPTIONS": {**DATABASES["default"]["OPTIONS"]},
+            "TEST": {"MIRROR": "default"},
+        }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias.startswith("replica")]
+DATABASE_REPLICA_LAG = 5  # seconds a writer's readers stay on the primary
+if DATABASE_REPLICAS:
+    DATABASE_ROUTERS = ["core.db_routers.ReplicaRouter"]
+
+
+# Caches
+# "api" holds rendered API responses (see core/response_cache.py). Default is a
+# size-bounded in-process LRU; set API_CACHE_REDIS_URL to share it between
+# server processes, which is needed for invalidation to reach all of them.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "api": {
+        "BACKEND": "core.cache_backends.LocalLRUCache",
+        "LOCATION": "api-responses",
+        "TIMEOUT": 300,
+        "OPTIONS": {"MAX_BYTES": 64 * 1024 * 1024},
+    },
+    # Throttle buckets (core.throttling); THROTTLE_REDIS_URL shares them between processes
+    "throttle": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "throttle",
+        "OPTIONS": {"MAX_ENTRIES": 100_000},
+    },
+}
+
+if os.environ.get("API_CACHE_REDIS_URL"):
+    CACHES["api"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ["API_CACHE_REDIS_URL"],
+        "TIMEOUT": 300,
     }
+
+if os.environ.get("THROTTLE_REDIS_URL"):
+    CACHES["throttle"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ["THROTTLE_REDIS_URL"],
+    }
+
+# Realtime project events (core.events). The default broadcaster only reaches
+# clients connected to the process that made the change; set
+# PROJECT_EVENTS_REDIS_URL to fan out through Redis when running several.
+PROJECT_EVENTS_BACKEND = {
+    "BACKEND": "core.events.LocalBroadcaster",
+    "OPTIONS": {"buffer_size": 1000},
+}
+
+if os.environ.get("PROJECT_EVENTS_REDIS_URL"):
+    PROJECT_EVENTS_BACKEND = {
+        "BACKEND": "core.events.RedisBroadcaster",
+        "OPTIONS": {"url": os.environ["PROJECT_EVENTS_REDIS_URL"], "buffer_size": 1000},
+    }
+
+# Request metrics (core.metrics), served at /api/metrics/ for Prometheus to
+# scrapers sending "Authorization: Bearer <METRICS_TOKEN>"; without a token
+# only with DEBUG. METRICS_DEBUG (on with DEBUG) adds Server-Timing headers,
+# and logs requests that repeat one query METRICS_REPEATED_QUERY_THRESHOLD
+# times (N+1).
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+METRICS_DEBUG = DEBUG or os.environ.get("METRICS_DEBUG") == "1"
+METRICS_REPEATED_QUERY_THRESHOLD = 10
+
+# Response compression (core.compression): JSON, NDJSON, MessagePack and CSV
+# bodies of COMPRESSION_MIN_SIZE bytes or more (streamed ones always) are
+# sent brotli- or gzip-encoded to clients that accept it
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", 1024))
+
+# Archival (core.archive): `manage.py archive_projects` moves projects
+# completed and unchanged for this many days out of the projects table
+ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", 180))
+
+# Bulk import (core.imports): uploads to /api/projects/import/ hash
+# passwords on one pool of this many processes per web process, shared by
+# concurrent uploads (0 or 1: in the request's thread). manage.py
+# import_projects has a pool of its own, one process per CPU by default.
+IMPORT_HTTP_PROCESSES = int(os.environ.get("IMPORT_HTTP_PROCESSES", 2))
+
+# Admission control (core.admission), per process. At most N requests of a
+# URL name run at once, ADMISSION_QUEUE_DEPTH more wait up to
+# ADMISSION_QUEUE_TIMEOUT seconds for a slot, the rest get 503. Low-priority
+# routes get 503 at once while ADMISSION_SHED_DEPTH requests are in flight
+# or recent latency is ADMISSION_SHED_LATENCY seconds. The defaults follow
+# the server's shape: SERVER_PROCESSES processes (gunicorn -w) of
+# SERVER_THREADS threads (--threads) each.
+SERVER_PROCESSES = int(os.environ.get("SERVER_PROCESSES", 1))
+SERVER_THREADS = int(os.environ.get("SERVER_THREADS", 8))
+ADMISSION_ENABLED = os.environ.get("ADMISSION_ENABLED", "1") != "0"
+ADMISSION_CONCURRENCY = {
+    # PBKDF2 is CPU-bound: one hash per core, the cores shared by the processes
+    "login": int(os.environ.get("ADMISSION_LOGIN_CONCURRENCY", max(1, (os.cpu_count() or 1) // SERVER_PROCESSES))),
+    "register_worker": 1,
+    "register_admin": 1,
+}
+# Waiting requests hold threads: leave half for the cheap requests. The
+# timeout leaves time for a full queue of password hashes ahead.
+ADMISSION_QUEUE_DEPTH = int(os.environ.get("ADMISSION_QUEUE_DEPTH", max(1, SERVER_THREADS // 2)))
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", 5.0))
+ADMISSION_LOW_PRIORITY = {
+    "register_worker", "register_admin", "projects-search", "projects-fulltext", "async-projects-search",
 }
+ADMISSION_SHED_DEPTH = int(os.environ.get("ADMISSION_SHED_DEPTH", max(2, SERVER_THREADS - 2)))
+ADMISSION_SHED_LATENCY = float(os.environ.get("ADMISSION_SHED_LATENCY", 1.0))
 
 
 # Password validation
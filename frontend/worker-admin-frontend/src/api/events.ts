@@ -0,0 +1,73 @@
+// Realtime project events (server-sent events from /api/async/projects/events/).
+//
+// EventSource can't send an Authorization header, so this reads the stream
+// with fetch() and parses it by hand. It reconnects on its own, resuming from
+// the last event id; a "resync" event means events were lost and the caller
+// should refetch its list.
+
+export interface ProjectEvent {
+  id: string;
+  type: string; // project.created | project.updated | project.status_changed | project.deleted | resync
+  data: any;
+}
+
+const EVENTS_URL = "/api/async/projects/events/";
+
+export function subscribeProjectEvents(
+  token: string,
+  onEvent: (event: ProjectEvent) => void
+): () => void {
+  const controller = new AbortController();
+  let lastEventId = "";
+  let retryMs = 3000;
+
+  const dispatch = (block: string) => {
+    let id = "";
+    let type = "message";
+    const data: string[] = [];
+    for (const line of block.split("\n")) {
+      const colon = line.indexOf(":");
+      if (colon === 0) continue; // comment / keep-alive
+      const field = colon < 0 ? line : line.slice(0, colon);
+      const value = colon < 0 ? "" : line.slice(colon + 1).replace(/^ /, "");
+      if (field === "id") id = value;
+      else if (field === "event") type = value;
+      else if (field === "data") data.push(value);
+      else if (field === "retry" && /^\d+$/.test(value)) retryMs = Number(value);
+    }
+    if (id) lastEventId = id;
+    if (data.length) onEvent({ id, type, data: JSON.parse(data.join("\n")) });
+  };
+
+  const connect = async () => {
+    while (!controller.signal.aborted) {
+      try {
+        const headers: Record<string, string> = { Authorization: `Bearer ${token}` };
+        if (lastEventId) headers["Last-Event-ID"] = lastEventId;
+        const response = await fetch(EVENTS_URL, { headers, signal: controller.signal });
+        if (response.status === 401 || response.status === 403) return; // token expired
+        if (!response.ok || !response.body) throw new Error(`HTTP ${response.status}`);
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+        for (;;) {
+          const { value, done } = await reader.read();
+          if (done) break;
+          buffer += decoder.decode(value, { stream: true });
+          let end;
+          while ((end = buffer.indexOf("\n\n")) >= 0) {
+            dispatch(buffer.slice(0, end));
+            buffer = buffer.slice(end + 2);
+          }
+        }
+      } catch (err) {
+        if (controller.signal.aborted) return;
+      }
+      await new Promise((resolve) => setTimeout(resolve, retryMs));
+    }
+  };
+
+  connect();
+  return () => controller.abort();
+}
@@ -1,18 +1,34 @@
 import React, { useEffect } from "react";
 import { useDispatch, useSelector } from "react-redux";
-import { fetchAdminProjects } from "../features/projects/adminProjectsSlice";
+import {
+  adminProjectEventReceived,
+  fetchAdminProjects,
+  fetchMoreAdminProjects,
+} from "../features/projects/adminProjectsSlice";
+import { subscribeProjectEvents } from "../api/events";
 import { RootState, AppDispatch } from "../features/auth/index";
 
 const AdminDashboard: React.FC = () => {
   const dispatch = useDispatch<AppDispatch>();
-  const { projects, loading, error } = useSelector(
+  const { projects, next, loading, error } = useSelector(
     (state: RootState) => state.adminProject
   );
 
+  const token = useSelector((state: RootState) => state.auth.accessToken);
+
   useEffect(() => {
     dispatch(fetchAdminProjects());
   }, [dispatch]);
 
+  // Live updates instead of refetching the list
+  useEffect(() => {
+    if (!token) return;
+    return subscribeProjectEvents(token, (event) => {
+      if (event.type === "resync") dispatch(fetchAdminProjects());
+      else dispatch(adminProjectEventReceived(event));
+    });
+  }, [dispatch, token]);
+
   return (
     <div>
       <h2>Admin Dashboard</h2>
@@ -26,6 +42,11 @@ const AdminDashboard: React.FC = () => {
           </li>
         ))}
       </ul>
+      {next && (
+        <button onClick={() => dispatch(fetchMoreAdminProjects())} disabled={loading}>
+          Load more
+        </button>
+      )}
     </div>
   );
 };
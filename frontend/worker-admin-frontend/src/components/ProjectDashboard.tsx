@@ -1,6 +1,9 @@
 import React, { useEffect, useState, useRef } from "react";
 import { useAppDispatch, useAppSelector } from "../features/auth/hooks";
-import { fetchProjects, createProject, updateProjectStatus, Project } from "../features/projects/projectSlice";
+import {
+  fetchProjects, createProject, updateProjectStatus, projectEventReceived, Project
+} from "../features/projects/projectSlice";
+import { subscribeProjectEvents } from "../api/events";
 import { searchProjects, clearSearch } from "../features/projects/projectSearchSlice";
 import {
   BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer
@@ -139,6 +142,16 @@ useEffect(() => {
     dispatch(fetchProjects());
   }, [dispatch]);
 
+  // Live updates for the worker's projects
+  const token = useAppSelector((state) => state.auth.accessToken);
+  useEffect(() => {
+    if (!token) return;
+    return subscribeProjectEvents(token, (event) => {
+      if (event.type === "resync") dispatch(fetchProjects());
+      else dispatch(projectEventReceived(event));
+    });
+  }, [dispatch, token]);
+
 const showProjectOnMap = (lat: number, lng: number, name: string) => {
   if (!mapInstanceRef.current) return;
 
@@ -1,6 +1,7 @@
-import { createSlice, createAsyncThunk } from "@reduxjs/toolkit";
+import { createSlice, createAsyncThunk, PayloadAction } from "@reduxjs/toolkit";
 import axiosInstance, { setAuthToken } from "../../api/axios";
 import { RootState } from "../auth"; // Adjust path to your auth slice
+import { ProjectEvent } from "../../api/events";
 
 interface Project {
   id: number;
@@ -12,26 +13,54 @@ interface Project {
 
 interface AdminProjectsState {
   projects: Project[];
+  next: string | null; // cursor URL of the next page, null when done
   loading: boolean;
   error: string | null;
 }
 
+interface ProjectPage {
+  next: string | null;
+  results: Project[];
+}
+
 const initialState: AdminProjectsState = {
   projects: [],
+  next: null,
   loading: false,
   error: null,
 };
 
-// Fetch all projects for ADMIN
+// Only the columns the admin list renders
+const ADMIN_LIST_FIELDS = "id,worker,name,description,created_at";
+
+// Fetch the first page of projects for ADMIN
 export const fetchAdminProjects = createAsyncThunk<
-  Project[],
+  ProjectPage,
   void,
   { state: RootState; rejectValue: any }
 >("adminProjects/fetchAdminProjects", async (_, { getState, rejectWithValue }) => {
   try {
     const token = getState().auth.accessToken;
     setAuthToken(token || null); // attach token
-    const response = await axiosInstance.get("/projects/"); 
+    const response = await axiosInstance.get("/projects/", {
+      params: { fields: ADMIN_LIST_FIELDS },
+    });
+    return response.data;
+  } catch (err: any) {
+    return rejectWithValue(err.response?.data || "Failed to fetch admin projects");
+  }
+});
+
+// Fetch the next page (follows the cursor link from the previous response)
+export const fetchMoreAdminProjects = createAsyncThunk<
+  ProjectPage,
+  void,
+  { state: RootState; rejectValue: any }
+>("adminProjects/fetchMoreAdminProjects", async (_, { getState, rejectWithValue }) => {
+  try {
+    const state = getState();
+    setAuthToken(state.auth.accessToken || null);
+    const response = await axiosInstance.get(state.adminProject.next as string);
     return response.data;
   } catch (err: any) {
     return rejectWithValue(err.response?.data || "Failed to fetch admin projects");
@@ -41,7 +70,20 @@ export const fetchAdminProjects = createAsyncThunk<
 const adminProjectsSlice = createSlice({
   name: "adminProjects",
   initialState,
-  reducers: {},
+  reducers: {
+    // Realtime change pushed by the server (see api/events.ts); the list is
+    // newest first, so new projects go on top
+    adminProjectEventReceived(state, action: PayloadAction<ProjectEvent>) {
+      const { type, data } = action.payload;
+      if (type === "project.created") {
+        if (!state.projects.some((p) => p.id === data.id)) state.projects.unshift(data);
+      } else if (type === "project.updated") {
+        state.projects = state.projects.map((p) => (p.id === data.id ? { ...p, ...data } : p));
+      } else if (type === "project.deleted") {
+        state.projects = state.projects.filter((p) => p.id !== data.id);
+      }
+    },
+  },
   extraReducers: (builder) => {
     builder
       // Fetch admin projects
@@ -51,7 +93,8 @@ const adminProjectsSlice = createSlice({
       })
       .addCase(fetchAdminProjects.fulfilled, (state, action) => {
         state.loading = false;
-        state.projects = action.payload;
+        state.projects = action.payload.results;
+        state.next = action.payload.next;
       })
       .addCase(fetchAdminProjects.rejected, (state, action) => {
         state.loading = false;
@@ -59,8 +102,26 @@ const adminProjectsSlice = createSlice({
           typeof action.payload === "string"
             ? action.payload
             : action.payload?.detail || "Error fetching admin projects";
+      })
+      // Load more
+      .addCase(fetchMoreAdminProjects.pending, (state) => {
+        state.loading = true;
+        state.error = null;
+      })
+      .addCase(fetchMoreAdminProjects.fulfilled, (state, action) => {
+        state.loading = false;
+        state.projects = state.projects.concat(action.payload.results);
+        state.next = action.payload.next;
+      })
+      .addCase(fetchMoreAdminProjects.rejected, (state, action) => {
+        state.loading = false;
+        state.error =
+          typeof action.payload === "string"
+            ? action.payload
+            : action.payload?.detail || "Error fetching admin projects";
       });
   },
 });
 
+export const { adminProjectEventReceived } = adminProjectsSlice.actions;
 export default adminProjectsSlice.reducer;
@@ -1,6 +1,7 @@
 import { createSlice, createAsyncThunk, PayloadAction } from "@reduxjs/toolkit";
 import axiosInstance, { setAuthToken } from "../../api/axios";
 import { RootState } from "../auth/index";
+import { ProjectEvent } from "../../api/events";
 
 export type ProjectStatus = "PENDING" | "IN_PROGRESS" | "COMPLETED";
 
@@ -28,7 +29,7 @@ const initialState: ProjectState = {
   error: null,
 };
 
-// Fetch all projects
+// Fetch all of the worker's projects
 export const fetchProjects = createAsyncThunk<
   Project[],
   void,
@@ -37,8 +38,15 @@ export const fetchProjects = createAsyncThunk<
   try {
     const token = getState().auth.accessToken;
     setAuthToken(token || null);
-    const response = await axiosInstance.get("/projects/");
-    return response.data;
+    // The list is cursor-paginated; a worker's own list is small, so follow
+    // the next links until we have it all
+    let response = await axiosInstance.get("/projects/", { params: { page_size: 500 } });
+    let projects: Project[] = response.data.results;
+    while (response.data.next) {
+      response = await axiosInstance.get(response.data.next);
+      projects = projects.concat(response.data.results);
+    }
+    return projects;
   } catch (err: any) {
     return rejectWithValue(err.response?.data || "Failed to fetch projects");
   }
@@ -114,7 +122,22 @@ export const updateProjectStatus = createAsyncThunk<
 const projectSlice = createSlice({
   name: "projects",
   initialState,
-  reducers: {},
+  reducers: {
+    // Realtime change pushed by the server (see api/events.ts)
+    projectEventReceived(state, action: PayloadAction<ProjectEvent>) {
+      const { type, data } = action.payload;
+      if (type === "project.created") {
+        if (!state.projects.some((p) => p.id === data.id)) state.projects.push(data);
+      } else if (type === "project.updated") {
+        state.projects = state.projects.map((p) => (p.id === data.id ? data : p));
+      } else if (type === "project.status_changed") {
+        const project = state.projects.find((p) => p.id === data.id);
+        if (project) project.status = data.status;
+      } else if (type === "project.deleted") {
+        state.projects = state.projects.filter((p) => p.id !== data.id);
+      }
+    },
+  },
   extraReducers: (builder) => {
     builder
       // fetch projects
@@ -163,4 +186,5 @@ const projectSlice = createSlice({
   },
 });
 
+export const { projectEventReceived } = projectSlice.actions;
 export default projectSlice.reducer;